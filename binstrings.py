@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import re
+import sys
+import mmap
+import time
+import argparse
+import subprocess
+import concurrent.futures
+
+# An in-process replacement for running `/usr/bin/strings` over a binary and
+# then only keeping the lines which look like identifiers (which is what
+# `gen_initial_wwnames.py` used to do).  `strings` reports every run of at
+# least four "printable" bytes (tab, or 0x20-0x7E), so an identifier-only
+# line from it is a run of `[A-Za-z0-9_]` starting with an alphanumeric,
+# which *isn't* bordered by any other printable character.  That translates
+# directly into a bytes regex with a lookbehind and lookahead, which we can
+# run straight over an mmap of the file, without a subprocess or holding
+# its entire output in memory.
+#
+# Note that this always scans the *whole* file, which is what `strings -a`
+# does.  `gen_initial_wwnames.py` used to run plain `strings`, without `-a`.
+# That's the same thing on binutils 2.39 and later, where `-a` became the
+# default.  On older binutils, though, plain `strings` only looked at the
+# loadable, initialized data sections of object files it recognized.  So
+# compared to the old script on those systems, we can come up with more
+# candidates (a superset of what it found).  `--verify` compares against the
+# exact old invocation, and `--verify-all` against `strings -a`.
+#
+# Big files get split into chunks which are scanned in parallel on a
+# process pool.  Each chunk's end gets pushed forward to the end of
+# whatever printable run it lands in, so that no run is ever split across
+# two chunks.
+
+# Bytes which `strings` considers printable
+printable = b'\t\x20-\x7e'
+
+# The lines we want from `strings`
+identifier_re = re.compile(rb'(?<![' + printable + rb'])[A-Za-z0-9][A-Za-z0-9_]{3,}(?![' + printable + rb'])')
+
+# Used to find the end of a printable run
+nonprintable_re = re.compile(rb'[^' + printable + rb']')
+
+# Default chunk size for parallel scanning
+DEFAULT_CHUNK_SIZE = 16*1024*1024
+
+
+def chunk_ranges(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Splits the buffer `data` into `(start, end)` ranges of roughly
+    `chunk_size` bytes, with each end extended to the end of the printable
+    run it falls in.
+    """
+    ranges = []
+    start = 0
+    size = len(data)
+    while start < size:
+        end = min(start + chunk_size, size)
+        if end < size:
+            if match := nonprintable_re.search(data, end):
+                end = match.start()
+            else:
+                end = size
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def scan_range(filename, start, end):
+    """
+    Worker function: returns the set of identifier strings found between
+    `start` and `end` in `filename`.
+    """
+    with open(filename, 'rb') as df:
+        with mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return {match.decode('ascii') for match in identifier_re.findall(data, start, end)}
+
+
+def iter_identifiers(filename, jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generator which yields identifier-like strings from `filename`: the
+    same ones you'd get from `/usr/bin/strings` filtered on
+    `^[a-zA-Z0-9][a-zA-Z0-9_]*$`.  Chunks of the file are scanned on a
+    process pool of `jobs` workers, and their results are yielded as they
+    finish, in file order.  Strings are unique within each chunk, but may
+    be repeated across chunks.
+    """
+    if os.path.getsize(filename) == 0:
+        return
+    with open(filename, 'rb') as df:
+        with mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = chunk_ranges(data, chunk_size)
+    if len(ranges) == 1:
+        yield from scan_range(filename, *ranges[0])
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        for result in executor.map(scan_range,
+                [filename]*len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges]):
+            yield from result
+
+
+def strings_identifiers(filename, scan_all=False):
+    """
+    The old way of doing things: runs `/usr/bin/strings` and filters its
+    output.  By default this is exactly what `gen_initial_wwnames.py` used
+    to run; with `scan_all`, `-a` gets passed as well, to scan the whole
+    file regardless of the binutils version.  Returns a set.  Used to
+    verify `iter_identifiers()`.
+    """
+    start_re = re.compile('^[a-zA-Z0-9][a-zA-Z0-9_]*$')
+    found = set()
+    command = ['/usr/bin/strings']
+    if scan_all:
+        command.append('-a')
+    command.append(filename)
+    p = subprocess.run(command,
+            capture_output=True,
+            encoding='utf-8',
+            errors='replace',
+            )
+    for line in p.stdout.splitlines():
+        if start_re.match(line):
+            found.add(line)
+    return found
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Extract identifier-like strings from a binary',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Prints the same set of strings as running `strings -a` on
+                the file and keeping only lines matching
+                ^[a-zA-Z0-9][a-zA-Z0-9_]*$ (though not in the same order).
+                With -v/--verify, runs /usr/bin/strings exactly as
+                gen_initial_wwnames.py used to (without -a) as well, and
+                compares the two; with -V/--verify-all, passes -a to it.
+                Those are the same on binutils 2.39+, but older versions
+                only scan data sections by default.
+            """,
+            )
+
+    parser.add_argument('-j', '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes',
+            )
+
+    parser.add_argument('-c', '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Size of chunks to scan in parallel, in bytes',
+            )
+
+    verify = parser.add_mutually_exclusive_group()
+
+    verify.add_argument('-v', '--verify',
+            action='store_true',
+            help='Compare results (and timing) against /usr/bin/strings',
+            )
+
+    verify.add_argument('-V', '--verify-all',
+            action='store_true',
+            help='Compare results (and timing) against /usr/bin/strings -a',
+            )
+
+    parser.add_argument('filename',
+            nargs=1,
+            help='File to scan',
+            )
+
+    args = parser.parse_args()
+    filename = args.filename[0]
+
+    start = time.perf_counter()
+    if args.verify or args.verify_all:
+        found = set(iter_identifiers(filename, jobs=args.jobs, chunk_size=args.chunk_size))
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = strings_identifiers(filename, scan_all=args.verify_all)
+        strings_elapsed = time.perf_counter() - start
+        print(f'binstrings: {len(found)} strings in {elapsed:.2f}s')
+        print('strings{}: {} strings in {:.2f}s'.format(
+            ' -a' if args.verify_all else '',
+            len(expected),
+            strings_elapsed,
+            ))
+        if found == expected:
+            print('Results match!')
+        else:
+            for extra in sorted(found - expected):
+                print(f' + {extra}')
+            for missing in sorted(expected - found):
+                print(f' - {missing}')
+            if not args.verify_all and expected < found:
+                print('(Only extra strings were found; this is expected if your binutils is older'
+                        ' than 2.39, where `strings` only scans data sections by default)')
+            sys.exit(1)
+    else:
+        seen = set()
+        for found in iter_identifiers(filename, jobs=args.jobs, chunk_size=args.chunk_size):
+            if found not in seen:
+                seen.add(found)
+                print(found)
+        print(f'{len(seen)} strings in {time.perf_counter()-start:.2f}s', file=sys.stderr)
@@ -29,79 +29,167 @@
 import os
 import re
 import sys
-import lzma
+import time
+import zlib
+import argparse
+import xzblocks
+import pakcontents
+import treeindex
+import concurrent.futures
 
 # Used for testing if I'd figured out the translation from pakfile paths
 # to object paths, by looping through my generated contents-* files and
 # comparing against my already-sorted BL3 extraction dir.  Not really of
 # much use anymore, but I'm a digital packrate, so here it is anyway.
+#
+# The contents files get decompressed and parsed on a process pool (one
+# file per task), and each worker hands back the translated object paths
+# already split into shards by a hash of their lowercased name.  The
+# extracted tree gets split up the same way, so each shard's lookups can
+# then be done by a separate worker which only needs its own slice of the
+# tree.  Rather than stopping at the first missing object, everything
+# missing gets collected and reported at the end.
 
 # Parsing the contents files
 mount_re = re.compile('^Mounted at: (?P<mountpoint>.*)\s*$')
 item_re = re.compile('^ - (?P<objectname>.*\.(uasset|umap))\s*$')
 
-# Parsing the object paths themselves
-plugins_re = re.compile('^(?P<firstpart>\w+)/Plugins/(?P<lastpart>.*)\s*$')
-content_re = re.compile('^(?P<junk>.*/)?(?P<firstpart>\w+)/Content/(?P<lastpart>.*)\s*$')
-
-# Extracted dir; walking this ahead of time so that we can match
-# case-insensitively laster
-all_files = set()
+# Default extracted dir
 extract_dir = '/usr/local/games/bl3_decrypt/extracted'
-trim = len(extract_dir)+1
-for dirpath, _, filenames in os.walk(extract_dir):
-    dirpath = dirpath[trim:]
-    for filename in filenames:
-        all_files.add(f'{dirpath}/{filename}'.lower())
-
-# Now loop
-cur_mount = None
-for filename in sorted(os.listdir('.')):
-    if filename.startswith('contents-') and filename.endswith('.txt.xz'):
-        with lzma.open(filename, 'rt', encoding='latin1') as df:
-            for line in df:
-
-                if match := mount_re.match(line):
-                    # Found a new mountpoint
-                    cur_mount = match.group('mountpoint')
-                    if cur_mount.startswith('../../../'):
-                        cur_mount = cur_mount[9:]
-                    elif cur_mount == '/':
-                        # This only shows up in "empty" pakfiles, so whatever
-                        cur_mount = ''
-
-                elif match := item_re.match(line):
-                    # Found a line
-                    objectname = match.group('objectname')
-                    assert(cur_mount is not None)
-                    objectname_full = f'{cur_mount}{objectname}'
-
-                    # If we're a plugin, strip out the plugin bit first
-                    if match2 := plugins_re.match(objectname_full):
-                        objectname_full = match2.group('lastpart')
-
-                    # If we're a "content", strip that out next
-                    if match2 := content_re.match(objectname_full):
-                        firstpart = match2.group('firstpart')
-                        lastpart = match2.group('lastpart')
-                        junk = match2.group('junk')
-                        #if junk and junk != '':
-                        #    print('{}, {}, {}'.format(junk, firstpart, lastpart))
-                        if firstpart == 'OakGame':
-                            firstpart = 'Game'
-                        elif firstpart == 'Wwise':
-                            firstpart = 'WwiseEditor'
-                        objectname_full = '{}/{}'.format(
-                                firstpart,
-                                lastpart,
-                                )
-
-                    # Now check to see if we've been found
-                    obj_to_check = objectname_full.lower()
-                    if obj_to_check not in all_files:
-                        raise Exception('{} -> {} not found!'.format(
-                            match.group('objectname'),
-                            objectname_full,
-                            ))
 
 
+def shard_for(path_lower, shards):
+    """
+    Returns which shard the lowercased path `path_lower` belongs to.  (Not
+    using `hash()`, since that's randomized per-process.)
+    """
+    return zlib.crc32(path_lower.encode('utf-8')) % shards
+
+
+def parse_contents(filename, shards):
+    """
+    Worker function: decompresses and parses a single contents file.
+    Returns a tuple of `(filename, num_objects, seconds, sharded)`, where
+    `sharded` is a list (one entry per shard) of lists of
+    `(objectname, objectname_full)` tuples.
+    """
+    start = time.perf_counter()
+    sharded = [[] for _ in range(shards)]
+    num_objects = 0
+    cur_mount = None
+    # We're already running in parallel, so don't bother with more than one
+    # decompression thread per file
+    for line in xzblocks.iter_lines(filename, encoding='latin1', threads=1):
+
+        if match := mount_re.match(line):
+            # Found a new mountpoint
+            cur_mount = match.group('mountpoint')
+
+        elif match := item_re.match(line):
+            # Found a line
+            objectname = match.group('objectname')
+            if cur_mount is None:
+                raise Exception(f'{filename}: object {objectname} found before any mountpoint')
+            objectname_full = pakcontents.real_path(cur_mount, objectname)
+            sharded[shard_for(objectname_full.lower(), shards)].append((objectname, objectname_full))
+            num_objects += 1
+
+    return (filename, num_objects, time.perf_counter()-start, sharded)
+
+
+def check_shard(tree_paths, objects):
+    """
+    Worker function: checks one shard's worth of objects against the same
+    shard of the extracted tree.  `objects` is a list of
+    `(contents_filename, objectname, objectname_full)` tuples.  Returns
+    the list of those which weren't found.  Lookups are case-insensitive.
+    """
+    all_files = {path.lower() for path in tree_paths}
+    return [obj for obj in objects if obj[2].lower() not in all_files]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Check contents-* files against an extracted BL3 data dir',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-d', '--directory',
+            type=str,
+            default='.',
+            help='Directory containing the contents-*.txt.xz files',
+            )
+
+    parser.add_argument('-e', '--extract-dir',
+            type=str,
+            default=extract_dir,
+            help='Extracted data dir to check against',
+            )
+
+    parser.add_argument('-j', '--jobs',
+            type=int,
+            default=xzblocks.default_threads(),
+            help='Number of worker processes',
+            )
+
+    parser.add_argument('-s', '--shards',
+            type=int,
+            help='Number of shards to split the lookups into (defaults to the number of jobs)',
+            )
+
+    args = parser.parse_args()
+    if args.shards is None:
+        args.shards = args.jobs
+    total_start = time.perf_counter()
+
+    contents_files = [os.path.join(args.directory, filename)
+            for filename in sorted(os.listdir(args.directory))
+            if filename.startswith('contents-') and filename.endswith('.txt.xz')]
+    if not contents_files:
+        print(f'No contents-*.txt.xz files found in {args.directory}')
+        sys.exit(1)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+
+        # Parse the contents files, and meanwhile load the extracted tree
+        # (case-insensitively) from its index, split into the same shards.
+        futures = [executor.submit(parse_contents, filename, args.shards) for filename in contents_files]
+        tree_shards = [[] for _ in range(args.shards)]
+        with treeindex.open_index(args.extract_dir) as tree:
+            for path, _, _, _ in tree.iter_files():
+                tree_shards[shard_for(path.lower(), args.shards)].append(path)
+
+        object_shards = [[] for _ in range(args.shards)]
+        total_objects = 0
+        for future in futures:
+            filename, num_objects, seconds, sharded = future.result()
+            total_objects += num_objects
+            print(f'{filename}: {num_objects} objects, parsed in {seconds:.2f}s')
+            for shard, objects in zip(object_shards, sharded):
+                shard.extend((filename, objectname, objectname_full)
+                        for objectname, objectname_full in objects)
+
+        # Now do the lookups
+        lookup_start = time.perf_counter()
+        missing = []
+        for result in executor.map(check_shard, tree_shards, object_shards):
+            missing.extend(result)
+        print(f'Checked {total_objects} objects in {args.shards} shard(s) in {time.perf_counter()-lookup_start:.2f}s')
+
+    # Report
+    print('')
+    if missing:
+        missing.sort()
+        print(f'{len(missing)} object(s) not found:')
+        cur_filename = None
+        for filename, objectname, objectname_full in missing:
+            if filename != cur_filename:
+                print(f'{filename}:')
+                cur_filename = filename
+            print(f' - {objectname} -> {objectname_full}')
+    else:
+        print('All objects found!')
+    print(f'Total time: {time.perf_counter()-total_start:.2f}s')
+    if missing:
+        sys.exit(1)
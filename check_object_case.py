@@ -28,12 +28,14 @@
 
 import os
 import re
-import io
 import sys
-import struct
+import time
 import argparse
+import treeindex
+import namecache
+import concurrent.futures
 
-# unpack_bl3.py used to use the `get_symbols()` function that's now in here,
+# unpack_bl3.py used to use a `get_symbols()` function (now handled by uasset.py),
 # looking for a "fuzzy" match between the symbols/names found in the .umap/.uasset
 # files and their current disk positions, and the just-extracted "raw" file
 # locations.  This was done so that objects could get moved over to the same
@@ -52,132 +54,133 @@ import argparse
 # to generate a list of hardcoded fixes which should then be put into unpack_bl3.py,
 # so that the extraction process Does The Right Thing in the first place.
 
-def get_symbols(full_path):
-    """
-    Given a filename, extract UE symbols from it.  This is very hand-wavey and
-    probably skips over a bunch of string fields which just happen to be
-    zero-length in all BL3 `.uasset` files.  It may fail on non-BL3 pakfiles
-    (or even future BL3 pakfiles, depending on how they get exported).
-    Returns a dictonary mapping each symbol in lowercase to it's actual
-    capitalization.  This allows for easy case-insensitive compares.
-    """
-    syms = {}
-    with open(full_path, 'rb') as datafile:
+re_num_suffix = re.compile(r"^(?P<prefix>.*)_(?P<suffix>\d+)$")
 
-        def read_int():
-            return struct.unpack('<i', datafile.read(4))[0]
 
-        def read_str():
-            strlen = read_int()
-            if strlen < 0:
-                strlen = abs(strlen)
-                return datafile.read(strlen * 2)[:-2].decode('utf_16_le')
+def check_names(rel_path, names):
+    """
+    Checks the case of a single object (whose path within the extract dir
+    is `rel_path`) against the `names` found inside it (as returned by
+    `namecache.NameCache.iter_names()`).  Returns a tuple of
+    `(file_moves, dir_moves)` sets.
+    """
+    file_moves = set()
+    dir_moves = set()
+    cur_path = '/' + rel_path.rsplit('.', 1)[0]
+
+    # See if we've got a number suffix
+    cur_path_prefix = None
+    num_suffix = None
+    match = re_num_suffix.match(cur_path)
+    if match:
+        cur_path_prefix = match.group('prefix')
+        num_suffix = match.group('suffix')
+
+    # Store lowercase versions
+    cur_path_lower = cur_path.lower()
+    cur_path_prefix_lower = None
+    wanted = {cur_path_lower}
+    if cur_path_prefix:
+        cur_path_prefix_lower = cur_path_prefix.lower()
+        wanted.add(cur_path_prefix_lower)
+
+    # Get symbols and check stuff
+    syms = namecache.find_names(names, wanted)
+    found_name = None
+    matched_prefix = False
+    matched_on = None
+    if cur_path_lower in syms:
+        found_name = syms[cur_path_lower]
+        matched_on = cur_path
+    elif cur_path_prefix_lower and cur_path_prefix_lower in syms:
+        found_name = syms[cur_path_prefix_lower]
+        matched_on = cur_path_prefix
+        matched_prefix = True
+
+    # If we didn't find *any* match, abort!
+    if not found_name:
+        raise Exception('Could not find: {}'.format(cur_path))
+
+    # Now check to see if the case matches or not
+    if matched_on != found_name:
+        parts_cur = matched_on.split('/')[1:]
+        parts_found = found_name.split('/')[1:]
+        if parts_cur[-1] != parts_found[-1]:
+            if matched_prefix:
+                file_moves.add(('/'.join(parts_cur[:-1]), parts_cur[-1], '{}_{}'.format(parts_found[-1], num_suffix)))
             else:
-                return datafile.read(strlen)[:-1].decode('latin1')
-
-        datafile.seek(28)
-        read_str()
-        datafile.seek(80, io.SEEK_CUR)
-        num_symbols = read_int()
-        datafile.seek(72, io.SEEK_CUR)
-        for _ in range(num_symbols):
-            sym = read_str()
-            syms[sym.lower()] = sym
-            read_int()
-
-    return syms
-
-
-parser = argparse.ArgumentParser(
-        description='Check BL3 Datafiles for proper case in filenames',
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-        )
-
-parser.add_argument('extractdir',
-        nargs='?',
-        default='extracted_new',
-        help='Directory containing data to check',
-        )
-
-args = parser.parse_args()
-
-if args.extractdir.endswith('/'):
-    args.extractdir = args.extractdir[:-1]
-extractdir_len = len(args.extractdir)
-
-re_num_suffix = re.compile(r"^(?P<prefix>.*)_(?P<suffix>\d+)$")
-
-file_moves = set([])
-dir_moves = set([])
-for dirpath, _, filenames in os.walk(args.extractdir):
-    for filename in filenames:
-        if filename.endswith('.umap') or filename.endswith('.uasset'):
-            full_filename = os.path.join(dirpath, filename)
-            cur_path = full_filename[extractdir_len:].rsplit('.', 1)[0]
-
-            # See if we've got a number suffix
-            cur_path_prefix = None
-            num_suffix = None
-            match = re_num_suffix.match(cur_path)
-            if match:
-                cur_path_prefix = match.group('prefix')
-                num_suffix = match.group('suffix')
-
-            # Store lowercase versions
-            cur_path_lower = cur_path.lower()
-            cur_path_prefix_lower = None
-            if cur_path_prefix:
-                cur_path_prefix_lower = cur_path_prefix.lower()
-
-            # Get symbols and check stuff
-            syms = get_symbols(full_filename)
-            found_name = None
-            matched_prefix = False
-            matched_on = None
-            if cur_path_lower in syms:
-                found_name = syms[cur_path_lower]
-                matched_on = cur_path
-            elif cur_path_prefix_lower and cur_path_prefix_lower in syms:
-                found_name = syms[cur_path_prefix_lower]
-                matched_on = cur_path_prefix
-                matched_prefix = True
-
-            # If we didn't find *any* match, abort!
-            if not found_name:
-                raise Exception('Could not find: {}'.format(cur_path))
-
-            # Now check to see if the case matches or not
-            if matched_on != found_name:
-                parts_cur = matched_on.split('/')[1:]
-                parts_found = found_name.split('/')[1:]
-                if parts_cur[-1] != parts_found[-1]:
-                    if matched_prefix:
-                        file_moves.add(('/'.join(parts_cur[:-1]), parts_cur[-1], '{}_{}'.format(parts_found[-1], num_suffix)))
-                    else:
-                        file_moves.add(('/'.join(parts_cur[:-1]), parts_cur[-1], parts_found[-1]))
-
-                # TODO: we're "stopping" at the first hit here, so if there are mismatches
-                # *below* the one detected here,  you'd have to run this more than once to
-                # catch them all.  Of course, depending on the objects that are found, you
-                # might end up getting something further down the list anyway, which could
-                # result in undefined behavior.  c'est la vie
-                for idx in range(len(parts_cur)-2, -1, -1):
-                    if parts_cur[idx] != parts_found[idx]:
-                        dir_moves.add(('/'.join(parts_cur[:idx+1]), '/'.join(parts_found[:idx+1])))
-                        break
-
-if len(file_moves) > 0:
-    print('File Moves:')
-    for dirname, file_from, file_to in file_moves:
-        print(' - In {}: {}.* -> {}.*'.format(dirname, file_from, file_to))
+                file_moves.add(('/'.join(parts_cur[:-1]), parts_cur[-1], parts_found[-1]))
+
+        # TODO: we're "stopping" at the first hit here, so if there are mismatches
+        # *below* the one detected here,  you'd have to run this more than once to
+        # catch them all.  Of course, depending on the objects that are found, you
+        # might end up getting something further down the list anyway, which could
+        # result in undefined behavior.  c'est la vie
+        for idx in range(len(parts_cur)-2, -1, -1):
+            if parts_cur[idx] != parts_found[idx]:
+                dir_moves.add(('/'.join(parts_cur[:idx+1]), '/'.join(parts_found[:idx+1])))
+                break
+
+    return (file_moves, dir_moves)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Check BL3 Datafiles for proper case in filenames',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-j', '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes',
+            )
+
+    parser.add_argument('-c', '--cache',
+            type=str,
+            help='Name map cache file to use (defaults to <extractdir>.namecache.sqlite3)',
+            )
+
+    parser.add_argument('extractdir',
+            nargs='?',
+            default='extracted_new',
+            help='Directory containing data to check',
+            )
+
+    args = parser.parse_args()
+
+    # Name maps come from a persistent cache, so only packages which have
+    # changed since the last run need to be parsed (on a process pool).
+    start = time.perf_counter()
+    with treeindex.open_index(args.extractdir) as tree:
+        rel_paths = [rel_path for rel_path, _, _, _ in tree.iter_files(('.umap', '.uasset'))]
+    with namecache.NameCache(args.extractdir, args.cache) as cache:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            cached, parsed, removed = namecache.update(cache, rel_paths, executor)
+        print('Name maps: {} cached, {} parsed, {} removed, in {:.1f}s'.format(
+                cached, parsed, removed, time.perf_counter()-start))
+
+        file_moves = set([])
+        dir_moves = set([])
+        for rel_path, names in cache.iter_names(joined=True):
+            new_file_moves, new_dir_moves = check_names(rel_path, names)
+            file_moves |= new_file_moves
+            dir_moves |= new_dir_moves
+    print('Checked {} objects in {:.1f}s'.format(len(rel_paths), time.perf_counter()-start))
     print('')
 
-if len(dir_moves) > 0:
-    print('Dir Moves:')
-    for dir_from, dir_to in dir_moves:
-        print(' - {}/ -> {}/'.format(dir_from, dir_to))
-    print('')
+    if len(file_moves) > 0:
+        print('File Moves:')
+        for dirname, file_from, file_to in file_moves:
+            print(' - In {}: {}.* -> {}.*'.format(dirname, file_from, file_to))
+        print('')
 
-if len(file_moves) == 0 and len(dir_moves) == 0:
-    print('No changes required!')
+    if len(dir_moves) > 0:
+        print('Dir Moves:')
+        for dir_from, dir_to in dir_moves:
+            print(' - {}/ -> {}/'.format(dir_from, dir_to))
+        print('')
 
+    if len(file_moves) == 0 and len(dir_moves) == 0:
+        print('No changes required!')
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import itertools
+import pakcontents
+
+# Patch-to-patch diffs of pakfile contents, by in-game path, across the
+# whole `pak-*` history in one go.  For each patch (in order), objects are
+# reported as:
+#
+#   - Added: the path was never shipped in any previous patch
+#   - Overridden: the path was already shipped, and this patch ships it
+#     again (usually in a `_P` patch pak)
+#   - Removed: every pakfile which used to provide the path was re-shipped
+#     (ie: overwritten with a new pak of the same filename) in this patch,
+#     and none of the new versions include it.  This is pretty rare; the
+#     2020-03-26 patch, which overwrote five of the paks from
+#     `pak-2020-03-13-steam_xplay`, is the main example.
+#
+# This works off the contents-*.jsonl.xz files written by list_contents.py
+# (falling back to contents-*.txt.xz for patches which don't have one).
+# The structured files have an index sorted by in-game path, so each patch
+# gets streamed in sorted order and merged against a sorted temp file of the
+# cumulative state from all the previous patches, writing out a new state
+# file as it goes.  Memory use doesn't depend on how big the history is
+# (though textual contents files do have to be sorted in memory, one patch
+# at a time).
+#
+# The textual contents files don't list .wem/.bnk files, so those are left
+# out by default, to keep patches with different contents formats
+# comparable.  Use `-a`/`--audio` to include them anyway.
+
+audio_extensions = ('.wem', '.bnk')
+
+
+class PatchDiff:
+    """
+    The results of diffing a single patch against everything before it.
+    The lists of changes are spooled to temp files as we go, since there
+    can be a lot of them.
+    """
+
+    def __init__(self, patch, tmpdir):
+        self.patch = patch
+        self.added = tempfile.TemporaryFile('w+', dir=tmpdir, encoding='utf-8')
+        self.overridden = tempfile.TemporaryFile('w+', dir=tmpdir, encoding='utf-8')
+        self.removed = tempfile.TemporaryFile('w+', dir=tmpdir, encoding='utf-8')
+        self.num_added = 0
+        self.num_overridden = 0
+        self.num_removed = 0
+        self.num_entries = 0
+        self.total_paths = 0
+
+    def add(self, real, paks):
+        print(f'{real} ({", ".join(paks)})', file=self.added)
+        self.num_added += 1
+
+    def override(self, real, paks, previous):
+        print(f'{real} ({", ".join(paks)}, overriding {", ".join(previous)})', file=self.overridden)
+        self.num_overridden += 1
+
+    def remove(self, real, previous):
+        print(f'{real} (was in {", ".join(previous)})', file=self.removed)
+        self.num_removed += 1
+
+    def report(self, odf, summary_only=False):
+        """
+        Writes the report for this patch to the file object `odf`.
+        """
+        print(self.patch, file=odf)
+        print('-'*len(self.patch), file=odf)
+        print('', file=odf)
+        for label, df, count in [
+                ('Added', self.added, self.num_added),
+                ('Overridden', self.overridden, self.num_overridden),
+                ('Removed', self.removed, self.num_removed),
+                ]:
+            print(f'{label}: {count}', file=odf)
+            if not summary_only and count > 0:
+                print('', file=odf)
+                df.seek(0)
+                for line in df:
+                    odf.write(f' - {line}')
+                print('', file=odf)
+        if summary_only:
+            print('', file=odf)
+
+    def close(self):
+        self.added.close()
+        self.overridden.close()
+        self.removed.close()
+
+
+def iter_state(filename):
+    """
+    Generator which reads a state file, yielding `(key, real, paks)` tuples
+    in sorted order.  `paks` is a list of the pakfiles which currently
+    provide the path.
+    """
+    if filename is None:
+        return
+    with open(filename, encoding='utf-8') as df:
+        for line in df:
+            key, real, *paks = line.rstrip('\n').split('\t')
+            yield (key, real, paks)
+
+
+def iter_patch(filename, mountpoints, audio=False):
+    """
+    Generator which reads a contents file, yielding `(key, real, paks)`
+    tuples in sorted order, with each in-game path only showing up once.
+    `mountpoints` maps each pakfile in the patch to its mountpoint, and is
+    used to report `real` the same way the web lookup does (with a leading
+    slash only on `Content` paths).
+    """
+    entries = pakcontents.iter_sorted_contents(filename)
+    for key, group in itertools.groupby(entries, key=lambda e: pakcontents.path_key(e[0])):
+        group = list(group)
+        _, first_pak, first_path = group[0]
+        real = pakcontents.real_path(mountpoints[first_pak], first_path, leading_slash=True)
+        if not audio and real.lower().endswith(audio_extensions):
+            continue
+        paks = []
+        for _, pak_filename, _ in group:
+            if pak_filename not in paks:
+                paks.append(pak_filename)
+        yield (key, real, paks)
+
+
+def diff_patch(patch, contents_filename, state_filename, new_state_filename, tmpdir, audio=False):
+    """
+    Merges the patch described by `contents_filename` into the cumulative
+    state found in `state_filename` (which may be `None` for the first
+    patch), writing the new state to `new_state_filename`.  Returns a
+    `PatchDiff` with the results.
+    """
+    diff = PatchDiff(patch, tmpdir)
+
+    # Collect the full list of paks in this patch (and their mountpoints)
+    # first, so we know which previously-shipped paks are being overwritten.
+    if contents_filename.endswith('.jsonl.xz'):
+        with pakcontents.ContentsFile(contents_filename) as contents:
+            patch_paks = {pak['filename']: pak['mountpoint'] for pak in contents.paks}
+    else:
+        patch_paks = {}
+        for pak, mountpoint, _ in pakcontents.iter_text_contents(contents_filename):
+            patch_paks.setdefault(pak, mountpoint)
+
+    old = iter_state(state_filename)
+    new = iter_patch(contents_filename, patch_paks, audio=audio)
+    old_item = next(old, None)
+    new_item = next(new, None)
+    with open(new_state_filename, 'w', encoding='utf-8') as odf:
+        while old_item is not None or new_item is not None:
+            if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+                # Only in the previous state
+                key, real, previous = old_item
+                surviving = [pak for pak in previous if pak not in patch_paks]
+                if surviving:
+                    print('\t'.join([key, real] + surviving), file=odf)
+                    diff.total_paths += 1
+                else:
+                    diff.remove(real, previous)
+                old_item = next(old, None)
+            elif old_item is None or new_item[0] < old_item[0]:
+                # Only in the new patch
+                key, real, paks = new_item
+                diff.add(real, paks)
+                print('\t'.join([key, real] + paks), file=odf)
+                diff.num_entries += 1
+                diff.total_paths += 1
+                new_item = next(new, None)
+            else:
+                # In both
+                key, real, paks = new_item
+                previous = old_item[2]
+                diff.override(real, paks, previous)
+                surviving = [pak for pak in previous if pak not in patch_paks]
+                print('\t'.join([key, real] + surviving + paks), file=odf)
+                diff.num_entries += 1
+                diff.total_paths += 1
+                old_item = next(old, None)
+                new_item = next(new, None)
+
+    return diff
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Show what was added/overridden/removed in each patch',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Diffs the contents-* files for every patch (in the current
+                directory, by default) against all the patches before it,
+                by in-game object path.  Use -p/--patch to only report on
+                specific patches; the full history before them still gets
+                processed.
+            """,
+            )
+
+    parser.add_argument('-d', '--directory',
+            type=str,
+            default='.',
+            help='Directory containing the contents-* files',
+            )
+
+    parser.add_argument('-p', '--patch',
+            type=str,
+            action='append',
+            help='Only report on the specified patch (can be specified more than once)',
+            )
+
+    parser.add_argument('-o', '--output-dir',
+            type=str,
+            help='Write a diff-<patch>.txt file per patch into this directory, instead of to stdout',
+            )
+
+    parser.add_argument('-s', '--summary',
+            action='store_true',
+            help='Only show counts, not the full lists',
+            )
+
+    parser.add_argument('-a', '--audio',
+            action='store_true',
+            help='Include .wem/.bnk files (which textual contents files omit)',
+            )
+
+    parser.add_argument('-t', '--tmpdir',
+            type=str,
+            help='Directory to store temporary state files in (defaults to the system temp dir)',
+            )
+
+    args = parser.parse_args()
+
+    contents_files = pakcontents.find_contents_files(args.directory)
+    if not contents_files:
+        print(f'No contents files found in {args.directory}')
+        sys.exit(1)
+    if args.patch:
+        for patch in args.patch:
+            if patch not in contents_files:
+                print(f'No contents file found for {patch}')
+                sys.exit(1)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    overall_start = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        state_filename = None
+        for idx, (patch, contents_filename) in enumerate(contents_files.items()):
+            start = time.perf_counter()
+            new_state_filename = os.path.join(tmpdir, f'state-{idx % 2}.txt')
+            diff = diff_patch(patch, contents_filename,
+                    state_filename, new_state_filename,
+                    tmpdir, audio=args.audio)
+            state_filename = new_state_filename
+            print(f'{patch}: {diff.num_entries} paths, +{diff.num_added} *{diff.num_overridden} -{diff.num_removed}, {diff.total_paths} total ({time.perf_counter()-start:.1f}s)',
+                    file=sys.stderr)
+            if not args.patch or patch in args.patch:
+                if args.output_dir:
+                    with open(os.path.join(args.output_dir, f'diff-{patch}.txt'), 'w', encoding='utf-8') as odf:
+                        diff.report(odf, summary_only=args.summary)
+                else:
+                    diff.report(sys.stdout, summary_only=args.summary)
+            diff.close()
+    print(f'Finished in {time.perf_counter()-overall_start:.1f}s', file=sys.stderr)
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 # vim: set expandtab tabstop=4 shiftwidth=4:
 
 # Borderlands 3 Data Processing Scripts
@@ -27,20 +27,138 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
-import itertools
-
-paks = {}
-for filename in os.listdir('.'):
-    if filename.startswith('pak-'):
-        paks[filename] = set()
-        for pakname in os.listdir(filename):
-            if pakname.endswith('.pak'):
-                paks[filename].add(pakname)
-
-# Now find duplicates.
-for ((pakdir1, paks1), (pakdir2, paks2)) in itertools.combinations(paks.items(), 2):
-    combined = paks1 & paks2
-    if len(combined) > 0:
-        print('{} and {} share these:'.format(pakdir1, pakdir2))
-        print(combined)
-        print('')
+import sys
+import argparse
+import pakhash
+import pakcontents
+
+parser = argparse.ArgumentParser(
+        description='Find duplicate paks (and optionally pak contents) across pak-* dirs',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        epilog="""
+            By default, just reports pak filenames which show up in more than
+            one pak-* dir.  With -c/--content, also uses the checksum file to
+            find identical paks shipped under different names/dirs, and the
+            per-entry hashes in the structured contents-*.jsonl.xz files to
+            find identical files shipped more than once, with a count of how
+            many bytes are redundant.
+        """,
+        )
+
+parser.add_argument('-c', '--content',
+        action='store_true',
+        help='Also look for duplicated content, not just filenames',
+        )
+
+parser.add_argument('-s', '--store',
+        type=str,
+        choices=('egs', 'steam'),
+        default='steam',
+        help='Store whose checksum file to use for -c/--content',
+        )
+
+parser.add_argument('-n', '--top',
+        type=int,
+        default=25,
+        help='Number of most-redundant duplicated files to list with -c/--content',
+        )
+
+args = parser.parse_args()
+
+def format_bytes(num_bytes):
+    return '{:,} bytes ({:.1f}MB)'.format(num_bytes, num_bytes/1024/1024)
+
+# Build an inverted index of which dirs each pak filename shows up in
+pakdirs = sorted(d for d in os.listdir('.') if d.startswith('pak-') and os.path.isdir(d))
+pak_to_dirs = {}
+for dirname in pakdirs:
+    for pakname in os.listdir(dirname):
+        if pakname.endswith('.pak'):
+            pak_to_dirs.setdefault(pakname, []).append(dirname)
+
+# Now find duplicates, grouped by the set of dirs which share them.
+shared = {}
+for pakname, dirs in pak_to_dirs.items():
+    if len(dirs) > 1:
+        shared.setdefault(tuple(dirs), set()).add(pakname)
+for dirs, paknames in sorted(shared.items()):
+    print('{} share these:'.format(' and '.join(dirs)))
+    print(paknames)
+    print('')
+
+if not args.content:
+    sys.exit(0)
+
+# Identical paks, by checksum.  Entries with checksums of `n/a` are ones
+# which we know got overwritten later, so they're skipped.
+checksum_filename = 'checksums-sha256sum-{}.txt'.format(args.store)
+checksums = pakhash.ChecksumFile(checksum_filename)
+hash_to_paks = {}
+for section in checksums.sections.values():
+    for pakname, digest in section.entries.items():
+        if digest != 'n/a':
+            hash_to_paks.setdefault(digest, []).append(os.path.join(section.dirname, pakname))
+print('Identical paks (from {}):'.format(checksum_filename))
+print('')
+found = False
+redundant_bytes = 0
+for digest, paks in sorted(hash_to_paks.items(), key=lambda i: i[1]):
+    if len(paks) > 1:
+        found = True
+        print(' - {}'.format(', '.join(paks)))
+        for pak in paks:
+            if os.path.exists(pak):
+                redundant_bytes += os.path.getsize(pak)*(len(paks)-1)
+                break
+if found:
+    print('')
+    print('Redundant bytes in duplicated paks: {}'.format(format_bytes(redundant_bytes)))
+else:
+    print('(none)')
+print('')
+
+# Identical files inside paks, by their sha1 and size from the structured
+# contents files.  This takes two passes over the files, so we only have to
+# keep counts in memory for the first one, and then just the details of
+# the duplicated entries.
+contents_files = {}
+for patch, filename in pakcontents.find_contents_files().items():
+    if filename.endswith('.jsonl.xz'):
+        contents_files[patch] = filename
+    else:
+        print('NOTE: No structured contents file found for {}, skipping'.format(patch))
+print('Duplicated files inside paks (from {} structured contents files):'.format(len(contents_files)))
+print('')
+
+def iter_hashed_entries():
+    for patch, filename in contents_files.items():
+        with pakcontents.ContentsFile(filename) as contents:
+            for pak, entry in contents.iter_entries():
+                if entry.get('sha1') and entry.get('size'):
+                    yield ((bytes.fromhex(entry['sha1']), entry['size']), patch, pak, entry)
+
+counts = {}
+for key, _, _, _ in iter_hashed_entries():
+    counts[key] = counts.get(key, 0) + 1
+duplicates = {}
+for key, patch, pak, entry in iter_hashed_entries():
+    if counts[key] > 1:
+        duplicates.setdefault(key, []).append('{}/{}: {}'.format(patch, pak['filename'], entry['real']))
+del counts
+
+redundant_bytes = 0
+redundant_copies = 0
+for (_, size), copies in duplicates.items():
+    redundant_copies += len(copies)-1
+    redundant_bytes += size*(len(copies)-1)
+print('{} files shipped more than once, with {} redundant copies'.format(len(duplicates), redundant_copies))
+print('Redundant bytes in duplicated files: {}'.format(format_bytes(redundant_bytes)))
+if duplicates and args.top > 0:
+    print('')
+    print('Top {} by redundant bytes:'.format(args.top))
+    print('')
+    top = sorted(duplicates.items(), key=lambda i: i[0][1]*(len(i[1])-1), reverse=True)[:args.top]
+    for (sha1, size), copies in top:
+        print(' - {} ({} copies, {} redundant)'.format(sha1.hex(), len(copies), format_bytes(size*(len(copies)-1))))
+        for copy in copies:
+            print('   - {}'.format(copy))
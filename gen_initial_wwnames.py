@@ -27,10 +27,22 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
-import re
 import sys
-import struct
-import subprocess
+import json
+import time
+import zlib
+import heapq
+import sqlite3
+import tempfile
+import itertools
+import collections
+import pakhash
+import binstrings
+import treeindex
+import namecache
+import wwisehash
+import wwisebnk
+import concurrent.futures
 
 # Script used to generate an initial `wwnames.txt` file to use along with the
 # wwiser project, for making sense of audio banks in the Borderlands 3 data.
@@ -64,7 +76,9 @@ osx_binary = '/home/pez/legendary/Borderlands3/OakGame/Binaries/Mac/Borderlands3
 data_dir = 'extracted'
 
 # Hash collisions!  Uncomment the ones you want to prune out.  Organizing these
-# by pairs, so that the ones colliding are obvious.
+# by pairs, so that the ones colliding are obvious.  The script will report
+# all the collision groups it finds among the candidates (and which of these
+# are still unresolved), so new ones can be added here.
 collisions_to_remove = set([
 
     'AS_P1_Transition',
@@ -87,104 +101,484 @@ collisions_to_remove = set([
 
     ])
 
+# What to do about Wwise ID collisions which *aren't* handled by the list
+# above (see `wwisehash.policies`):
+#   'manual': leave them alone, and just report them
+#   'shortest': keep the shortest name in each group
+#   'remove-all': drop every name in the group
+collision_policy = 'manual'
+
+# If set, only candidates whose Wwise ID actually shows up in one of the
+# extracted `.bnk` files (as a bank ID, HIRC object ID, or STID entry) get
+# written out, which gets rid of the vast majority of the cruft.  Setting
+# `bank_loose_scan` as well will also count every possible uint32 found in
+# the banks (other than the audio data), which catches IDs that are only
+# referenced from inside other objects (switch groups, game parameters,
+# etc), at the cost of letting more cruft through.
+prune_to_bank_ids = False
+bank_loose_scan = False
+
 # Filename to write out to
 output_filename = 'wwnames-firstpass.txt'
 
+# Number of worker processes to use, for parsing packages and harvesting
+# their name catalogs
+jobs = os.cpu_count() or 1
+
+# Number of package-path shards to split the name harvesting into.  Each
+# worker builds its own set of names for its shard, which then get merged.
+harvest_shards = jobs*8
+
+# If set, once we're holding more than this many candidate strings in
+# memory, they'll be spilled to disk as a sorted run, and all the runs get
+# merged at the end.  The output's identical either way; this just caps
+# memory usage.
+spill_threshold = None
+
+# Incremental mode: the candidates from each package (and from the binary)
+# get stored in this SQLite file, keyed by path/size/mtime (plus a hash, for
+# the binary), so a rerun only has to deal with whatever's changed since
+# last time.  If nothing's changed at all, the output doesn't even get
+# rewritten.  Set to `None` to always do a full rebuild in memory instead
+# (which is where `spill_threshold` comes into play).  By default this lives
+# next to the data dir, alongside the tree index and name cache.
+candidate_cache = f'{os.path.normpath(data_dir)}.wwnames-candidates.sqlite3'
+
 ###
 ### And now the app
 ###
 
-def read_int(df):
-    return struct.unpack('<i', df.read(4))[0]
-
-def read_str(df):
-    strlen = read_int(df)
-    # The length includes a null byte at the end
-    # Also decoding to latin1 may not always be the right thing
-    # to do, though so far I've not seen anything other than ASCII
-    if strlen < 0:
-        strlen = abs(strlen)
-        return df.read(strlen*2)[:-2].decode('utf_16_le')
-    else:
-        return df.read(strlen)[:-1].decode('latin1')
-
-# Our set of potential strings
-potential_strings = set()
-
-# Grab strings from the main binary
-print(f'Grabbing main binary strings from: {osx_binary}')
-start_re = re.compile('^[a-zA-Z0-9][a-zA-Z0-9_]*$')
-p = subprocess.run(['/usr/bin/strings',
-    # UTF-16 strings don't seem to be especially useful
-    #'-e', 'l',
-    osx_binary,
-    ],
-    capture_output=True,
-    encoding='utf-8',
-    )
-for line in p.stdout.splitlines():
-    match = start_re.match(line)
-    if match:
-        potential_strings.add(line)
-
-# Walk the object filesystem
-print(f'Walking object filesystem from: {data_dir}')
-processed = 0
-for dirname, dirnames, filenames in os.walk(data_dir):
-    for filename in filenames:
-        if filename.endswith('.uasset') or filename.endswith('.umap'):
-
-            # Add in our path components
-            # We're doing this because many of the object names show up in there, but
-            # with their first underscore-delimited part removed.  This is the case
-            # at least for `WE_*` objects and `WwiseBank_*` objects.  This is probably
-            # a bit unnecessary now that we're reading in the name catalog from the
-            # objects directly -- these names probably show up in there anyway -- but
-            # compared reading the data it's super quick to do, so whatever.
-            parts = filename.rsplit('.', 1)[0].split('_')
-            for i in range(len(parts)):
-                potential_strings.add('_'.join(parts[i:]))
-
-            # Add in everything from the object's name index
-            with open(os.path.join(dirname, filename), 'rb') as df:
-
-                # Blah, initial header stuff
-                df.read(20)
-
-                # Some number of FCustomVersion
-                length = read_int(df)
-                for _ in range(length):
-                    df.read(20)
-
-                total_header_size = read_int(df)
-                folder_name = read_str(df)
-                # package_flags is actually a uint, but whatever.
-                package_flags = read_int(df)
-                name_count = read_int(df)
-                name_offset = read_int(df)
-
-                # Now we've read enough to skip right to the name catalog
-                df.seek(name_offset)
-                for _ in range(name_count):
-                    name = read_str(df)
-                    if '/' not in name:
-                        potential_strings.add(name)
-                    # This is actually two shorts
-                    read_int(df)
-
-            # Report
-            processed += 1
-            if processed % 1000 == 0:
-                print(f' - Processed {processed} files...')
-
-# Process our known collisions
-for collision in collisions_to_remove:
-    potential_strings.remove(collision)
-
-with open(output_filename, 'w') as df:
-    print(f'Writing out to: {output_filename}')
-    print('# Borderlands 3', file=df)
-    print('', file=df)
-    for event in sorted(potential_strings):
-        print(event, file=df)
+def path_strings(rel_path):
+    """
+    Returns the strings we harvest from an object's filename.  Many of the
+    object names show up in there, but with their first underscore-delimited
+    part removed.  This is the case at least for `WE_*` objects and
+    `WwiseBank_*` objects.  This is probably a bit unnecessary now that we're
+    reading in the name catalog from the objects directly -- these names
+    probably show up in there anyway -- but compared reading the data it's
+    super quick to do, so whatever.
+    """
+    filename = rel_path.rsplit('/', 1)[-1]
+    parts = filename.rsplit('.', 1)[0].split('_')
+    return ['_'.join(parts[i:]) for i in range(len(parts))]
+
+
+def package_candidates(rel_path, names):
+    """
+    Returns the set of candidate strings for the package at `rel_path`,
+    whose name map is `names`.
+    """
+    found = set(path_strings(rel_path))
+    found.update(name for name in names if '/' not in name)
+    return found
+
+
+def harvest_shard(root, first, last):
+    """
+    Worker function: gathers all the candidate strings from the cached
+    packages (under `root`) whose paths sort between `first` and `last`,
+    and returns them as a set.
+    """
+    found = set()
+    with namecache.NameCache(root) as cache:
+        for rel_path, names in cache.iter_names(first=first, last=last):
+            found |= package_candidates(rel_path, names)
+    return found
+
+
+def harvest_files(root, files):
+    """
+    Worker function: returns a list of `(path, size, mtime_ns, candidates)`
+    for each of `files` (a list of `(path, size, mtime_ns)` tuples for
+    packages under `root` which are already in the name cache).
+    """
+    results = []
+    with namecache.NameCache(root) as cache:
+        for rel_path, size, mtime_ns in files:
+            names = cache.get_names(rel_path, size, mtime_ns)
+            results.append((rel_path, size, mtime_ns, package_candidates(rel_path, names)))
+    return results
+
+
+class CandidateCache:
+    """
+    Persistent store of candidate strings, for incremental runs.  Each
+    source (a package, or the binary) has its candidates stored alongside
+    its size/mtime, and each candidate has a count of how many sources
+    provide it, so that changed or removed sources can have their old
+    candidates taken back out.  Changes to the counts get accumulated with
+    `set_source()`/`remove_source()`, and applied with `flush()`.
+    """
+
+    schema = """
+        create table if not exists source (
+            path text primary key,
+            size integer not null,
+            mtime_ns integer not null,
+            digest text,
+            candidates blob not null
+        );
+        create table if not exists candidate (
+            name text primary key,
+            refs integer not null
+        ) without rowid;
+        create table if not exists meta (
+            key text primary key,
+            value text not null
+        );
+        """
+
+    # Prefix for the binary's entry in the source table, to keep it distinct
+    # from package paths
+    binary_prefix = 'binary:'
+
+    def __init__(self, filename):
+        self.conn = sqlite3.connect(filename)
+        self.conn.executescript(self.schema)
+        self.deltas = collections.Counter()
+        self.changed = False
+
+    def sources(self):
+        """
+        Returns a dict mapping each source path to a tuple of its
+        `(size, mtime_ns, digest)`.
+        """
+        return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest
+                in self.conn.execute('select path, size, mtime_ns, digest from source')}
+
+    def _old_candidates(self, path):
+        row = self.conn.execute('select candidates from source where path=?', (path,)).fetchone()
+        if row is None:
+            return []
+        data = zlib.decompress(row[0]).decode('utf-8')
+        return data.split('\0') if data else []
+
+    def set_source(self, path, size, mtime_ns, candidates, digest=None):
+        """
+        Stores the candidates for `path`, replacing whatever it had before.
+        """
+        self.deltas.subtract(self._old_candidates(path))
+        self.deltas.update(candidates)
+        self.conn.execute('replace into source (path, size, mtime_ns, digest, candidates) values (?, ?, ?, ?, ?)',
+                (path, size, mtime_ns, digest, zlib.compress('\0'.join(sorted(candidates)).encode('utf-8'))))
+
+    def touch_source(self, path, size, mtime_ns):
+        """
+        Updates the size/mtime of `path`, whose contents haven't changed.
+        """
+        self.conn.execute('update source set size=?, mtime_ns=? where path=?', (size, mtime_ns, path))
+
+    def remove_source(self, path):
+        """
+        Removes `path` and its candidates.
+        """
+        self.deltas.subtract(self._old_candidates(path))
+        self.conn.execute('delete from source where path=?', (path,))
+
+    def flush(self):
+        """
+        Applies the accumulated candidate changes, and commits.  If there
+        were any, the recorded output stat gets cleared in the same
+        transaction, so that the output is known to be out of date until
+        it's been successfully rewritten (even if this run fails partway).
+        """
+        updates = [(name, delta) for name, delta in self.deltas.items() if delta != 0]
+        if updates:
+            self.changed = True
+            self.conn.executemany("""
+                insert into candidate (name, refs) values (?, ?)
+                on conflict (name) do update set refs=refs+excluded.refs
+                """, updates)
+            self.conn.execute('delete from candidate where refs <= 0')
+            self.conn.execute("delete from meta where key='output'")
+        self.deltas.clear()
+        self.conn.commit()
+
+    def iter_sorted(self):
+        """
+        Yields all our candidates, in sorted order.  (SQLite compares text
+        bytewise as UTF-8, which sorts the same as Python does.)
+        """
+        for (name,) in self.conn.execute('select name from candidate order by name'):
+            yield name
+
+    def __len__(self):
+        return self.conn.execute('select count(*) from candidate').fetchone()[0]
+
+    def get_meta(self, key):
+        row = self.conn.execute('select value from meta where key=?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.conn.execute('replace into meta (key, value) values (?, ?)', (key, value))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class CandidateSet:
+    """
+    Collects candidate strings, optionally spilling them to sorted run files
+    in `tmpdir` whenever more than `spill_threshold` are held in memory.
+    """
+
+    def __init__(self, tmpdir, spill_threshold=None):
+        self.tmpdir = tmpdir
+        self.spill_threshold = spill_threshold
+        self.strings = set()
+        self.runs = []
+
+    def update(self, strings):
+        self.strings.update(strings)
+        if self.spill_threshold is not None and len(self.strings) > self.spill_threshold:
+            self.spill()
+
+    def spill(self):
+        run_filename = os.path.join(self.tmpdir, f'run-{len(self.runs):04d}.txt')
+        with open(run_filename, 'w', encoding='utf-8') as df:
+            for string in sorted(self.strings):
+                print(string, file=df)
+        self.runs.append(run_filename)
+        self.strings = set()
+
+    def iter_sorted(self):
+        """
+        Yields all our unique strings, in sorted order.  Spilled runs get
+        merged on the fly.
+        """
+        if not self.runs:
+            yield from sorted(self.strings)
+            return
+        if self.strings:
+            self.spill()
+        files = [open(run_filename, encoding='utf-8') for run_filename in self.runs]
+        try:
+            prev = None
+            for string in heapq.merge(*[(line[:-1] for line in df) for df in files]):
+                if string != prev:
+                    yield string
+                    prev = string
+        finally:
+            for df in files:
+                df.close()
+
+    def __len__(self):
+        return len(self.strings)
+
+
+def update_binary(store, sources, filename):
+    """
+    Brings the candidates from the binary `filename` up to date in the
+    `CandidateCache` `store`.  The binary is only re-scanned if its hash has
+    changed (and only re-hashed if its size or mtime have).
+    """
+    key = store.binary_prefix + os.path.abspath(filename)
+    for path in sources:
+        if path.startswith(store.binary_prefix) and path != key:
+            store.remove_source(path)
+    stat = os.stat(filename)
+    old = sources.get(key)
+    if old is not None and old[:2] == (stat.st_size, stat.st_mtime_ns):
+        print(' - Binary unchanged')
+        return
+    digest, _ = pakhash.hash_file(filename)
+    if old is not None and old[2] == digest:
+        print(' - Binary unchanged (same hash)')
+        store.touch_source(key, stat.st_size, stat.st_mtime_ns)
+        return
+    store.set_source(key, stat.st_size, stat.st_mtime_ns,
+            set(binstrings.iter_identifiers(filename, jobs=jobs)), digest)
+
+
+def update_packages(store, sources, package_keys, executor):
+    """
+    Brings the candidates from all packages up to date in the
+    `CandidateCache` `store`.  `package_keys` is the current
+    `{path: (size, mtime_ns)}` for all packages, from the name cache.
+    Only new/changed packages get harvested (on `executor`).  Returns a
+    tuple of `(num_changed, num_removed)`.
+    """
+    changed = [(path, size, mtime_ns) for path, (size, mtime_ns) in package_keys.items()
+            if sources.get(path, (None, None))[:2] != (size, mtime_ns)]
+    removed = [path for path in sources
+            if not path.startswith(store.binary_prefix) and path not in package_keys]
+    chunk_size = max(1, min(2000, -(-len(changed)//harvest_shards)))
+    chunks = [changed[idx:idx+chunk_size] for idx in range(0, len(changed), chunk_size)]
+    for results in executor.map(harvest_files, itertools.repeat(data_dir), chunks):
+        for rel_path, size, mtime_ns, candidates in results:
+            store.set_source(rel_path, size, mtime_ns, candidates)
+    for path in removed:
+        store.remove_source(path)
+    return (len(changed), len(removed))
+
+
+def output_state(bnk_paths):
+    """
+    Returns a string describing everything other than the candidates
+    themselves which affects our output, so incremental runs can tell if
+    the output needs to be rewritten.
+    """
+    banks = None
+    if prune_to_bank_ids:
+        banks = []
+        for path in sorted(bnk_paths):
+            stat = os.stat(path)
+            banks.append((path, stat.st_size, stat.st_mtime_ns))
+    return json.dumps({
+        'collisions_to_remove': sorted(collisions_to_remove),
+        'collision_policy': collision_policy,
+        'prune_to_bank_ids': prune_to_bank_ids,
+        'bank_loose_scan': bank_loose_scan,
+        'banks': banks,
+        'output_filename': os.path.abspath(output_filename),
+        })
+
+
+def output_stat():
+    """
+    Returns a string with the size and mtime of our output file, or `None`
+    if it doesn't exist.
+    """
+    try:
+        stat = os.stat(output_filename)
+    except FileNotFoundError:
+        return None
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+if __name__ == '__main__':
+
+    with tempfile.TemporaryDirectory(prefix='wwnames-') as tmpdir:
+
+        store = None
+        if candidate_cache is not None:
+            store = CandidateCache(candidate_cache)
+            sources = store.sources()
+
+        # Grab strings from the main binary.  This gets the same strings as running
+        # `/usr/bin/strings -a` on it and keeping lines which match
+        # `^[a-zA-Z0-9][a-zA-Z0-9_]*$`, but in-process and in parallel.  (With
+        # binutils older than 2.39, that's more than plain `strings` used to
+        # find -- see `binstrings.py`.)
+        print(f'Grabbing main binary strings from: {osx_binary}')
+        if store is None:
+            potential_strings = CandidateSet(tmpdir, spill_threshold)
+            potential_strings.update(binstrings.iter_identifiers(osx_binary, jobs=jobs))
+        else:
+            update_binary(store, sources, osx_binary)
+
+        # Walk the object filesystem (via the persistent tree index, so that we
+        # don't have to re-list the whole thing each time).  Name catalogs come
+        # from a persistent cache, so only packages which have changed since the
+        # last run actually get parsed.  Harvesting the names from those is then
+        # split up by path across a process pool.  In incremental mode, only the
+        # changed packages get harvested at all.
+        print(f'Walking object filesystem from: {data_dir}')
+        start = time.perf_counter()
+        with treeindex.open_index(data_dir) as tree:
+            rel_paths = sorted(rel_path for rel_path, _, _, _ in tree.iter_files(('.uasset', '.umap')))
+            bnk_paths = [os.path.join(data_dir, rel_path) for rel_path, _, _, _ in tree.iter_files(('.bnk',))]
+        # `unpack_bl3.py` deletes the banks by default, and pruning against
+        # nothing would just write out an empty list
+        if prune_to_bank_ids and not bnk_paths:
+            raise RuntimeError(f'prune_to_bank_ids is set, but no .bnk files were found in {data_dir}'
+                    ' (unpack_bl3.py deletes them, unless "*.bnk" is taken out of its EXTRACTED_FILES_TO_DELETE)')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            with namecache.NameCache(data_dir) as cache:
+                cached, parsed, removed = namecache.update(cache, rel_paths, executor)
+                package_keys = cache.keys()
+            print(f' - Name catalogs: {cached} cached, {parsed} parsed, {removed} removed')
+
+            if store is None:
+                shard_size = max(1, -(-len(rel_paths)//harvest_shards))
+                shards = [rel_paths[idx:idx+shard_size] for idx in range(0, len(rel_paths), shard_size)]
+                futures = [executor.submit(harvest_shard, data_dir, shard[0], shard[-1]) for shard in shards]
+                for future in concurrent.futures.as_completed(futures):
+                    potential_strings.update(future.result())
+                print(f' - Harvested {len(rel_paths)} packages in {time.perf_counter()-start:.1f}s')
+                iter_sorted = potential_strings.iter_sorted
+            else:
+                num_changed, num_removed = update_packages(store, sources, package_keys, executor)
+                store.flush()
+                print(f' - Harvested {num_changed} new/changed packages ({num_removed} removed)'
+                        f' in {time.perf_counter()-start:.1f}s')
+                iter_sorted = store.iter_sorted
+
+                # If nothing's changed since the last run, we're done
+                state = output_state(bnk_paths)
+                if not store.changed and store.get_meta('state') == state \
+                        and store.get_meta('output') == output_stat():
+                    print(f'No changes; {output_filename} is already up to date')
+                    store.close()
+                    sys.exit(0)
+
+            # Grab all the IDs from the soundbanks, if we're pruning
+            bank_ids = None
+            if prune_to_bank_ids:
+                start = time.perf_counter()
+                bank_ids = set()
+                for ids in executor.map(wwisebnk.try_bank_ids, bnk_paths, [bank_loose_scan]*len(bnk_paths)):
+                    bank_ids |= ids
+                print(f'Found {len(bank_ids)} Wwise IDs in {len(bnk_paths)} banks in {time.perf_counter()-start:.1f}s')
+                if not bank_ids:
+                    raise RuntimeError(f'No Wwise IDs could be read from any of the {len(bnk_paths)} banks')
+
+        def iter_candidates():
+            """
+            Yields our candidates in sorted order, skipping any whose IDs
+            aren't found in the banks, if we're pruning.
+            """
+            if bank_ids is None:
+                return iter_sorted()
+            return (name for name, h in wwisehash.iter_hashes(iter_sorted())
+                    if h in bank_ids)
+
+        def iter_checked_candidates():
+            """
+            Yields our candidates (as with `iter_candidates()`), making a note
+            of which of our known collisions turn up along the way.
+            """
+            for name in iter_candidates():
+                if name in collisions_to_remove:
+                    known_collisions_found.add(name)
+                yield name
+
+        # Find Wwise ID collisions, and figure out what to remove
+        start = time.perf_counter()
+        known_collisions_found = set()
+        collisions = wwisehash.find_collisions(iter_checked_candidates)
+        policy = wwisehash.policies[collision_policy](collisions_to_remove)
+        to_remove, unresolved = wwisehash.resolve_collisions(collisions, policy)
+        print(f'Found {len(collisions)} Wwise ID collision group(s) in {time.perf_counter()-start:.1f}s:')
+        wwisehash.report_collisions(collisions, to_remove | collisions_to_remove)
+        if unresolved:
+            print(f'WARNING: {len(unresolved)} collision group(s) unresolved by the "{collision_policy}" policy')
+
+        # Make sure all our known collisions were actually found, before we
+        # touch the output file.  (If we're pruning, known collisions may well
+        # have been pruned already.)
+        remaining_collisions = collisions_to_remove - known_collisions_found
+        if remaining_collisions and bank_ids is None:
+            if store is not None:
+                store.close()
+            raise KeyError('Collisions not found in candidates: {}'.format(', '.join(sorted(remaining_collisions))))
+
+        # Process our known collisions (and any the policy picked), and write out
+        to_remove |= collisions_to_remove
+        written = 0
+        with open(output_filename, 'w') as df:
+            print(f'Writing out to: {output_filename}')
+            print('# Borderlands 3', file=df)
+            print('', file=df)
+            for event in iter_candidates():
+                if event not in to_remove:
+                    print(event, file=df)
+                    written += 1
+        print(f' - Wrote {written} names')
 
+        if store is not None:
+            store.set_meta('state', output_state(bnk_paths))
+            store.set_meta('output', output_stat())
+            store.close()
@@ -21,9 +21,13 @@
 # 
 # 3. This notice may not be removed or altered from any source distribution.
 
+import io
 import os
 import sys
+import time
 import argparse
+import contextlib
+import concurrent.futures
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 
@@ -34,18 +38,120 @@ from Crypto.Random import get_random_bytes
 ### of the file, but *that* key is encrypted using the first 32 bits of the
 ### encrypted file itself.  Just an extra little bit of obfuscation for us all.
 ###
+### Both directions stream the data through in chunks, rather than reading the
+### whole file into memory.  The `*_db()` functions still work on bytes, for
+### anything which wants them.
+###
+
+# Files are processed in chunks of this size (which must be a multiple of
+# the AES block size), so memory use stays constant regardless of how big
+# the database is.
+DEFAULT_CHUNK_SIZE = 4*1024*1024
 
 def decrypt(key, data):
     cipher = AES.new(key, AES.MODE_ECB)
     return cipher.decrypt(data)
 
+def _read_full(df, view):
+    """
+    Reads from `df` into the memoryview `view` until it's full or we hit
+    EOF, and returns the number of bytes read.
+    """
+    total = 0
+    while total < len(view):
+        num_read = df.readinto(view[total:])
+        if not num_read:
+            break
+        total += num_read
+    return total
+
+def _write_nuls(odf, count, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Writes `count` NULs to `odf`, without ever building a buffer of more
+    than `chunk_size` bytes.
+    """
+    nuls = bytes(min(count, chunk_size))
+    while count > 0:
+        odf.write(nuls[:count])
+        count -= len(nuls)
+
+def decrypt_stream(df, odf, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decrypts the (seekable) encrypted file object `df` into the file
+    object `odf`, and returns the encryption key.  Trailing NULs are
+    stripped, as with `decrypt_db()`: runs of NULs at the end of a chunk
+    are held back (as a count) and only written out once we know some
+    non-NUL data follows them.
+    """
+    size = df.seek(0, os.SEEK_END)
+    if size < 32 or size % 16 != 0:
+        raise ValueError(f'Invalid encrypted file size: {size}')
+    df.seek(0)
+    header = df.read(32)
+    df.seek(size-32)
+    key = decrypt(header, df.read(32))
+    df.seek(0)
+
+    cipher = AES.new(key, AES.MODE_ECB)
+    in_buf = memoryview(bytearray(chunk_size))
+    out_buf = memoryview(bytearray(chunk_size))
+    remaining = size - 32
+    pending_nuls = 0
+    while remaining > 0:
+        num_read = _read_full(df, in_buf[:min(chunk_size, remaining)])
+        if num_read == 0:
+            raise ValueError('Unexpected end of file')
+        remaining -= num_read
+        plain = out_buf[:num_read]
+        cipher.decrypt(in_buf[:num_read], output=plain)
+        if plain[-1] == 0:
+            # Only bother looking for the end of the data if the chunk
+            # actually ends in NULs, which should just be the final one
+            data_len = len(bytes(plain).rstrip(b'\x00'))
+        else:
+            data_len = num_read
+        if data_len > 0:
+            _write_nuls(odf, pending_nuls, chunk_size)
+            odf.write(plain[:data_len])
+            pending_nuls = 0
+        pending_nuls += num_read - data_len
+    return key
+
 def decrypt_db(data):
     """
     Returns a tuple -- the first element is the encryption key, and the
     second is the decrypted file data.
     """
-    key = decrypt(data[:32], data[-32:])
-    return (key, decrypt(key, data[:-32]).rstrip(b'\x00'))
+    odf = io.BytesIO()
+    key = decrypt_stream(io.BytesIO(data), odf)
+    return (key, odf.getvalue())
+
+@contextlib.contextmanager
+def _replace_on_success(output_filename):
+    """
+    Context manager which yields a file object for a temporary file next to
+    `output_filename`, which only gets moved into place if everything
+    succeeds.  Otherwise it's removed, so a failure never leaves a partial
+    (or empty) output file behind, or clobbers an existing one.
+    """
+    temp_filename = f'{output_filename}.tmp{os.getpid()}'
+    try:
+        with open(temp_filename, 'wb') as odf:
+            yield odf
+        os.replace(temp_filename, output_filename)
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+def decrypt_file(filename, output_filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decrypts `filename` into `output_filename`, and returns the encryption
+    key.
+    """
+    with open(filename, 'rb') as df:
+        with _replace_on_success(output_filename) as odf:
+            return decrypt_stream(df, odf, chunk_size)
 
 def encrypt(key, data):
     cipher = AES.new(key, AES.MODE_ECB)
@@ -58,27 +164,155 @@ def encrypt(key, data):
         num_to_pad = 16 - (len(data) % 16)
     return cipher.encrypt(data + b'\x00'*num_to_pad)
 
+def encrypt_stream(key, df, odf, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts the file object `df` into the file object `odf` using `key`.
+    The encrypted key gets written at the end, using the first 32 bytes of
+    the encrypted data as *its* key.
+    """
+    cipher = AES.new(key, AES.MODE_ECB)
+    in_buf = memoryview(bytearray(chunk_size))
+    out_buf = memoryview(bytearray(chunk_size))
+    header = b''
+    while True:
+        num_read = _read_full(df, in_buf)
+        if num_read == 0:
+            break
+        # Only the final chunk can be short, so that's the only one which
+        # might need padding (see `encrypt()`)
+        if num_read % 16 != 0:
+            padded_len = num_read + 16 - (num_read % 16)
+            in_buf[num_read:padded_len] = bytes(padded_len - num_read)
+        else:
+            padded_len = num_read
+        encrypted = out_buf[:padded_len]
+        cipher.encrypt(in_buf[:padded_len], output=encrypted)
+        if len(header) < 32:
+            header += bytes(encrypted[:32-len(header)])
+        odf.write(encrypted)
+    odf.write(encrypt(header, key))
+
 def encrypt_db(key, data):
-    main_bit = encrypt(key, data)
-    return main_bit + encrypt(main_bit[:32], key)
+    odf = io.BytesIO()
+    encrypt_stream(key, io.BytesIO(data), odf)
+    return odf.getvalue()
+
+def encrypt_file(key, filename, output_filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts `filename` into `output_filename` using `key`.
+    """
+    with open(filename, 'rb') as df:
+        with _replace_on_success(output_filename) as odf:
+            encrypt_stream(key, df, odf, chunk_size)
+
+def output_filenames(filename, decrypt_mode, output=None, key=None):
+    """
+    Returns a tuple of the output filename and key filename to use for
+    `filename`.  When decrypting, those are `<filename>.decrypted` and
+    `<filename>.key`.  When encrypting a `.decrypted` file, they're the
+    original filename with `.new` and `.key`.  `output` and `key` override
+    those, if given.  Either may be `None` if we can't figure it out.
+    """
+    if decrypt_mode:
+        output_filename = '{}.decrypted'.format(filename)
+        key_filename = '{}.key'.format(filename)
+    else:
+        output_filename = None
+        key_filename = None
+        if filename.endswith('.decrypted'):
+            output_filename = '{}.new'.format(filename[:-10])
+            key_filename = '{}.key'.format(filename[:-10])
+    if output:
+        output_filename = output
+    if key:
+        key_filename = key
+    return (output_filename, key_filename)
+
+def expand_filenames(filenames, decrypt_mode):
+    """
+    Expands any directories in `filenames` into the files inside them which
+    we'd want to process: `.decrypted` files when encrypting, and `.dat`
+    files (ie: the databases themselves) when decrypting.  Plain filenames
+    are passed through as-is.  Files which show up more than once (for
+    instance, a directory plus a file inside it) are only returned once.
+    """
+    expanded = []
+    seen = set()
+    for filename in filenames:
+        if os.path.isdir(filename):
+            if decrypt_mode:
+                extension = '.dat'
+            else:
+                extension = '.decrypted'
+            to_add = [entry.path for entry in sorted(os.scandir(filename), key=lambda entry: entry.name)
+                    if entry.is_file() and entry.name.endswith(extension)]
+        else:
+            to_add = [filename]
+        for path in to_add:
+            real_path = os.path.realpath(path)
+            if real_path not in seen:
+                seen.add(real_path)
+                expanded.append(path)
+    return expanded
 
-def check_overwrite(filename, args):
-    if os.path.exists(filename):
-        if args.force:
+def check_overwrite(filenames, args):
+    """
+    Checks all of `filenames` at once, and asks (just once) whether it's
+    okay to overwrite any which already exist, unless we've been told to
+    force it.
+    """
+    existing = [filename for filename in filenames if os.path.exists(filename)]
+    if not existing:
+        return
+    if args.force:
+        for filename in existing:
             print(f'WARNING: Overwriting {filename}')
+    else:
+        if len(existing) == 1:
+            resp = input(f'{existing[0]} already exists!  Overwrite [y/N]? ')
         else:
-            resp = input(f'{filename} already exists!  Overwrite [y/N]? ')
-            resp = resp.strip().lower()
-            if resp == 'y':
-                return
-            else:
-                print('Exiting!')
-                sys.exit(1)
+            for filename in existing:
+                print(f'Already exists: {filename}')
+            resp = input(f'{len(existing)} files already exist!  Overwrite them all [y/N]? ')
+        resp = resp.strip().lower()
+        if resp == 'y':
+            return
+        else:
+            print('Exiting!')
+            sys.exit(1)
+
+def process_file(filename, output_filename, key_filename, decrypt_mode, randomize=False):
+    """
+    Decrypts or encrypts a single file, writing out the key file too, when
+    decrypting.  Returns the number of seconds it took.  Suitable for use
+    as a process pool worker.
+    """
+    start = time.perf_counter()
+    if decrypt_mode:
+        key = decrypt_file(filename, output_filename)
+        with open(key_filename, 'wb') as kdf:
+            kdf.write(key)
+    else:
+        if randomize:
+            key = get_random_bytes(32)
+        else:
+            with open(key_filename, 'rb') as kdf:
+                key = kdf.read()
+        encrypt_file(key, filename, output_filename)
+    return time.perf_counter() - start
 
 def main():
 
     parser = argparse.ArgumentParser(
             description='Decrypt or Encrypt InventorySerialNumberDatabase.dat files from BL3/TTWL',
+            epilog="""Any number of files (or directories) can be given.  Files
+            in directories are processed if they've got a `.decrypted`
+            extension (when encrypting), or a `.dat` extension (when
+            decrypting).  When processing more than one
+            file, -o/--output and -k/--key can't be used, and the files are
+            processed in parallel.  Overwrite checks happen before anything
+            gets processed.
+            """,
             )
 
     action = parser.add_mutually_exclusive_group(required=True)
@@ -124,73 +358,81 @@ def main():
             help='Force overwrite of files, if they already exist.',
             )
 
+    parser.add_argument('-j', '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes to use when processing more than one file.',
+            )
+
     parser.add_argument('filename',
-            nargs=1,
-            help='Filename to decrypt/encrypt',
+            nargs='+',
+            help='Filenames (or directories) to decrypt/encrypt',
             )
 
     # Parse args
     args = parser.parse_args()
-    args.filename = args.filename[0]
+    filenames = expand_filenames(args.filename, args.decrypt)
+    if not filenames:
+        print('No files found to process!')
+        sys.exit(1)
+    if len(filenames) > 1 and (args.output or args.key):
+        parser.error('-o/--output and -k/--key can only be used with a single file')
 
     # Figure out what filenames we're using
-    if args.decrypt:
-        output_filename = '{}.decrypted'.format(args.filename)
-        key_filename = '{}.key'.format(args.filename)
-    else:
-        output_filename = None
-        key_filename = None
-        if args.filename.endswith('.decrypted'):
-            output_filename = '{}.new'.format(args.filename[:-10])
-            key_filename = '{}.key'.format(args.filename[:-10])
-    if args.output:
-        output_filename = args.output
-    if args.key:
-        key_filename = args.key
-
-    # Check to make sure we've got the filenames we need
-    if output_filename is None:
-        raise RuntimeError('No output filename specified')
-    if key_filename is None:
-        raise RuntimeError('No key filename specified')
-
-    # Check to see if our output file already exists
-    check_overwrite(output_filename, args)
-
-    # Do the work
-    if args.decrypt:
+    jobs = []
+    for filename in filenames:
+        output_filename, key_filename = output_filenames(filename, args.decrypt, args.output, args.key)
 
-        # Check to see if our output key file already exists
-        check_overwrite(key_filename, args)
+        # Check to make sure we've got the filenames we need
+        if output_filename is None:
+            raise RuntimeError(f'No output filename specified for {filename}')
+        if key_filename is None:
+            raise RuntimeError(f'No key filename specified for {filename}')
 
-        # Decrypt!
-        with open(args.filename, 'rb') as df:
-            with open(output_filename, 'wb') as odf:
-                with open(key_filename, 'wb') as kdf:
-                    key, decrypted = decrypt_db(df.read())
-                    odf.write(decrypted)
-                    kdf.write(key)
-        print(f'Wrote to: {output_filename}')
-        print(f'Wrote key to: {key_filename}')
+        jobs.append((filename, output_filename, key_filename))
 
+    # Check to see if our output files (and key files, if decrypting)
+    # already exist, and if we're missing key files (if encrypting).
+    if args.decrypt:
+        check_overwrite([f for _, output_filename, key_filename in jobs for f in (output_filename, key_filename)], args)
     else:
-
-        # Read in our key (or randomize a new one)
-        if args.randomize:
-            key = get_random_bytes(32)
-        else:
-            if not os.path.exists(key_filename):
-                print(f'WARNING: {key_filename} does not exist.  Decrypt the original file, first.')
+        if not args.randomize:
+            missing = [key_filename for _, _, key_filename in jobs if not os.path.exists(key_filename)]
+            if missing:
+                for key_filename in missing:
+                    print(f'WARNING: {key_filename} does not exist.  Decrypt the original file, first.')
                 sys.exit(1)
-            with open(key_filename, 'rb') as kdf:
-                key = kdf.read()
+        check_overwrite([output_filename for _, output_filename, _ in jobs], args)
 
-        # Encrypt!
-        with open(args.filename, 'rb') as df:
-            with open(output_filename, 'wb') as odf:
-                odf.write(encrypt_db(key, df.read()))
-        print(f'Wrote to: {output_filename}')
+    # Do the work
+    start = time.perf_counter()
+    errors = 0
+    if len(jobs) == 1:
+        filename, output_filename, key_filename = jobs[0]
+        seconds = process_file(filename, output_filename, key_filename, args.decrypt, args.randomize)
+        print(f'Wrote to: {output_filename} ({seconds:.2f}s)')
+        if args.decrypt:
+            print(f'Wrote key to: {key_filename}')
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {executor.submit(process_file,
+                filename, output_filename, key_filename, args.decrypt, args.randomize): (filename, output_filename)
+                for filename, output_filename, key_filename in jobs}
+            for future in concurrent.futures.as_completed(futures):
+                filename, output_filename = futures[future]
+                try:
+                    seconds = future.result()
+                    print(f'{filename} -> {output_filename} ({seconds:.2f}s)')
+                except Exception as e:
+                    print(f'ERROR processing {filename}: {e}')
+                    errors += 1
+        print('Processed {} file(s) in {:.2f}s{}'.format(
+            len(jobs)-errors,
+            time.perf_counter()-start,
+            f', {errors} failed' if errors else '',
+            ))
+    if errors:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
-
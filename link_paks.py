@@ -28,9 +28,11 @@
 
 import os
 import sys
+import time
+import pakhash
 import paksort
+import pakprobe
 import argparse
-import subprocess
 
 ###
 ### Yet more overengineered nonsense!  First up, control vars
@@ -56,10 +58,8 @@ dlc_dirs = {
         'Ixora': 'AdditionalContent/Ixora/Paks',
         }
 
-# Checksum information.  Using an external binary here on the assumption that it's
-# likely to be faster than doing it in Python, though perhaps the difference would
-# be negligible at best.
-checksum_util = '/usr/bin/sha256sum'
+# Checksum information.  Hashing is done in-process (see pakhash.py), with several
+# paks being hashed at once; output is in the same format as `sha256sum`.
 checksum_template = 'checksums-sha256sum-{}.txt'
 
 ###
@@ -82,17 +82,217 @@ parser.add_argument('-s', '--store',
         help='Store from which to link paks',
         )
 
+parser.add_argument('-v', '--verify',
+        action='store_true',
+        help="""Instead of linking, verify the linked paks in the given pakdirs
+            (or all pakdirs, if none are given) against {}""".format(checksum_template.format('<store>')),
+        )
+
+parser.add_argument('-p', '--probe',
+        action='store_true',
+        help="""Instead of linking, quickly check whether the linked paks in the given
+            pakdirs (or all pakdirs, if none are given) have changed since they were
+            last checksummed, by comparing their fingerprints against the checksum
+            cache""",
+        )
+
 parser.add_argument('-c', '--checksum',
         action='store_true',
         help='Also write checksums to {}'.format(checksum_template.format('<store>')),
         )
 
+parser.add_argument('--cache',
+        type=str,
+        default=pakhash.DEFAULT_CACHE_FILE,
+        help='Cache file for pak checksums, so unchanged paks don\'t need re-hashing',
+        )
+
+parser.add_argument('--no-cache',
+        action='store_true',
+        help='Don\'t use the checksum cache (always re-hash every pak)',
+        )
+
+parser.add_argument('-j', '--jobs',
+        type=int,
+        default=pakhash.DEFAULT_JOBS,
+        help='Number of paks to checksum at once',
+        )
+
 parser.add_argument('pakdir',
-        nargs='+',
+        nargs='*',
         help='Pakfile dirs to process',
         )
 
 args = parser.parse_args()
+if not args.verify and not args.probe and not args.pakdir:
+    parser.error('At least one pakdir must be specified')
+if args.verify and args.probe:
+    parser.error('-v/--verify and -p/--probe cannot be used together')
+
+###
+### Verification mode
+###
+
+def verify(store, pakdirs, jobs):
+    """
+    Hashes all the linked paks in `pakdirs` and compares them against the
+    checksum file for `store`.  Paks whose checksum is recorded as `n/a`
+    are known not to match anymore (five paks from the steam_xplay patch
+    were overwritten by the next patch), so those are skipped.  Returns
+    `True` if everything matched.
+    """
+    checksum_filename = checksum_template.format(store)
+    checksums = pakhash.ChecksumFile(checksum_filename)
+    print('Verifying paks against {}'.format(checksum_filename))
+
+    # Build up our list of paks to hash.  Dirs with no checksums recorded
+    # at all are reported but otherwise ignored.
+    to_hash = []
+    missing = []
+    extras = []
+    expected = []
+    for dirname in pakdirs:
+        dirname = dirname.rstrip('/')
+        section = checksums.sections.get(dirname)
+        if section is None:
+            print('  - No checksums recorded for {}, skipping'.format(dirname))
+            continue
+        if os.path.isdir(dirname):
+            linked = set(f for f in os.listdir(dirname) if f.endswith('.pak'))
+        else:
+            linked = set()
+        for pakfile, digest in section.entries.items():
+            full_path = os.path.join(dirname, pakfile)
+            if digest == 'n/a':
+                expected.append(full_path)
+            elif pakfile not in linked or not os.path.exists(full_path):
+                missing.append(full_path)
+            else:
+                to_hash.append((full_path, digest))
+        for pakfile in sorted(linked - set(section.entries.keys())):
+            extras.append(os.path.join(dirname, pakfile))
+
+    # Now hash 'em all.  A few pakdirs link to the same file (as with
+    # those overwritten steam_xplay paks), so only hash each file once.
+    real_paths = {}
+    for full_path, _ in to_hash:
+        real_paths.setdefault(os.path.realpath(full_path), full_path)
+    print('  - Hashing {} paks with {} workers...'.format(len(real_paths), jobs))
+    start = time.perf_counter()
+    total = 0
+    results = {}
+    for real_path, result in zip(real_paths.keys(), pakhash.hash_files(real_paths.keys(), jobs=jobs)):
+        results[real_path] = result
+        if result.error is None:
+            total += result.size
+    elapsed = time.perf_counter()-start
+
+    # Report
+    mismatches = []
+    errors = []
+    matched = 0
+    for full_path, digest in to_hash:
+        result = results[os.path.realpath(full_path)]
+        if result.error:
+            errors.append((full_path, result.error))
+        elif result.digest != digest:
+            mismatches.append((full_path, digest, result.digest))
+        else:
+            matched += 1
+    print('')
+    print('Matched: {}'.format(matched))
+    if mismatches:
+        print('Mismatched: {}'.format(len(mismatches)))
+        for full_path, expected_digest, actual_digest in mismatches:
+            print('  - {}'.format(full_path))
+            print('    expected: {}'.format(expected_digest))
+            print('      actual: {}'.format(actual_digest))
+    if errors:
+        print('Errors: {}'.format(len(errors)))
+        for full_path, error in errors:
+            print('  - {}: {}'.format(full_path, error))
+    if missing:
+        print('Missing: {}'.format(len(missing)))
+        for full_path in missing:
+            print('  - {}'.format(full_path))
+    if extras:
+        print('Extra (no checksum recorded): {}'.format(len(extras)))
+        for full_path in extras:
+            print('  - {}'.format(full_path))
+    if expected:
+        print('Skipped (known to be overwritten): {}'.format(len(expected)))
+        for full_path in expected:
+            print('  - {}'.format(full_path))
+    print('')
+    print('Hashed {}'.format(pakhash.format_rate(total, elapsed)))
+
+    return not (mismatches or errors or missing or extras)
+
+###
+### Probe mode
+###
+
+def probe(pakdirs, cache):
+    """
+    Fingerprints all the linked paks in `pakdirs` (see pakprobe.py) and
+    compares them to the fingerprints in the checksum cache, which is much
+    quicker than hashing them all.  Returns `True` if none have changed.
+    """
+    print('Probing paks against {}'.format(cache.filename))
+    start = time.perf_counter()
+    num_probed = 0
+    changed = []
+    unknown = []
+    errors = []
+    for dirname in pakdirs:
+        dirname = dirname.rstrip('/')
+        if not os.path.isdir(dirname):
+            print('  - {} is not a directory, skipping'.format(dirname))
+            continue
+        for pakfile in sorted([paksort.PakFile(f) for f in os.listdir(dirname) if f.endswith('.pak')]):
+            full_path = os.path.join(dirname, pakfile.filename)
+            try:
+                result = pakprobe.probe(full_path)
+            except (OSError, ValueError) as e:
+                print('  ! {}: {}'.format(full_path, e))
+                errors.append(full_path)
+                continue
+            num_probed += 1
+            cached = cache.get_fingerprint(full_path)
+            if cached is None:
+                status = 'unknown'
+                unknown.append(full_path)
+            elif cached[0] != result.fingerprint:
+                status = 'CHANGED'
+                changed.append(full_path)
+            else:
+                status = 'unchanged'
+            print('  - {}: {} ({:.1f}ms)'.format(full_path, status, result.seconds*1000))
+    print('')
+    print('Probed {} paks in {:.1f}s: {} changed, {} not in cache, {} errors'.format(
+        num_probed,
+        time.perf_counter()-start,
+        len(changed),
+        len(unknown),
+        len(errors),
+        ))
+    if changed or unknown:
+        print('Use -c/--checksum on the relevant pakdirs to update checksums.')
+    return not (changed or errors)
+
+if args.verify or args.probe:
+    if args.pakdir:
+        pakdirs = args.pakdir
+    else:
+        pakdirs = sorted(d for d in os.listdir('.') if d.startswith('pak-') and os.path.isdir(d))
+    if args.verify:
+        success = verify(args.store, pakdirs, args.jobs)
+    else:
+        success = probe(pakdirs, pakhash.HashCache(args.cache))
+    if success:
+        sys.exit(0)
+    else:
+        sys.exit(1)
 
 ###
 ### Now do the work
@@ -100,6 +300,15 @@ args = parser.parse_args()
 
 print('Processing symlinks for store: {}'.format(args.store))
 
+if args.checksum:
+    checksum_filename = checksum_template.format(args.store)
+    checksums = pakhash.ChecksumFile(checksum_filename)
+    checksums_changed = False
+    if args.no_cache:
+        cache = None
+    else:
+        cache = pakhash.HashCache(args.cache)
+
 for dirname in args.pakdir:
 
     # Sanitize input
@@ -178,23 +387,40 @@ for dirname in args.pakdir:
         len(advertised_paks),
         ))
 
-    # Write checksums, if we've been told to
+    # Compute checksums, if we've been told to.  Paks which haven't changed since
+    # we last hashed them will come from the cache, and existing entries in the
+    # checksum file get updated in place.
     if args.checksum:
-        print('  - Writing checksums...')
-        checksum_filename = checksum_template.format(args.store)
-        with open(checksum_filename, 'a') as df:
-            os.chdir(dirname)
-            print(dirname, file=df)
-            print('', file=df)
-            for pakfile in sorted([paksort.PakFile(f) for f in advertised_paks.values()]):
-                print('    + {}'.format(pakfile))
-                cp = subprocess.run([checksum_util, pakfile.filename], capture_output=True, encoding='utf-8')
-                df.write(cp.stdout)
-                if len(cp.stderr) > 0:
-                    df.write(cp.stderr)
-                if cp.returncode != 0:
-                    print('WARNING: "{} {}" left return code {}'.format(checksum_util, pakfile, cp.returncode), file=df)
-                    print('    ! WARNING: {} left return code {}'.format(checksum_util, cp.returncode))
-            print('', file=df)
-            os.chdir('..')
+        print('  - Computing checksums...')
+        pakfiles = sorted([paksort.PakFile(f) for f in advertised_paks.values()])
+        start = time.perf_counter()
+        total = 0
+        for pakfile, result in zip(pakfiles, pakhash.hash_files(
+                [os.path.join(dirname, p.filename) for p in pakfiles],
+                jobs=args.jobs,
+                cache=cache)):
+            if result.error:
+                print('    ! WARNING: could not checksum {}: {}'.format(pakfile, result.error))
+                continue
+            if result.probed:
+                status = 'fingerprint unchanged'
+            elif result.cached:
+                status = 'cached'
+            else:
+                status = 'hashed'
+                total += result.size
+            if checksums.set(dirname, pakfile.filename, result.digest):
+                checksums_changed = True
+                status += ', updated'
+            print('    + {} ({})'.format(pakfile, status))
+        print('  - Checksummed {}'.format(pakhash.format_rate(total, time.perf_counter()-start)))
 
+# Write out checksums
+if args.checksum:
+    if cache is not None:
+        cache.save()
+    if checksums_changed:
+        print('Writing {}'.format(checksum_filename))
+        checksums.write()
+    else:
+        print('No changes to {}'.format(checksum_filename))
@@ -34,8 +34,12 @@
 import os
 import re
 import sys
-import lzma
 import paksort
+import xzblocks
+import pathtable
+import pakcontents
+import pakfile_search
+import array
 import argparse
 import subprocess
 
@@ -47,6 +51,9 @@ parser = argparse.ArgumentParser(
             contents-<dirname>.txt.xz.  That file will describe the
             contents of all the pakfiles found in that dir, skipping over
             .wem/.bnk files (since I don't personally care about those).
+            A machine-readable version including the .wem/.bnk files
+            will also be written to contents-<dirname>.jsonl.xz (see
+            pakcontents.py).
             If the --database flag is specified, this util will insert
             full information about the patch to the database.  Setting
             this up is left as an excercise for the reader.
@@ -58,6 +65,30 @@ parser.add_argument('-d', '--database',
         help='Also import pakfile contents to pakfile database (mostly just useful for Apocalyptech)',
         )
 
+parser.add_argument('-s', '--search-index',
+        action='store_true',
+        help='Also update the local wildcard search database (see pakfile_search.py)',
+        )
+
+parser.add_argument('--search-db',
+        type=str,
+        default=pakfile_search.default_db,
+        help='Wildcard search database to update, with -s/--search-index',
+        )
+
+parser.add_argument('-p', '--preset',
+        type=int,
+        choices=range(10),
+        default=xzblocks.DEFAULT_PRESET,
+        help='xz compression preset to use for the contents file',
+        )
+
+parser.add_argument('-t', '--threads',
+        type=int,
+        default=xzblocks.default_threads(),
+        help='Number of threads to use while compressing the contents file',
+        )
+
 parser.add_argument('pakdir',
         nargs=1,
         help='Patch dir (containing paks) to process')
@@ -112,21 +143,33 @@ class Pakfile:
         return f'Pakfile<{self.filename}>'
 
 class GameObject:
+    # There are a *lot* of these, so known objects don't actually get stored
+    # as GameObjects at all (see the PathTable/Membership stuff below); this
+    # is just used while adding new ones.  In the database, paths are split
+    # into a directory (stored once, in the `directory` table, with a
+    # trailing slash), a base filename (which is what the web lookup
+    # searches on), and an extension.
 
-    def __init__(self, oid, filename_full, filename_base=None):
+    __slots__ = ('oid', 'filename_full', 'dirname', 'filename_base', 'extension')
+
+    def __init__(self, oid, filename_full):
         self.oid = oid
         self.filename_full = filename_full
-        if filename_base:
-            self.filename_base = filename_base
-        else:
-            self.filename_base = filename_full.split('/')[-1].rsplit('.', 1)[0]
-        self.pakfiles = set()
+        self.dirname, self.filename_base, self.extension = GameObject.split_path(filename_full)
 
     @staticmethod
-    def from_db(row):
-        return GameObject(oid=row['oid'],
-                filename_full=row['filename_full'],
-                filename_base=row['filename_base'])
+    def split_path(path):
+        """
+        Splits `path` into a tuple of directory name (including its trailing
+        slash, or an empty string if there's no directory), base filename,
+        and extension (including its leading dot, or an empty string if
+        there's no extension).
+        """
+        dirname, slash, filename = path.rpartition('/')
+        base, dot, extension = filename.rpartition('.')
+        if not dot:
+            base, extension = extension, ''
+        return (dirname + slash, base, dot + extension)
 
     def __str__(self):
         return self.filename_full
@@ -146,8 +189,29 @@ if args.database:
     patches_by_id = {}
     pakfiles = {}
     pakfiles_by_id = {}
-    objects = {}
-    objects_by_id = {}
+
+    # Objects are stored compactly, since there are hundreds of thousands of
+    # them: `objects` is a case-insensitive PathTable of their full in-pak
+    # filenames, `object_oids` and `object_real_dids` map PathTable IDs to
+    # DB IDs and real-path directory IDs, and `object_paks` maps DB IDs to
+    # the pakfiles they're found in.  `directories` maps (casefolded)
+    # directory names to their DB IDs.
+    objects = pathtable.PathTable()
+    object_oids = array.array('i')
+    object_real_dids = array.array('i')
+    object_paks = pathtable.Membership()
+    directories = {}
+
+    def get_directory_id(dirname):
+        """
+        Returns the DB ID for the given directory name, adding it to the
+        database if it's not already present.
+        """
+        key = dirname.casefold()
+        if key not in directories:
+            curs.execute('insert into directory (dirname) values (%s)', (dirname,))
+            directories[key] = curs.lastrowid
+        return directories[key]
 
     # Read in databae params
     config_dir = appdirs.user_config_dir('bl3pakfile')
@@ -180,29 +244,39 @@ if args.database:
         pakfiles[pakfile.filename] = pakfile
         pakfiles_by_id[pakfile.fid] = pakfile
 
-    # Read in known objects
-    curs.execute('select * from object')
-    for row in curs:
-        gameobject = GameObject.from_db(row)
-        assert(gameobject.filename_full not in objects)
-        objects[gameobject.filename_full.lower()] = gameobject
-        objects_by_id[gameobject.oid] = gameobject
+    # Read in known objects.  Using an unbuffered cursor for these big ones,
+    # so we don't have the whole resultset in memory at once.
+    ss_curs = db.cursor(MySQLdb.cursors.SSDictCursor)
+    ss_curs.execute('select did, dirname from directory')
+    for row in ss_curs:
+        directories[row['dirname'].casefold()] = row['did']
+    ss_curs.execute("""
+        select o.oid, o.real_did, concat(d.dirname, o.filename_base, o.extension) filename_full
+        from object o, directory d
+        where d.did=o.did
+        """)
+    for row in ss_curs:
+        path_id = objects.add(row['filename_full'])
+        assert(path_id == len(object_oids))
+        object_oids.append(row['oid'])
+        object_real_dids.append(row['real_did'])
 
     # Read in known object-to-pakfile mappings
-    curs.execute('select * from o2f')
-    for row in curs:
-        gameobject = objects_by_id[row['oid']]
-        gameobject.pakfiles.add(row['fid'])
+    ss_curs.execute('select oid, fid from o2f')
+    for row in ss_curs:
+        object_paks.add(row['oid'], row['fid'])
+    ss_curs.close()
 
 # Some regular expressions we'll use to parse
 mount_re = re.compile(r'Display: Mount point (.*)$')
-file_re = re.compile(r'Display: "(.*)" offset')
+file_re = re.compile(r'Display: "(.*)" offset(: \d+, size: (?P<size>\d+) bytes, sha1: (?P<sha1>[0-9A-Fa-f]+))?')
 patchdate_re = re.compile(r'^pak-(\d{4}-\d{2}-\d{2})-.*$')
 
 # Some other vars
 dir_to_process = args.pakdir[0]
 os.environ['WINEPREFIX'] = '/usr/local/winex/testing'
 out_file = 'contents-{}.txt.xz'.format(dir_to_process)
+structured_file = pakcontents.filename_template.format(dir_to_process)
 
 # Insert into DB, if we need to
 if args.database:
@@ -245,25 +319,27 @@ for filename in os.listdir(dir_to_process):
         new_pakfile = paksort.PakFile(filename)
         pakfiles_fs.append(new_pakfile)
 
-# Regexes to help convert an in-pak pathname to an in-game object path
-plugins_re = re.compile(r'^(?P<firstpart>\w+)/Plugins/(?P<lastpart>.*)\s*$')
-content_re = re.compile(r'^(?P<junk>.*/)?(?P<firstpart>\w+)/Content/(?P<lastpart>.*)\s*$')
-
-# Process
-with lzma.open(out_file, 'wt', encoding='utf-8') as df:
+# Process.  The contents file gets compressed as a series of independent
+# xz streams on a thread pool, as we go; see xzblocks.py.  The structured
+# version is written alongside it.
+with xzblocks.XZBlockWriter(out_file, preset=args.preset, threads=args.threads) as df, \
+        pakcontents.ContentsWriter(structured_file, dir_to_process, preset=args.preset, threads=args.threads) as sdf:
     for pakfile in sorted(pakfiles_fs):
         print('Processing {}...'.format(pakfile.filename))
 
-        # Get the contents
-        cp = subprocess.run(['wine64', 'UnrealPak.exe', os.path.join(dir_to_process, pakfile.filename), '-list', '-cryptokeys=crypto.json'],
-                capture_output=True,
+        # Get the contents (reading UnrealPak's output as it comes in, rather
+        # than waiting for the whole thing)
+        p = subprocess.Popen(['wine64', 'UnrealPak.exe', os.path.join(dir_to_process, pakfile.filename), '-list', '-cryptokeys=crypto.json'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 encoding='utf-8')
         mount_point = None
         contents = []
+        entries = []
         wem_bnk_count = 0
         db_changed = False
         db_pakfile = None
-        for line in cp.stdout.split("\n"):
+        for line in p.stdout:
             if (match := mount_re.search(line)):
                 mount_point = match.group(1)
 
@@ -302,19 +378,16 @@ with lzma.open(out_file, 'wt', encoding='utf-8') as df:
                         pakfiles_by_id[db_pakfile.fid] = db_pakfile
                         db_changed = True
 
-                # Massage the mount point for when we figure out the "real" paths, below.
-                # (no longer doing this; just gonna do it in code on the web side, to make
-                # the DB size smaller - we save ~100MB by omitting it)
-                #
-                #if mount_point.startswith('../../../'):
-                #    mount_point = mount_point[9:]
-                #elif mount_point == '/':
-                #    # This only shows up in "empty" pakfiles, so whatever
-                #    mount_point = ''
-
             elif (match := file_re.search(line)):
                 inner_filename = match.group(1)
 
+                # Add to the structured output (this gets everything)
+                entry = {'path': inner_filename}
+                if match.group('size'):
+                    entry['size'] = int(match.group('size'))
+                    entry['sha1'] = match.group('sha1').lower()
+                entries.append(entry)
+
                 # Add to contents (for the text file output)
                 if inner_filename.endswith('.wem') or inner_filename.endswith('.bnk'):
                     wem_bnk_count += 1
@@ -325,52 +398,46 @@ with lzma.open(out_file, 'wt', encoding='utf-8') as df:
                 # (and also that its pakfile mapping is in there)
                 if args.database:
 
-                    # Not actually processing real-name stuff anymore!  This method works, but I'm
-                    # doing it on the display side on the web, instead, to save on database space.
-                    #
-                    # Routine to get our *real* filename.  I'm quite sure this is correct for "real" game
-                    # objects, since I've checked it versus my original extraction/reorganization techniques,
-                    # though for non-game-objects I'm not entirely sure if it makes total sense.
-                    #real_filename = f'{mount_point}{inner_filename}'
-
-                    # If we're a "plugin" path, strip out the plugin bit.
-                    #if match := plugins_re.match(real_filename):
-                    #    real_filename = match.group('lastpart')
-
-                    # Now if we're a "Content", strip that out as well (and apply some hardcoded transforms)
-                    #if match := content_re.match(real_filename):
-                    #    firstpart = match.group('firstpart')
-                    #    lastpart = match.group('lastpart')
-                    #    if firstpart == 'OakGame':
-                    #        firstpart = 'Game'
-                    #    elif firstpart == 'Wwise':
-                    #        firstpart = 'WwiseEditor'
-                    #    real_filename = f'/{firstpart}/{lastpart}'
+                    # Objects are keyed on their in-pak path, but we store the in-game
+                    # ("real") path as well, so the web side doesn't have to compute it.
+                    # In practice every BL3 pakfile with content uses the same mountpoint,
+                    # so an object's real path won't depend on which pak it's in, but
+                    # complain if that ever changes.
+                    real_filename = pakcontents.real_path(mount_point, inner_filename, leading_slash=True)
+                    real_did = get_directory_id(GameObject.split_path(real_filename)[0])
 
                     # Get the db object
-                    if inner_filename.lower() in objects:
-                        db_object = objects[inner_filename.lower()]
+                    path_id = objects.find(inner_filename)
+                    if path_id is not None:
+                        oid = object_oids[path_id]
+                        if object_real_dids[path_id] != real_did:
+                            print(f'WARNING: {inner_filename} in {pakfile.filename} has a different real path: {real_filename}')
                     else:
                         db_object = GameObject(-1, inner_filename)
-                        curs.execute('insert into object (filename_base, filename_full) values (%s, %s)', (
+                        curs.execute('insert into object (did, real_did, filename_base, extension) values (%s, %s, %s, %s)', (
+                            get_directory_id(db_object.dirname),
+                            real_did,
                             db_object.filename_base,
-                            db_object.filename_full,
+                            db_object.extension,
                             ))
-                        db_object.oid = curs.lastrowid
-                        assert(db_object.filename_full.lower() not in objects)
-                        objects[db_object.filename_full.lower()] = db_object
-                        objects_by_id[db_object.oid] = db_object
+                        oid = curs.lastrowid
+                        path_id = objects.add(db_object.filename_full)
+                        assert(path_id == len(object_oids))
+                        object_oids.append(oid)
+                        object_real_dids.append(real_did)
                         db_changed = True
 
                     # Mapping additions
-                    if db_pakfile.fid not in db_object.pakfiles:
-                        db_object.pakfiles.add(db_pakfile.fid)
+                    if not object_paks.contains(oid, db_pakfile.fid):
+                        object_paks.add(oid, db_pakfile.fid)
                         curs.execute('insert into o2f (oid, fid) values (%s, %s)', (
-                            db_object.oid,
+                            oid,
                             db_pakfile.fid,
                             ))
                         db_changed = True
 
+        p.wait()
+
         # Commit our DB if files have been added
         if args.database and db_changed:
             db.commit()
@@ -396,5 +463,12 @@ with lzma.open(out_file, 'wt', encoding='utf-8') as df:
         for content in sorted(contents, key=str.casefold):
             print(' - {}'.format(content), file=df)
         print('', file=df)
+        sdf.add_pak(pakfile.filename, mount_point, entries)
+
+if args.search_index:
+    print(f'Updating search index {args.search_db}...')
+    conn = pakfile_search.connect(args.search_db)
+    pakfile_search.index_contents(conn, structured_file, patch=dir_to_process)
+    conn.close()
 
 print('Done!')
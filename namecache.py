@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+import uasset
+import treeindex
+
+# A persistent cache of the name map (plus a summary of the import and
+# export tables) from every package in an extraction dir, so that tools
+# which need those don't have to re-parse hundreds of thousands of
+# packages every time, when only a handful change between patches.
+# Entries are keyed on the package's path within the tree plus its size
+# and mtime, and are stored in an SQLite database alongside the tree
+# (`<root>.namecache.sqlite3`, by default).  The list of packages comes from
+# `treeindex.py`, but `update()` stats each one itself, since the tree index
+# won't notice files which have been rewritten in place.
+#
+# Name maps are stored as a NUL-separated, zlib-compressed blob.  Imports
+# and exports are stored separately (as compressed JSON), so that things
+# which only want names don't have to pay for decoding them.
+
+# Bump this if the stored format changes; the cache gets wiped if it
+# doesn't match.
+CACHE_FORMAT = 1
+
+schema = """
+    create table if not exists package (
+        path text primary key,
+        size integer not null,
+        mtime_ns integer not null,
+        names blob not null,
+        imports blob not null,
+        exports blob not null
+    );
+    """
+
+
+def _encode_names(names):
+    return zlib.compress('\0'.join(names).encode('utf-8'))
+
+
+def _decode_names(blob):
+    data = zlib.decompress(blob).decode('utf-8')
+    if not data:
+        return []
+    return data.split('\0')
+
+
+def _encode_json(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode_json(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class CachedPackage:
+    """
+    The cached data for a single package.  `names` is the full name map (as
+    a list of strings), `imports` is a list of `(class_package, class_name,
+    object_name, outer_index)` tuples, and `exports` is a list of
+    `(object_name, class_index, outer_index, serial_size)` tuples.
+    """
+
+    __slots__ = ('names', 'imports', 'exports')
+
+    def __init__(self, names, imports, exports):
+        self.names = names
+        self.imports = imports
+        self.exports = exports
+
+    def __repr__(self):
+        return f'CachedPackage<{len(self.names)} names>'
+
+
+def summarize(full_path):
+    """
+    Parses the package at `full_path` into a `CachedPackage`.  Raises
+    `ValueError` if it's not a valid package.  Suitable for use as a
+    process pool worker.
+    """
+    with uasset.Package(full_path) as package:
+        names = list(package.names)
+        imports = [(str(entry.class_package), str(entry.class_name), str(entry.object_name), entry.outer_index)
+                for entry in package.imports]
+        exports = [(str(entry.object_name), entry.class_index, entry.outer_index, entry.serial_size)
+                for entry in package.exports]
+    return CachedPackage(names, imports, exports)
+
+
+def try_summarize(full_path):
+    """
+    Like `summarize()`, but returns `None` (and prints a warning) rather
+    than raising an exception if the package can't be parsed, so that one
+    bad package doesn't take down a whole run.  Suitable for use as a
+    process pool worker.
+    """
+    try:
+        return summarize(full_path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f'WARNING: could not parse package {full_path}: {e}', file=sys.stderr)
+        return None
+
+
+class NameCache:
+    """
+    Persistent name map cache for the packages under `root`.
+    """
+
+    def __init__(self, root, filename=None):
+        self.root = os.path.abspath(root)
+        if filename is None:
+            filename = f'{self.root}.namecache.sqlite3'
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        if self.conn.execute('pragma user_version').fetchone()[0] != CACHE_FORMAT:
+            self.conn.execute('drop table if exists package')
+            self.conn.execute(f'pragma user_version={CACHE_FORMAT}')
+        self.conn.executescript(schema)
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self):
+        """
+        Returns a dict mapping the path of every cached package to a tuple
+        of its `(size, mtime_ns)`.
+        """
+        return {path: (size, mtime_ns) for path, size, mtime_ns
+                in self.conn.execute('select path, size, mtime_ns from package')}
+
+    def get(self, path, size, mtime_ns):
+        """
+        Returns the `CachedPackage` for `path` (relative to the root), or
+        `None` if it's not cached or the file has changed since.
+        """
+        row = self.conn.execute('select names, imports, exports from package where path=? and size=? and mtime_ns=?',
+                (path, size, mtime_ns)).fetchone()
+        if row is None:
+            return None
+        return CachedPackage(_decode_names(row[0]),
+                [tuple(entry) for entry in _decode_json(row[1])],
+                [tuple(entry) for entry in _decode_json(row[2])])
+
+    def get_names(self, path, size, mtime_ns):
+        """
+        Returns the name map for `path`, parsing (and caching) the package
+        if need be.
+        """
+        row = self.conn.execute('select names from package where path=? and size=? and mtime_ns=?',
+                (path, size, mtime_ns)).fetchone()
+        if row is not None:
+            self.hits += 1
+            return _decode_names(row[0])
+        self.misses += 1
+        package = summarize(os.path.join(self.root, path))
+        self.store(path, size, mtime_ns, package)
+        return package.names
+
+    def store(self, path, size, mtime_ns, package):
+        """
+        Stores the `CachedPackage` `package` for `path`.  Changes aren't
+        saved until `commit()` is called.
+        """
+        self.conn.execute('replace into package (path, size, mtime_ns, names, imports, exports) values (?, ?, ?, ?, ?, ?)',
+                (path, size, mtime_ns,
+                    _encode_names(package.names),
+                    _encode_json(package.imports),
+                    _encode_json(package.exports)))
+
+    def remove(self, path):
+        """
+        Removes `path` from the cache, if it's there.
+        """
+        self.conn.execute('delete from package where path=?', (path,))
+
+    def iter_names(self, joined=False, first=None, last=None):
+        """
+        Generator yielding `(path, names)` for every cached package.  If
+        `joined` is set, `names` will be a single NUL-separated string
+        rather than a list, which is quicker to get at (and can still be
+        passed to `find_names()`).  Pass `first` and `last` to only get
+        packages whose paths sort between those two (inclusive).
+        """
+        if first is None or last is None:
+            rows = self.conn.execute('select path, names from package')
+        else:
+            rows = self.conn.execute('select path, names from package where path between ? and ?',
+                    (first, last))
+        for path, blob in rows:
+            if joined:
+                yield (path, zlib.decompress(blob).decode('utf-8'))
+            else:
+                yield (path, _decode_names(blob))
+
+    def prune(self, paths):
+        """
+        Removes any cached packages which aren't in `paths`.  Returns the
+        number removed.
+        """
+        to_remove = [(path,) for path in self.keys() if path not in paths]
+        self.conn.executemany('delete from package where path=?', to_remove)
+        return len(to_remove)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def find_names(names, wanted):
+    """
+    Given `names` (a list, or a NUL-separated string from `iter_names()`)
+    and a collection of lowercase `wanted` names, returns a dict mapping
+    any of `wanted` which are present (case-insensitively) to their actual
+    capitalization.  The equivalent of `uasset.NameMap.find()`, for cached
+    name maps.
+    """
+    if isinstance(names, str):
+        joined = f'\0{names}\0'
+        lowered = joined.lower()
+        # Lowercasing a few non-ASCII characters changes the string length,
+        # in which case we can't use offsets into the lowercased version
+        if len(lowered) == len(joined):
+            found = {}
+            for name in wanted:
+                if (idx := lowered.find(f'\0{name}\0')) >= 0:
+                    found[name] = joined[idx+1:idx+1+len(name)]
+            return found
+        names = names.split('\0')
+    wanted_lengths = {len(name) for name in wanted}
+    found = {}
+    for name in names:
+        if len(name) in wanted_lengths and (lower := name.lower()) in wanted:
+            found[lower] = name
+    return found
+
+
+def update(cache, paths, executor=None):
+    """
+    Brings `cache` up to date for `paths` (relative to the cache's root).
+    Each file gets stat'd, rather than trusting the size/mtime from
+    `treeindex.py`, since the tree index won't notice files which have been
+    rewritten in place.  Changed/new packages are parsed on `executor` if
+    one is passed in.  Packages which are no longer present are dropped
+    from the cache, as are packages which can't be parsed (which get
+    reported, but otherwise skipped).  Returns a tuple of `(num_cached,
+    num_parsed, num_removed)`, where `num_parsed` only counts packages which
+    were parsed successfully.
+    """
+    known = cache.keys()
+    to_parse = []
+    for path in paths:
+        stat = os.stat(os.path.join(cache.root, path))
+        if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+            to_parse.append((path, stat.st_size, stat.st_mtime_ns))
+    full_paths = [os.path.join(cache.root, path) for path, _, _ in to_parse]
+    if executor is None:
+        results = map(try_summarize, full_paths)
+    else:
+        results = executor.map(try_summarize, full_paths, chunksize=max(1, min(200, len(full_paths)//50)))
+    num_failed = 0
+    for (path, size, mtime_ns), package in zip(to_parse, results):
+        if package is None:
+            cache.remove(path)
+            num_failed += 1
+        else:
+            cache.store(path, size, mtime_ns, package)
+    num_removed = cache.prune(set(paths))
+    cache.commit()
+    return (len(paths)-len(to_parse), len(to_parse)-num_failed, num_removed)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Build/refresh the cache of package name maps for an extraction dir',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-c', '--cache',
+            type=str,
+            help='Cache file to use (defaults to <root>.namecache.sqlite3)',
+            )
+
+    parser.add_argument('-n', '--names',
+            type=str,
+            metavar='PATH',
+            help='Show the cached names for the given package (relative to the root)',
+            )
+
+    parser.add_argument('root',
+            nargs=1,
+            help='Root of the extracted tree',
+            )
+
+    args = parser.parse_args()
+    root = args.root[0]
+
+    start = time.perf_counter()
+    with treeindex.open_index(root) as tree:
+        paths = [path for path, _, _, _ in tree.iter_files(('.uasset', '.umap'))]
+    with NameCache(root, args.cache) as cache:
+        cached, parsed, removed = update(cache, paths)
+        print(f'{cached} cached, {parsed} parsed, {removed} removed, in {time.perf_counter()-start:.2f}s',
+                file=sys.stderr)
+        if args.names:
+            if args.names in paths:
+                stat = os.stat(os.path.join(root, args.names))
+                for name in cache.get_names(args.names, stat.st_size, stat.st_mtime_ns):
+                    print(name)
+            else:
+                print(f'{args.names} not found', file=sys.stderr)
@@ -31,7 +31,10 @@ import sys
 import json
 import lzma
 import argparse
+import tempfile
 import traceback
+import collections
+import concurrent.futures
 from datetime import datetime
 
 try:
@@ -53,13 +56,154 @@ except ModuleNotFoundError:
 #  - Input loop instead of just doing a single query
 #  - If property name isn't found, fall back to search
 #  - Colors that hurt c0dycode's eyes
+#  - Streaming parser for the dumps (names and objects read concurrently),
+#    with -b/--benchmark to compare against the original
 
 # Change your data path and cache file here
 dataDir = r"/games/bl3_steam/games/steamapps/common/Borderlands 3/OakGame/Binaries/Win64/data/basegame/Prologue_P"
 cacheFile = "/home/pez/.local/share/bl3objectprops/props.json.xz"
 
+def findDumpFile(directoryPath, baseName):
+	"""
+	Returns the path to the dump file `baseName` in `directoryPath`, which
+	may optionally be xz-compressed.
+	"""
+	fileName = os.path.join(directoryPath, baseName)
+	if os.path.exists(fileName):
+		return fileName
+	elif os.path.exists(fileName + ".xz"):
+		return fileName + ".xz"
+	else:
+		raise Exception(f"Could not find {fileName}")
+
+def openDumpFile(fileName):
+	if fileName.endswith(".xz"):
+		return lzma.open(fileName, "rt", encoding="latin1")
+	else:
+		return open(fileName, "r")
+
+def isPropertyType(name):
+	# Slightly dodgy assumption here, a possible property could actually include non-alphabetical chars but *ehh*
+	nameLower = name.lower()
+	return ('property' in nameLower or 'function' in nameLower) and name.isalpha()
+
+def readNamesDump(fileName):
+	"""
+	Streams through the names dump, and returns a tuple containing the
+	number of classes found, the set of property types, and the number of
+	seconds it took.  Run in a separate process, alongside the objects dump
+	being read.
+	"""
+	executionTime = datetime.now()
+	numClasses = 0
+	propertyTypes = set()
+	with openDumpFile(fileName) as namesFile:
+		for line in namesFile:
+			if "/" in line: continue
+
+			c = line.split('] ', 2)[1].rstrip('\n')
+			numClasses += 1
+			if isPropertyType(c): propertyTypes.add(c)
+
+	return (numClasses, propertyTypes, (datetime.now() - executionTime).total_seconds())
+
+def readObjectsDump(fileName):
+	"""
+	Generator which streams through the objects dump, and yields a tuple of
+	`(propertyType, classNameLower, propertyName)` for each line which could
+	be a property.  We don't have the list of property types from the names
+	dump yet (since that's being read at the same time), so this only
+	filters on what they look like, and the caller has to check the types.
+	"""
+	typeCache = {}
+	with openDumpFile(fileName) as objectsFile:
+		for line in objectsFile:
+			# [00000011] 00000000168C0C00 Class Engine.BlueprintFunctionLibrary
+			parts = line.split(' ', 4)
+			if len(parts) < 4:
+				raise Exception(f"Unable to parse file line: {line}")
+
+			lineProperty = parts[2] # From above, it'll get `Class`
+			objectData = parts[3].rstrip('\n') # In the above example it'll get `Engine.BlueprintFunctionLibrary`
+
+			if lineProperty not in typeCache:
+				typeCache[lineProperty] = lineProperty != "Function" and isPropertyType(lineProperty)
+			if not typeCache[lineProperty] or "default" in objectData.lower() or "__" in objectData: continue
+
+			objectData = objectData[objectData.find('.')+1:]
+			objectClass = objectData.split('.', 1)[0]
+			propertyName = objectData[objectData.find('.')+1:]
+			yield (lineProperty, objectClass.lower(), propertyName)
+
 def generatePropertyData(directoryPath, cacheFile):
 
+	namesFileName = findDumpFile(directoryPath, "UE4Tools_NamesDump.txt")
+	objectsFileName = findDumpFile(directoryPath, "UE4Tools_ObjectsDump.txt")
+
+	# The names dump gets read in a separate process while we read the
+	# objects dump.  Both get streamed line-by-line.  Until the property types
+	# from the names dump are ready, lines which look like properties get
+	# held on to; once they're ready, those get sorted out and everything
+	# after that goes straight into `classProperties`.
+	executionTime = datetime.now()
+	classProperties = collections.defaultdict(list)
+	#"className": [
+	#	{"propertyName":"propertyType"}
+	#]
+	propertyTypes = None
+	pending = []
+
+	def receiveTypes():
+		numClasses, propertyTypes, namesSeconds = namesFuture.result()
+		print(f"Found total {numClasses} classes in {namesSeconds}")
+		print(f"Total Property Types: {len(propertyTypes)}")
+		propertyTypes.discard('MaterialFunction')
+		propertyTypes.discard('DialogSelectorFunction')
+		for lineProperty, objectClassLower, propertyName in pending:
+			if lineProperty in propertyTypes:
+				classProperties[objectClassLower].append({propertyName:lineProperty})
+		pending.clear()
+		return propertyTypes
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+		namesFuture = executor.submit(readNamesDump, namesFileName)
+
+		print("Reading object dumps...")
+		for candidate in readObjectsDump(objectsFileName):
+			if propertyTypes is None:
+				if namesFuture.done():
+					propertyTypes = receiveTypes()
+				else:
+					pending.append(candidate)
+					continue
+			if candidate[0] in propertyTypes:
+				classProperties[candidate[1]].append({candidate[2]:candidate[0]})
+
+		if propertyTypes is None:
+			propertyTypes = receiveTypes()
+
+	print(f"Found properties for total classes of {len(classProperties)}")
+	print(f"Read properties in {(datetime.now() - executionTime).total_seconds()} seconds")
+
+	# Make the cache directory if we have to
+	cacheDir = os.path.dirname(cacheFile)
+	if not os.path.exists(cacheDir):
+		os.makedirs(cacheDir, exist_ok=True)
+
+	# Now write out the cache file
+	if cacheFile.endswith('.xz'):
+		oFile = lzma.open(cacheFile, "wt")
+	else:
+		oFile = open(cacheFile, "w")
+	json.dump(classProperties, oFile, indent=4, sort_keys=True)
+	oFile.close()
+
+def generatePropertyDataLegacy(directoryPath, cacheFile):
+	"""
+	The original cache generation, which reads both dumps fully into memory.
+	Only kept around for comparison with `--benchmark`.
+	"""
+
 	namesFileName = os.path.join(directoryPath, "UE4Tools_NamesDump.txt")
 	if os.path.exists(namesFileName):
 		namesFile = open(namesFileName, "r")
@@ -150,106 +294,135 @@ def generatePropertyData(directoryPath, cacheFile):
 	json.dump(classProperties, oFile, indent=4, sort_keys=True)
 	oFile.close()
 
-# Arguments
-parser = argparse.ArgumentParser(
-		description="BL3 Object Properties",
-		epilog="NOTE: color output requires installation of the `colorama` Python library",
-		)
-
-parser.add_argument('-g', '--generate',
-		action='store_true',
-		help='Force generation of property cache')
-
-colorgroup = parser.add_mutually_exclusive_group()
-
-colorgroup.add_argument('-c', '--color',
-		action='store_true',
-		help='Use colors on output (defaults to looking good on black background)')
-
-colorgroup.add_argument('-w', '--whitecolor',
-		action='store_true',
-		help='Use colors on output (for white backgrounds)')
-
-args = parser.parse_args()
-
-# Colors!
-color_prompt = ''
-color_error = ''
-color_searchres = ''
-color_propres = ''
-color_reset = ''
-if colorSupported:
-	if args.color:
-		color_prompt = colorama.Fore.BLUE + colorama.Style.BRIGHT
-		color_error = colorama.Fore.RED
-		color_searchres = colorama.Fore.CYAN
-		color_propres = colorama.Fore.GREEN
-		color_reset = colorama.Style.RESET_ALL
-		colorama.init(autoreset=True)
-	elif args.whitecolor:
-		color_prompt = colorama.Fore.BLUE
-		color_error = colorama.Fore.RED
-		color_searchres = colorama.Fore.CYAN
-		color_propres = colorama.Fore.GREEN
-		color_reset = colorama.Style.RESET_ALL
-		colorama.init(autoreset=True)
-elif args.color or args.whitecolor:
-	print('WARNING: `colorama` module not found; try `pip3 install colorama` for color support')
-
-# Generate cache if we need to
-if not os.path.exists(cacheFile) or args.generate:
-	print("Generating property data...")
-	generatePropertyData(dataDir, cacheFile)
-
-# Now our property data was generated or already exists. 
-if cacheFile.endswith(".xz"):
-	propertyOutput = lzma.open(cacheFile, 'rt')
-else:
-	propertyOutput = open(cacheFile)
-jsonData = json.load(propertyOutput)
-propertyOutput.close()
-
-# Input loop
-while True:
-	print("")
-	print(f"{color_prompt}[S]earch, Get [P]roperties, or [Q]uit?{color_reset}", end=" ")
-
-	searchOrProperties = input().strip().lower()
-	print("")
-	if searchOrProperties == "q":
-		break
-	elif searchOrProperties != 's' and searchOrProperties != 'p':
-		print(f"{color_error}Unknown type... Try again.")
-		continue
-
-	searchTerm = None
-	if searchOrProperties == 'p':
-		print("Class to get properties of:", end=' ')
-		classToSearch = input()
+if __name__ == '__main__':
+
+	# Arguments
+	parser = argparse.ArgumentParser(
+			description="BL3 Object Properties",
+			epilog="NOTE: color output requires installation of the `colorama` Python library",
+			)
+
+	parser.add_argument('-g', '--generate',
+			action='store_true',
+			help='Force generation of property cache')
+
+	colorgroup = parser.add_mutually_exclusive_group()
+
+	colorgroup.add_argument('-c', '--color',
+			action='store_true',
+			help='Use colors on output (defaults to looking good on black background)')
+
+	colorgroup.add_argument('-w', '--whitecolor',
+			action='store_true',
+			help='Use colors on output (for white backgrounds)')
+
+	parser.add_argument('-b', '--benchmark',
+			action='store_true',
+			help='Time generating the property cache with both the streaming and original parsers, and compare the results')
+
+	args = parser.parse_args()
+
+	# Colors!
+	color_prompt = ''
+	color_error = ''
+	color_searchres = ''
+	color_propres = ''
+	color_reset = ''
+	if colorSupported:
+		if args.color:
+			color_prompt = colorama.Fore.BLUE + colorama.Style.BRIGHT
+			color_error = colorama.Fore.RED
+			color_searchres = colorama.Fore.CYAN
+			color_propres = colorama.Fore.GREEN
+			color_reset = colorama.Style.RESET_ALL
+			colorama.init(autoreset=True)
+		elif args.whitecolor:
+			color_prompt = colorama.Fore.BLUE
+			color_error = colorama.Fore.RED
+			color_searchres = colorama.Fore.CYAN
+			color_propres = colorama.Fore.GREEN
+			color_reset = colorama.Style.RESET_ALL
+			colorama.init(autoreset=True)
+	elif args.color or args.whitecolor:
+		print('WARNING: `colorama` module not found; try `pip3 install colorama` for color support')
+
+	# Benchmark, if we've been told to
+	if args.benchmark:
+		timings = {}
+		results = {}
+		with tempfile.TemporaryDirectory() as tmpDir:
+			for label, function in [('original', generatePropertyDataLegacy), ('streaming', generatePropertyData)]:
+				print(f"Generating property data with the {label} parser...")
+				benchFile = os.path.join(tmpDir, f'{label}.json')
+				executionTime = datetime.now()
+				function(dataDir, benchFile)
+				timings[label] = (datetime.now() - executionTime).total_seconds()
+				with open(benchFile) as df:
+					results[label] = json.load(df)
+				print("")
+		for label, seconds in timings.items():
+			print(f"{label}: {seconds:.2f} seconds")
+		if results['original'] == results['streaming']:
+			print("Results match!")
+		else:
+			print(f"{color_error}Results differ!")
+			sys.exit(1)
+		sys.exit(0)
+
+	# Generate cache if we need to
+	if not os.path.exists(cacheFile) or args.generate:
+		print("Generating property data...")
+		generatePropertyData(dataDir, cacheFile)
+
+	# Now our property data was generated or already exists. 
+	if cacheFile.endswith(".xz"):
+		propertyOutput = lzma.open(cacheFile, 'rt')
+	else:
+		propertyOutput = open(cacheFile)
+	jsonData = json.load(propertyOutput)
+	propertyOutput.close()
+
+	# Input loop
+	while True:
+		print("")
+		print(f"{color_prompt}[S]earch, Get [P]roperties, or [Q]uit?{color_reset}", end=" ")
+
+		searchOrProperties = input().strip().lower()
 		print("")
-		if classToSearch.lower() in jsonData:
-			print(f"Found properties of {classToSearch}")
-			combinedOutput = "\n".join(sorted(json.dumps(jsonData[classToSearch.lower()], sort_keys=True).replace('}, ','\n').replace('{','').replace('}]','').replace('[','').split("\n"), key=str.casefold))
-			print(f"{color_propres}Properties: \n{combinedOutput}")
+		if searchOrProperties == "q":
+			break
+		elif searchOrProperties != 's' and searchOrProperties != 'p':
+			print(f"{color_error}Unknown type... Try again.")
 			continue
-		else:
-			print(f"{color_error}'{classToSearch}' not found, searching instead...")
-			searchOrProperties = 's'
-			searchTerm = classToSearch
-
-	if searchOrProperties == 's':
-		storedClasses = jsonData.keys()
-		if not searchTerm:
-			print("Search for:", end=' ')
-			searchTerm = input()
-		results = []
-		for c in storedClasses:
-			if(searchTerm.lower() in c.lower()):
-				results += [c]
-		if not results:
-			print(f"{color_error}Unable to find results for {searchTerm}")
-		else:
-			print("Found results: ")
-			for res in results:
-				print(f"{color_searchres} - {res}")
+
+		searchTerm = None
+		if searchOrProperties == 'p':
+			print("Class to get properties of:", end=' ')
+			classToSearch = input()
+			print("")
+			if classToSearch.lower() in jsonData:
+				print(f"Found properties of {classToSearch}")
+				combinedOutput = "\n".join(sorted(json.dumps(jsonData[classToSearch.lower()], sort_keys=True).replace('}, ','\n').replace('{','').replace('}]','').replace('[','').split("\n"), key=str.casefold))
+				print(f"{color_propres}Properties: \n{combinedOutput}")
+				continue
+			else:
+				print(f"{color_error}'{classToSearch}' not found, searching instead...")
+				searchOrProperties = 's'
+				searchTerm = classToSearch
+
+		if searchOrProperties == 's':
+			storedClasses = jsonData.keys()
+			if not searchTerm:
+				print("Search for:", end=' ')
+				searchTerm = input()
+			results = []
+			for c in storedClasses:
+				if(searchTerm.lower() in c.lower()):
+					results += [c]
+			if not results:
+				print(f"{color_error}Unable to find results for {searchTerm}")
+			else:
+				print("Found results: ")
+				for res in results:
+					print(f"{color_searchres} - {res}")
 
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import time
+import array
+import argparse
+import pathtable
+import unpack_bl3
+import pakcontents
+
+# Figures out which pakfile's copy of an object the game actually uses.
+# Lots of objects get shipped more than once (in the original pak, and
+# then again in one or more `_P` patch paks), and the one which wins is
+# whichever gets loaded last.  That's the ordering that `unpack_bl3.py`
+# uses (patchnum first, then a case-insensitive sort on the pak filename,
+# with the DLC paks slotted in after the base-game paks), so that's what
+# we use here too -- note that it's *not* the same as `paksort.py`'s
+# human-friendly order.
+#
+# The overlay gets built from the contents-* files written by
+# list_contents.py, across every patch.  If a later patch re-ships a pak
+# with the same filename (as happened to a few of the paks from
+# `pak-2020-03-13-steam_xplay`), the later version replaces the earlier one
+# entirely, just like it does on disk.
+#
+# In-game paths are stored in a case-insensitive PathTable, alongside an
+# array of the winning pak for each path, so a lookup is just a hash probe.
+# Only the (relatively few) paths which are shipped more than once need to
+# store the list of paks they're shadowed in.
+
+
+class OverlayPak:
+    """
+    A single pakfile in the overlay.  `load_order` is the pak's position
+    in the game's load order (higher numbers win).
+    """
+
+    __slots__ = ('filename', 'patch', 'mountpoint', 'load_order')
+
+    def __init__(self, filename, patch, mountpoint, load_order=None):
+        self.filename = filename
+        self.patch = patch
+        self.mountpoint = mountpoint
+        self.load_order = load_order
+
+    def __str__(self):
+        return f'{self.filename} ({self.patch})'
+
+    def __repr__(self):
+        return f'OverlayPak<{self.filename}>'
+
+
+class PakOverlay:
+    """
+    Index of which pakfiles provide which in-game paths, in load order.
+    Use `from_contents_files()` to build one.
+    """
+
+    def __init__(self, paks):
+        """
+        Creates an empty overlay for the given list of `OverlayPak`s (which
+        will be sorted into load order).  Add their contents with
+        `add_entries()`.
+        """
+        self.paks = sorted(paks,
+                key=lambda p: unpack_bl3.PakFile.load_order_key(p.filename))
+        for idx, pak in enumerate(self.paks):
+            pak.load_order = idx
+        self.paks_by_name = {pak.filename: pak for pak in self.paks}
+        self.paths = pathtable.PathTable()
+        self.winners = array.array('i')
+        self.shadows = {}
+
+    @staticmethod
+    def from_contents_files(contents_files=None, directory='.'):
+        """
+        Builds an overlay from a dict of contents files (mapping patch
+        names to filenames, in patch order).  By default, all contents
+        files in `directory` will be used.
+        """
+        if contents_files is None:
+            contents_files = pakcontents.find_contents_files(directory)
+
+        # First figure out which version of each pak is the current one
+        current = {}
+        for patch, filename in contents_files.items():
+            if filename.endswith('.jsonl.xz'):
+                with pakcontents.ContentsFile(filename) as contents:
+                    for pak in contents.paks:
+                        current[pak['filename']] = OverlayPak(pak['filename'], patch, pak['mountpoint'])
+            else:
+                seen = set()
+                for pak_filename, mountpoint, _ in pakcontents.iter_text_contents(filename):
+                    if pak_filename not in seen:
+                        seen.add(pak_filename)
+                        current[pak_filename] = OverlayPak(pak_filename, patch, mountpoint)
+        overlay = PakOverlay(current.values())
+
+        # Now read in the contents of those
+        for patch, filename in contents_files.items():
+            if filename.endswith('.jsonl.xz'):
+                with pakcontents.ContentsFile(filename) as contents:
+                    for pak in contents.paks:
+                        overlay_pak = overlay.paks_by_name[pak['filename']]
+                        if overlay_pak.patch == patch:
+                            overlay.add_entries(overlay_pak,
+                                    (entry['real'] for entry in contents.pak_entries(pak['filename'])))
+            else:
+                for pak_filename, mountpoint, path in pakcontents.iter_text_contents(filename):
+                    overlay_pak = overlay.paks_by_name[pak_filename]
+                    if overlay_pak.patch == patch:
+                        overlay.add_entries(overlay_pak, [pakcontents.real_path(mountpoint, path)])
+
+        return overlay
+
+    def add_entries(self, pak, reals):
+        """
+        Adds the in-game paths in `reals` as being provided by the
+        `OverlayPak` `pak`.
+        """
+        order = pak.load_order
+        winners = self.winners
+        for real in reals:
+            path_id = self.paths.add(real)
+            if path_id == len(winners):
+                winners.append(order)
+                continue
+            current = winners[path_id]
+            if current == order:
+                continue
+            shadows = self.shadows.get(path_id, ())
+            if order > current:
+                winners[path_id] = order
+                shadows = (current,) + shadows
+            elif order not in shadows:
+                shadows = tuple(sorted(shadows + (order,), reverse=True))
+            self.shadows[path_id] = shadows
+
+    def _path_id(self, path):
+        return self.paths.find(path.lstrip('/'))
+
+    def provider(self, path):
+        """
+        Returns the `OverlayPak` whose copy of the in-game `path` is the one
+        the game actually uses, or `None` if no pak provides it.
+        """
+        path_id = self._path_id(path)
+        if path_id is None:
+            return None
+        return self.paks[self.winners[path_id]]
+
+    def shadowed(self, path):
+        """
+        Returns a list of the `OverlayPak`s whose copies of the in-game
+        `path` are overridden by some other pak, most-recently-loaded first.
+        """
+        path_id = self._path_id(path)
+        if path_id is None:
+            return []
+        return [self.paks[order] for order in self.shadows.get(path_id, ())]
+
+    def resolve(self, paths):
+        """
+        Batch lookup.  Returns a dict mapping each of `paths` to a tuple of
+        `(provider, shadowed)`, as returned by `provider()` and `shadowed()`.
+        """
+        results = {}
+        for path in paths:
+            path_id = self._path_id(path)
+            if path_id is None:
+                results[path] = (None, [])
+            else:
+                results[path] = (self.paks[self.winners[path_id]],
+                        [self.paks[order] for order in self.shadows.get(path_id, ())])
+        return results
+
+    def __len__(self):
+        return len(self.winners)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Find which pakfile provides the copy of an object that BL3 uses',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                In-game paths can be given with or without their leading
+                slash, and are matched case-insensitively.  They must
+                include the file extension (ie: .uasset or .umap).
+            """,
+            )
+
+    parser.add_argument('-d', '--directory',
+            type=str,
+            default='.',
+            help='Directory containing the contents-* files',
+            )
+
+    parser.add_argument('-f', '--file',
+            type=str,
+            help='Read paths to look up from the given file, one per line (use "-" for stdin)',
+            )
+
+    parser.add_argument('-s', '--shadowed-only',
+            action='store_true',
+            help='Only report paths which are provided by more than one pak',
+            )
+
+    parser.add_argument('path',
+            nargs='*',
+            help='In-game path(s) to look up',
+            )
+
+    args = parser.parse_args()
+
+    paths = list(args.path)
+    if args.file:
+        if args.file == '-':
+            paths.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            with open(args.file) as df:
+                paths.extend(line.strip() for line in df if line.strip())
+    if not paths:
+        parser.error('No paths to look up')
+
+    start = time.perf_counter()
+    overlay = PakOverlay.from_contents_files(directory=args.directory)
+    print(f'Loaded {len(overlay)} paths from {len(overlay.paks)} paks in {time.perf_counter()-start:.1f}s',
+            file=sys.stderr)
+
+    start = time.perf_counter()
+    results = overlay.resolve(paths)
+    elapsed = (time.perf_counter()-start)*1000
+
+    for path, (provider, shadowed) in results.items():
+        if args.shadowed_only and not shadowed:
+            continue
+        if provider is None:
+            print(f'{path}: (not found)')
+        else:
+            print(f'{path}: {provider}')
+            for pak in shadowed:
+                print(f' - shadows {pak}')
+    print(f'Resolved {len(paths)} path(s) in {elapsed:.1f}ms', file=sys.stderr)
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import re
+import sys
+import json
+import lzma
+import bisect
+import argparse
+import functools
+import xzblocks
+import concurrent.futures
+
+# Machine-readable version of the contents-*.txt.xz files written out by
+# list_contents.py, which live alongside them as contents-*.jsonl.xz.  The
+# file is a series of independent xz streams (see xzblocks.py), so it's a
+# perfectly valid .xz file which can be read with `xzcat`, but it's laid
+# out so that a reader can seek straight to the bits it wants:
+#
+#   1. One section per pakfile, in the order they were processed.  Each
+#      line is a JSON object describing a single entry in the pak (sorted
+#      case-insensitively, and split into streams of `pak_chunk_size` lines):
+#      `path` (the in-pak path), `real` (the in-game path), and `size`
+#      and `sha1` when UnrealPak reported them.  Unlike the text version,
+#      .wem/.bnk files are included here.
+#
+#   2. A path index: every entry in the patch, sorted case-insensitively by
+#      in-game path, as JSON arrays of `[real, pak_index, path]`.  This is
+#      split into chunks of `index_chunk_size` entries, each its own stream.
+#
+#   3. A final stream containing a single JSON object: the table of
+#      contents.  `paks` has the filename, mountpoint, entry count, and the
+#      byte offset/length of each pak's section, and `index` has the
+#      offset/length and first (casefolded) key of each index chunk.
+#
+# The table of contents can be found by walking backwards over the final
+# xz stream footer, so opening one of these only costs a couple of small
+# reads.  Looking up a path is a binary search over the index chunks
+# followed by decompressing just one of them.
+
+format_name = 'bl3data-contents'
+format_version = 1
+filename_template = 'contents-{}.jsonl.xz'
+text_filename_template = 'contents-{}.txt.xz'
+index_chunk_size = 4096
+pak_chunk_size = 16384
+
+# Regexes to help convert an in-pak pathname to an in-game object path
+plugins_re = re.compile(r'^(?P<firstpart>\w+)/Plugins/(?P<lastpart>.*)\s*$')
+content_re = re.compile(r'^(?P<junk>.*/)?(?P<firstpart>\w+)/Content/(?P<lastpart>.*)\s*$')
+
+# I have no idea how to programmatically determine these.  They appear to be
+# the only ones needed, though, at least for "regular" objects.
+content_firstpart_overrides = {
+        'OakGame': 'Game',
+        'Wwise': 'WwiseEditor',
+        }
+
+# For parsing the textual contents-*.txt.xz files
+contents_filename_re = re.compile(r'^contents-(?P<patch>.*)\.(?P<type>txt|jsonl)\.xz$')
+text_mount_re = re.compile(r'^Mounted at: (?P<mountpoint>.*?)\s*$')
+text_item_re = re.compile(r'^ - (?P<filename>.*?)\s*$')
+text_header_re = re.compile(r'^-+\s*$')
+
+
+def normalize_mountpoint(mountpoint):
+    """
+    Strips the leading `../../../` from a pakfile mountpoint.
+    """
+    if mountpoint.startswith('../../../'):
+        return mountpoint[9:]
+    elif mountpoint == '/':
+        # This only shows up in "empty" pakfiles, so whatever
+        return ''
+    else:
+        return mountpoint
+
+
+def real_path(mountpoint, filename, leading_slash=False):
+    """
+    Given a (raw) pakfile mountpoint and an in-pak filename, return the
+    in-game path of the object.  This is the same transformation that
+    `unpack_bl3.py` does, minus its hardcoded case fixes.  No leading slash
+    is included, unless `leading_slash` is set, in which case one gets
+    added to `Content` paths (and only those), which is how the pakfile
+    lookup web UI has always shown them.
+    """
+    real_filename = f'{normalize_mountpoint(mountpoint)}{filename}'
+
+    # If we're a "plugin" path, strip out the plugin bit.
+    if match := plugins_re.match(real_filename):
+        real_filename = match.group('lastpart')
+
+    # Now if we're a "Content", strip that out as well (and apply some hardcoded transforms)
+    if match := content_re.match(real_filename):
+        firstpart = match.group('firstpart')
+        firstpart = content_firstpart_overrides.get(firstpart, firstpart)
+        real_filename = '{}/{}'.format(firstpart, match.group('lastpart'))
+        if leading_slash:
+            real_filename = f'/{real_filename}'
+
+    return real_filename
+
+
+def path_key(path):
+    """
+    Returns the key used to sort/search in-game paths: casefolded, with no
+    leading slash.
+    """
+    return path.lstrip('/').casefold()
+
+
+def find_contents_files(dirname='.'):
+    """
+    Finds all contents files in `dirname`.  Returns a dict mapping patch
+    names (ie: `pak-*` dir names) to filenames, sorted by patch name.  If
+    both the structured and textual versions of a patch's contents exist,
+    the structured one is preferred.
+    """
+    found = {}
+    for filename in os.listdir(dirname):
+        if match := contents_filename_re.match(filename):
+            patch = match.group('patch')
+            if patch not in found or match.group('type') == 'jsonl':
+                found[patch] = os.path.join(dirname, filename)
+    return dict(sorted(found.items()))
+
+
+def patch_from_filename(filename):
+    """
+    Returns the patch name (`pak-*` dir) for a contents filename.
+    """
+    match = contents_filename_re.match(os.path.basename(filename))
+    if not match:
+        raise ValueError(f'{filename} is not a contents file')
+    return match.group('patch')
+
+
+def iter_text_contents(filename):
+    """
+    Generator which parses one of the textual contents-*.txt.xz files,
+    yielding `(pak_filename, mountpoint, path)` tuples.  The .wem/.bnk files
+    which got left out of those files are, well, left out.
+    """
+    pak_filename = None
+    mountpoint = None
+    prev_line = None
+    for line in xzblocks.iter_lines(filename):
+        if match := text_item_re.match(line):
+            if not match.group('filename').startswith('(+ '):
+                yield (pak_filename, mountpoint, match.group('filename'))
+        elif match := text_mount_re.match(line):
+            mountpoint = match.group('mountpoint')
+        elif prev_line is not None and text_header_re.match(line) and len(line.rstrip()) == len(prev_line):
+            pak_filename = prev_line
+            mountpoint = None
+        prev_line = line.rstrip()
+
+
+def iter_contents(filename):
+    """
+    Generator which yields `(pak_filename, mountpoint, path)` tuples for
+    either a structured or a textual contents file.
+    """
+    if filename.endswith('.jsonl.xz'):
+        with ContentsFile(filename) as contents:
+            for pak, entry in contents.iter_entries():
+                yield (pak['filename'], pak['mountpoint'], entry['path'])
+    else:
+        yield from iter_text_contents(filename)
+
+
+def iter_sorted_contents(filename):
+    """
+    Generator which yields `(real, pak_filename, path)` tuples for either a
+    structured or a textual contents file, sorted by `path_key(real)` (and
+    then by the order of the paks in the file).  Structured files already
+    have a sorted index, so that gets streamed; textual files need to be
+    read into memory and sorted first.
+    """
+    if filename.endswith('.jsonl.xz'):
+        with ContentsFile(filename) as contents:
+            for real, pak, path in contents.iter_index():
+                yield (real, pak['filename'], path)
+    else:
+        entries = []
+        pak_order = {}
+        for pak_filename, mountpoint, path in iter_text_contents(filename):
+            pak_index = pak_order.setdefault(pak_filename, len(pak_order))
+            entries.append((real_path(mountpoint, path), pak_index, pak_filename, path))
+        entries.sort(key=lambda e: (path_key(e[0]), e[1]))
+        for real, _, pak_filename, path in entries:
+            yield (real, pak_filename, path)
+
+
+def _encode_lines(objects):
+    return ''.join(json.dumps(o, separators=(',', ':')) + '\n' for o in objects).encode('utf-8')
+
+
+class ContentsWriter:
+    """
+    Writes out a structured contents file.  Call `add_pak()` once for each
+    pak in the patch, and then `close()` (or use as a context manager) to
+    write the path index and table of contents.  Sections are compressed on
+    a thread pool while we go.
+    """
+
+    def __init__(self, filename, patch, preset=xzblocks.DEFAULT_PRESET, threads=None):
+        self.filename = filename
+        if threads is None:
+            threads = xzblocks.default_threads()
+        self.threads = threads
+        self.compress = functools.partial(lzma.compress,
+                format=lzma.FORMAT_XZ,
+                preset=preset)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+        self.df = open(filename, 'wb')
+        self.toc = {
+                'format': format_name,
+                'version': format_version,
+                'patch': patch,
+                'paks': [],
+                'index': [],
+                }
+        self.index = []
+        self.pending = []
+        self.closed = False
+
+    def _queue(self, section, data):
+        """
+        Queues `data` to be compressed and written as part of `section` (one
+        of the dicts in our table of contents), whose offset and length will
+        be filled in as it gets written.
+        """
+        self.pending.append((section, self.executor.submit(self.compress, data)))
+        self._drain(self.threads*2)
+
+    def _drain(self, limit):
+        while len(self.pending) > limit:
+            section, future = self.pending.pop(0)
+            if 'offset' not in section:
+                section['offset'] = self.df.tell()
+                section['length'] = 0
+            section['length'] += self.df.write(future.result())
+
+    def add_pak(self, filename, mountpoint, entries):
+        """
+        Adds a pakfile's contents.  `entries` should be a list of dicts with
+        at least a `path` key (the in-pak filename); `size` and `sha1` are
+        recommended as well.  The `real` in-game path will be filled in
+        for you.
+        """
+        pak_index = len(self.toc['paks'])
+        section = {
+                'filename': filename,
+                'mountpoint': mountpoint,
+                'entries': len(entries),
+                }
+        self.toc['paks'].append(section)
+        entries = sorted(entries, key=lambda e: e['path'].casefold())
+        for entry in entries:
+            entry['real'] = real_path(mountpoint, entry['path'])
+            self.index.append((entry['real'], pak_index, entry['path']))
+        for start in range(0, max(len(entries), 1), pak_chunk_size):
+            self._queue(section, _encode_lines(entries[start:start+pak_chunk_size]))
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            # Path index
+            self.index.sort(key=lambda i: (path_key(i[0]), i[1]))
+            for start in range(0, len(self.index), index_chunk_size):
+                chunk = self.index[start:start+index_chunk_size]
+                section = {
+                        'first': path_key(chunk[0][0]),
+                        'entries': len(chunk),
+                        }
+                self.toc['index'].append(section)
+                self._queue(section, _encode_lines(chunk))
+            self._drain(0)
+
+            # Table of contents
+            self.df.write(self.compress(json.dumps(self.toc).encode('utf-8')))
+        finally:
+            self.closed = True
+            self.executor.shutdown()
+            self.df.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ContentsFile:
+    """
+    Reader for structured contents files.  Only the table of contents is
+    read when opening; pak sections and index chunks are decompressed as
+    they're asked for.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.df = open(filename, 'rb')
+        try:
+            (start, end) = xzblocks.stream_ranges(self.df, limit=1)[0]
+            self.toc = json.loads(xzblocks.decompress_range(self.df, start, end))
+        except (ValueError, lzma.LZMAError, IndexError) as e:
+            self.df.close()
+            raise ValueError(f'{filename} is not a structured contents file: {e}') from None
+        if self.toc.get('format') != format_name:
+            self.df.close()
+            raise ValueError(f'{filename} is not a structured contents file')
+        if self.toc['version'] > format_version:
+            self.df.close()
+            raise ValueError(f'{filename} is format version {self.toc["version"]}, which is too new')
+        self.patch = self.toc['patch']
+        self.paks = self.toc['paks']
+        self.paks_by_name = {pak['filename']: pak for pak in self.paks}
+        self.index_keys = [chunk['first'] for chunk in self.toc['index']]
+
+    def _read_lines(self, section):
+        data = xzblocks.decompress_range(self.df,
+                section['offset'],
+                section['offset']+section['length'])
+        return [json.loads(line) for line in data.splitlines()]
+
+    def pak_entries(self, pak_filename):
+        """
+        Returns the list of entries (as dicts) for the named pakfile.
+        """
+        return self._read_lines(self.paks_by_name[pak_filename])
+
+    def iter_entries(self):
+        """
+        Generator which yields `(pak, entry)` tuples for everything in the
+        file, pak by pak.
+        """
+        for pak in self.paks:
+            for entry in self._read_lines(pak):
+                yield (pak, entry)
+
+    def iter_index(self):
+        """
+        Generator which yields `(real, pak, path)` tuples for every entry
+        in the file, sorted by `path_key(real)`.
+        """
+        for chunk in self.toc['index']:
+            for real, pak_index, path in self._read_lines(chunk):
+                yield (real, self.paks[pak_index], path)
+
+    def lookup(self, path):
+        """
+        Finds all entries whose in-game path matches `path` (case-insensitively,
+        and with or without a leading slash).  Returns a list of `(real, pak,
+        path)` tuples.
+        """
+        key = path_key(path)
+        # Equal keys might spill over from the end of the previous chunk, so
+        # start from the last chunk which begins strictly before our key.
+        idx = max(bisect.bisect_left(self.index_keys, key) - 1, 0)
+        results = []
+        for chunk in self.toc['index'][idx:]:
+            if chunk['first'] > key:
+                break
+            for real, pak_index, inner in self._read_lines(chunk):
+                real_key = path_key(real)
+                if real_key == key:
+                    results.append((real, self.paks[pak_index], inner))
+                elif real_key > key:
+                    return results
+        return results
+
+    def close(self):
+        self.df.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Query structured contents-*.jsonl.xz files',
+            epilog="""
+                Without any options, lists the pakfiles described by the
+                contents file.
+            """,
+            )
+
+    group = parser.add_mutually_exclusive_group()
+
+    group.add_argument('-p', '--pak',
+            type=str,
+            help='Show the contents of the specified pakfile',
+            )
+
+    group.add_argument('-l', '--lookup',
+            type=str,
+            action='append',
+            help='Look up the given in-game path (can be specified more than once)',
+            )
+
+    parser.add_argument('filename',
+            nargs=1,
+            help='Structured contents file to read',
+            )
+
+    args = parser.parse_args()
+
+    with ContentsFile(args.filename[0]) as contents:
+        if args.pak:
+            if args.pak not in contents.paks_by_name:
+                print(f'{args.pak} not found in {contents.patch}')
+                sys.exit(1)
+            for entry in contents.pak_entries(args.pak):
+                print(' - {}'.format(entry['path']))
+        elif args.lookup:
+            for path in args.lookup:
+                results = contents.lookup(path)
+                if results:
+                    for real, pak, inner in results:
+                        print(f'{real}: {pak["filename"]} ({inner})')
+                else:
+                    print(f'{path}: not found')
+        else:
+            print(f'{contents.patch}:')
+            for pak in contents.paks:
+                print(' - {} ({} entries, mounted at {})'.format(
+                    pak['filename'],
+                    pak['entries'],
+                    pak['mountpoint'],
+                    ))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import time
+import sqlite3
+import argparse
+import pakcontents
+
+# Wildcard/substring search over every object in every pakfile we know
+# about.  The web pakfile lookup (and the MySQL database behind it) only
+# supports exact matches on the object's base name; this keeps a local
+# SQLite database with an FTS5 trigram index over the in-game object paths,
+# so that substring/wildcard searches don't need to scan every row.
+#
+# The database gets populated from the contents-*.jsonl.xz (or, for older
+# patches, contents-*.txt.xz) files written by list_contents.py -- pass
+# `-s`/`--search-index` to that to keep this updated as you go, or use
+# `-i`/`--index` here to (re-)import contents files.  Re-importing a patch
+# replaces whatever we had for it previously.
+#
+# Search patterns are shell-style globs, matched case-insensitively against
+# the full in-game path: `*` matches anything and `?` matches a single
+# character.  A pattern without any wildcards is treated as a substring
+# search.  Any literal run of at least three characters in the pattern can
+# be looked up in the trigram index; patterns without one (like `*a*`) will
+# still work, but need a full scan.
+#
+# Requires SQLite 3.34 or newer, for the trigram tokenizer.
+
+default_db = 'bl3pakfile-search.sqlite3'
+
+schema = """
+    create table if not exists patch (
+        pid integer primary key,
+        dirname text not null unique
+    );
+    create table if not exists pakfile (
+        fid integer primary key,
+        pid integer not null references patch (pid),
+        filename text not null,
+        mountpoint text not null,
+        unique (pid, filename)
+    );
+    create table if not exists object (
+        oid integer primary key,
+        filename_full text not null,
+        filename_real text not null,
+        unique (filename_full, filename_real)
+    );
+    create table if not exists o2f (
+        oid integer not null references object (oid),
+        fid integer not null references pakfile (fid),
+        primary key (oid, fid)
+    ) without rowid;
+    create index if not exists idx_o2f_fid on o2f (fid);
+    create virtual table if not exists object_search using fts5 (
+        filename_real,
+        content='object',
+        content_rowid='oid',
+        tokenize='trigram'
+    );
+    """
+
+
+def connect(filename=default_db):
+    """
+    Opens (and creates, if needed) the search database.
+    """
+    conn = sqlite3.connect(filename)
+    conn.executescript(schema)
+    return conn
+
+
+def index_contents(conn, filename, patch=None):
+    """
+    Imports a structured or textual contents file into the search database,
+    replacing any data we might already have for that patch.  Returns the
+    number of entries processed.
+    """
+    if patch is None:
+        patch = pakcontents.patch_from_filename(filename)
+    curs = conn.cursor()
+
+    # Clear out any existing data for the patch
+    curs.execute('insert or ignore into patch (dirname) values (?)', (patch,))
+    pid = curs.execute('select pid from patch where dirname=?', (patch,)).fetchone()[0]
+    curs.execute('delete from o2f where fid in (select fid from pakfile where pid=?)', (pid,))
+    curs.execute('delete from pakfile where pid=?', (pid,))
+
+    # Now add everything
+    pakfiles = {}
+    objects = {}
+    count = 0
+    for pak_filename, mountpoint, path in pakcontents.iter_contents(filename):
+        if pak_filename not in pakfiles:
+            curs.execute('insert into pakfile (pid, filename, mountpoint) values (?, ?, ?)',
+                    (pid, pak_filename, mountpoint))
+            pakfiles[pak_filename] = curs.lastrowid
+        real = '/' + pakcontents.real_path(mountpoint, path)
+        key = (path, real)
+        if key not in objects:
+            row = curs.execute('select oid from object where filename_full=? and filename_real=?', key).fetchone()
+            if row:
+                objects[key] = row[0]
+            else:
+                curs.execute('insert into object (filename_full, filename_real) values (?, ?)', key)
+                objects[key] = curs.lastrowid
+                curs.execute('insert into object_search (rowid, filename_real) values (?, ?)',
+                        (curs.lastrowid, real))
+        curs.execute('insert or ignore into o2f (oid, fid) values (?, ?)', (objects[key], pakfiles[pak_filename]))
+        count += 1
+
+    # Drop any objects which aren't in any pakfile anymore (ie: ones which
+    # were removed from this patch when it was re-imported).  The search
+    # index is an external-content table, so has to be told about them
+    # explicitly.
+    orphans = curs.execute("""
+        select oid, filename_real from object o
+        where not exists (select 1 from o2f m where m.oid=o.oid)
+        """).fetchall()
+    curs.executemany("insert into object_search (object_search, rowid, filename_real) values ('delete', ?, ?)",
+            orphans)
+    curs.executemany('delete from object where oid=?', [(oid,) for oid, _ in orphans])
+
+    conn.commit()
+    return count
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def pattern_to_query(pattern):
+    """
+    Converts a glob-style search pattern into a tuple of an FTS5 match
+    expression (or `None`, if there's nothing long enough to use the
+    trigram index with), and an SQL LIKE pattern to do the final matching.
+    """
+    if '*' not in pattern and '?' not in pattern:
+        pattern = f'*{pattern}*'
+
+    like = []
+    fragments = []
+    current = []
+    for char in pattern:
+        if char in '*?':
+            like.append('%' if char == '*' else '_')
+            fragments.append(''.join(current))
+            current = []
+        else:
+            like.append(_like_escape(char))
+            current.append(char)
+    fragments.append(''.join(current))
+
+    terms = []
+    for fragment in fragments:
+        if len(fragment) >= 3:
+            terms.append('"{}"'.format(fragment.replace('"', '""')))
+    if terms:
+        match = ' AND '.join(terms)
+    else:
+        match = None
+    return (match, ''.join(like))
+
+
+def search(conn, pattern, limit=None):
+    """
+    Searches for objects whose in-game path matches the glob-style `pattern`
+    (see the notes at the top of this file).  Returns a list of tuples of
+    `(filename_real, filename_full, patch, pakfile)`, ordered by path and
+    then by patch.
+    """
+    match, like = pattern_to_query(pattern)
+    if match:
+        oid_query = """
+            select rowid from object_search
+            where object_search match ? and filename_real like ? escape '\\'
+            """
+        params = [match, like]
+    else:
+        oid_query = """
+            select oid from object
+            where filename_real like ? escape '\\'
+            """
+        params = [like]
+    if limit:
+        oid_query += ' limit ?'
+        params.append(limit)
+    return conn.execute(f"""
+        select o.filename_real, o.filename_full, p.dirname, f.filename
+        from object o, o2f m, pakfile f, patch p
+        where o.oid in ({oid_query})
+            and m.oid=o.oid
+            and m.fid=f.fid
+            and f.pid=p.pid
+        order by o.filename_real, p.dirname, f.filename
+        """, params).fetchall()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Wildcard search for objects inside BL3 pakfiles',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Patterns are shell-style globs (`*` and `?`) matched
+                case-insensitively against full in-game object paths, such
+                as `*Dandelion*Shield*`.  Patterns without wildcards are
+                treated as substring searches.  Be sure to quote patterns
+                so your shell doesn't expand them!
+            """,
+            )
+
+    parser.add_argument('-d', '--database',
+            type=str,
+            default=default_db,
+            help='Search database to use',
+            )
+
+    parser.add_argument('-i', '--index',
+            type=str,
+            action='append',
+            metavar='CONTENTS_FILE',
+            help='Import the given contents-*.xz file into the database (can be specified more than once)',
+            )
+
+    parser.add_argument('-a', '--index-all',
+            action='store_true',
+            help='Import all contents-*.xz files in the current directory',
+            )
+
+    parser.add_argument('-l', '--limit',
+            type=int,
+            help='Maximum number of objects to return per pattern',
+            )
+
+    parser.add_argument('pattern',
+            nargs='*',
+            help='Pattern(s) to search for',
+            )
+
+    args = parser.parse_args()
+
+    conn = connect(args.database)
+
+    to_index = []
+    if args.index_all:
+        to_index.extend(pakcontents.find_contents_files().values())
+    if args.index:
+        to_index.extend(args.index)
+    for filename in to_index:
+        print(f'Indexing {filename}...')
+        start = time.perf_counter()
+        count = index_contents(conn, filename)
+        print(f' - {count} entries in {time.perf_counter()-start:.1f}s')
+    if to_index:
+        print('')
+
+    for pattern in args.pattern:
+        start = time.perf_counter()
+        results = search(conn, pattern, limit=args.limit)
+        elapsed = (time.perf_counter()-start)*1000
+        prev_real = None
+        num_objects = 0
+        for filename_real, filename_full, patch, pakfile in results:
+            if filename_real != prev_real:
+                print(filename_real)
+                prev_real = filename_real
+                num_objects += 1
+            print(f' - {patch}: {pakfile} ({filename_full})')
+        print(f'{pattern}: {num_objects} object(s) found in {elapsed:.1f}ms', file=sys.stderr)
+
+    conn.close()
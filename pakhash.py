@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import pakprobe
+import concurrent.futures
+
+# In-process file hashing for pakfiles, used by link_paks.py.  Files get
+# read in big chunks straight into a reusable buffer, and several files
+# can be hashed at once on a thread pool (hashlib releases the GIL while
+# it's crunching through data, and so does file I/O), which is generally
+# what it takes to keep fast storage busy.  The right number of workers
+# depends a lot on the storage, so the CLI here reports throughput to help
+# tune it.
+#
+# There's also a persistent cache of hashes keyed on the file's device,
+# inode, size and mtime, so that paks which haven't changed since the last
+# time we looked don't have to be read again, and a reader/writer for our
+# `checksums-sha256sum-*.txt` files.  The cache also stores a quick
+# fingerprint of each pak (see pakprobe.py), so if a pak's stat info
+# changes but its fingerprint doesn't (if it got copied or touched, for
+# instance), we still don't need to re-hash it.
+
+# Size of the read buffer for each worker
+DEFAULT_BUFFER_SIZE = 8*1024*1024
+
+# Default location of the hash cache
+DEFAULT_CACHE_FILE = '.pakhash-cache.json'
+
+# Default number of files to hash at once.  More than a few doesn't tend to
+# help on spinning disks, but SSDs can handle more.
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+
+
+def hash_file(filename, algorithm='sha256', buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Hashes `filename` using the given hashlib `algorithm`.  Returns a tuple
+    of the hex digest and the number of bytes read.
+    """
+    hasher = hashlib.new(algorithm)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    total = 0
+    with open(filename, 'rb', buffering=0) as df:
+        while (size := df.readinto(buf)):
+            hasher.update(view[:size])
+            total += size
+    return (hasher.hexdigest(), total)
+
+
+class HashResult:
+    """
+    The result of hashing a single file.  If the hash failed, `digest` will
+    be `None` and `error` will be the exception raised.
+    """
+
+    __slots__ = ('filename', 'digest', 'size', 'seconds', 'error', 'cached', 'probed')
+
+    def __init__(self, filename, digest=None, size=0, seconds=0, error=None, cached=False, probed=False):
+        self.filename = filename
+        self.digest = digest
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+        self.cached = cached
+        self.probed = probed
+
+    def __repr__(self):
+        return f'HashResult<{self.filename}>'
+
+
+def _hash_worker(filename, algorithm, buffer_size):
+    start = time.perf_counter()
+    try:
+        digest, size = hash_file(filename, algorithm=algorithm, buffer_size=buffer_size)
+    except OSError as e:
+        return HashResult(filename, error=e, seconds=time.perf_counter()-start)
+    return HashResult(filename, digest, size, time.perf_counter()-start)
+
+
+class HashCache:
+    """
+    Persistent cache of file hashes, keyed on `(device, inode, size,
+    mtime_ns)` of the (symlink-resolved) file.  If any of those change, the
+    file gets hashed again, unless its pakprobe fingerprint is unchanged.
+    Stored as JSON; call `save()` to write out any changes.
+    """
+
+    def __init__(self, filename=DEFAULT_CACHE_FILE, algorithm='sha256'):
+        self.filename = filename
+        self.algorithm = algorithm
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(filename):
+            with open(filename) as df:
+                data = json.load(df)
+            if data.get('algorithm') == algorithm:
+                self.entries = data['entries']
+        self.by_filename = {}
+        for key, entry in self.entries.items():
+            self.by_filename[entry['filename']] = key
+
+    @staticmethod
+    def key(stat):
+        return f'{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'
+
+    def get(self, stat):
+        """
+        Returns the cached digest for a file with the given `os.stat()`
+        result, or `None`.
+        """
+        entry = self.entries.get(self.key(stat))
+        if entry is None:
+            return None
+        return entry['digest']
+
+    def get_fingerprint(self, filename):
+        """
+        Returns the most recently cached `(fingerprint, digest)` for the
+        given file, regardless of its current stat info, or `None`.
+        """
+        key = self.by_filename.get(os.path.realpath(filename))
+        if key is None:
+            return None
+        entry = self.entries[key]
+        if entry.get('fingerprint') is None:
+            return None
+        return (entry['fingerprint'], entry['digest'])
+
+    def set(self, stat, filename, digest, fingerprint=None):
+        """
+        Stores the digest (and optionally the pakprobe fingerprint) for a
+        file.
+        """
+        filename = os.path.realpath(filename)
+        key = self.key(stat)
+        old_key = self.by_filename.get(filename)
+        if old_key is not None and old_key != key:
+            del self.entries[old_key]
+        self.entries[key] = {
+                'digest': digest,
+                'filename': filename,
+                'fingerprint': fingerprint,
+                }
+        self.by_filename[filename] = key
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        temp_filename = f'{self.filename}.tmp'
+        with open(temp_filename, 'w') as df:
+            json.dump({
+                'algorithm': self.algorithm,
+                'entries': self.entries,
+                }, df, indent=1, sort_keys=True)
+        os.replace(temp_filename, self.filename)
+        self.changed = False
+
+
+def hash_files(filenames, jobs=DEFAULT_JOBS, algorithm='sha256', buffer_size=DEFAULT_BUFFER_SIZE, cache=None):
+    """
+    Generator which hashes all of `filenames` on a thread pool of `jobs`
+    workers, yielding a `HashResult` for each, in the same order as
+    `filenames`.  If a `HashCache` is passed in as `cache`, files which
+    haven't changed since they were cached won't be read at all, and paks
+    whose fingerprint is unchanged will only have their index read (their
+    results will have `cached`, and possibly `probed`, set).  The cache will
+    be updated with new hashes, but isn't saved.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = []
+        for filename in filenames:
+            stat = None
+            fingerprint = None
+            if cache is not None:
+                try:
+                    stat = os.stat(filename)
+                except OSError as e:
+                    pending.append((None, None, HashResult(filename, error=e)))
+                    continue
+                if (digest := cache.get(stat)) is not None:
+                    pending.append((None, None, HashResult(filename, digest, stat.st_size, cached=True)))
+                    continue
+                if (probe := pakprobe.try_probe(filename)) is not None:
+                    fingerprint = probe.fingerprint
+                    cached = cache.get_fingerprint(filename)
+                    if cached is not None and cached[0] == fingerprint:
+                        cache.set(stat, filename, cached[1], fingerprint)
+                        pending.append((None, None, HashResult(filename, cached[1], stat.st_size,
+                            probe.seconds, cached=True, probed=True)))
+                        continue
+            pending.append((stat, fingerprint, executor.submit(_hash_worker, filename, algorithm, buffer_size)))
+        for stat, fingerprint, result in pending:
+            if isinstance(result, concurrent.futures.Future):
+                result = result.result()
+                if stat is not None and result.digest is not None:
+                    cache.set(stat, result.filename, result.digest, fingerprint)
+            yield result
+
+
+class ChecksumSection:
+    """
+    One patch's worth of checksums from a checksum file.  `notes` are any
+    freeform lines found between the dir name and the checksums, and
+    `entries` maps pak filenames to their hashes (which may be `n/a` for
+    paks which we know won't match anymore).
+    """
+
+    def __init__(self, dirname, notes=None, entries=None):
+        self.dirname = dirname
+        self.notes = notes or []
+        self.entries = entries or {}
+
+    def __repr__(self):
+        return f'ChecksumSection<{self.dirname}>'
+
+
+class ChecksumFile:
+    """
+    Reader/writer for our `checksums-sha256sum-*.txt` files.  Each section
+    is a `pak-*` dir name, optionally followed by some note lines, then a
+    blank line, then `sha256sum`-style `<hash>  <filename>` lines, then
+    another blank line.  Updating and re-writing a file preserves
+    everything else as-is.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.sections = {}
+        if os.path.exists(filename):
+            with open(filename) as df:
+                self._parse(df)
+
+    def _parse(self, df):
+        section = None
+        in_entries = False
+        for line in df:
+            line = line.rstrip('\n')
+            if section is None:
+                if line:
+                    section = ChecksumSection(line)
+                    self.sections[line] = section
+                    in_entries = False
+            elif not in_entries:
+                if line:
+                    section.notes.append(line)
+                else:
+                    in_entries = True
+            elif line:
+                digest, filename = line.split('  ', 1)
+                section.entries[filename] = digest
+            else:
+                section = None
+
+    def get(self, dirname, filename):
+        """
+        Returns the recorded hash for the given pak, or `None`.
+        """
+        if dirname in self.sections:
+            return self.sections[dirname].entries.get(filename)
+        return None
+
+    def set(self, dirname, filename, digest):
+        """
+        Records the hash for a pak, adding a new section to the end of the
+        file if needed.  Entries marked `n/a` are left alone.  Returns
+        `True` if anything changed.
+        """
+        if dirname not in self.sections:
+            self.sections[dirname] = ChecksumSection(dirname)
+        entries = self.sections[dirname].entries
+        if entries.get(filename) in (digest, 'n/a'):
+            return False
+        entries[filename] = digest
+        return True
+
+    def write(self, filename=None):
+        if filename is None:
+            filename = self.filename
+        temp_filename = f'{filename}.tmp'
+        with open(temp_filename, 'w') as df:
+            for section in self.sections.values():
+                print(section.dirname, file=df)
+                for note in section.notes:
+                    print(note, file=df)
+                print('', file=df)
+                for pakfile, digest in section.entries.items():
+                    print(f'{digest}  {pakfile}', file=df)
+                print('', file=df)
+        os.replace(temp_filename, filename)
+
+
+def format_rate(num_bytes, seconds):
+    """
+    Returns a human-readable throughput report for `num_bytes` processed
+    in `seconds`.
+    """
+    mb = num_bytes/1024/1024
+    if seconds > 0:
+        rate = mb/seconds
+    else:
+        rate = 0
+    return f'{mb:.1f}MB in {seconds:.1f}s ({rate:.1f}MB/s)'
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Hash files in parallel, in sha256sum format',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Throughput is reported on stderr, which can be used to find
+                the best -j/--jobs value for your storage.
+            """,
+            )
+
+    parser.add_argument('-j', '--jobs',
+            type=int,
+            default=DEFAULT_JOBS,
+            help='Number of files to hash at once',
+            )
+
+    parser.add_argument('-b', '--buffer-size',
+            type=int,
+            default=DEFAULT_BUFFER_SIZE,
+            help='Read buffer size, in bytes',
+            )
+
+    parser.add_argument('-c', '--cache',
+            type=str,
+            help='Use (and update) the given hash cache file',
+            )
+
+    parser.add_argument('filename',
+            nargs='+',
+            help='Files to hash',
+            )
+
+    args = parser.parse_args()
+
+    if args.cache:
+        cache = HashCache(args.cache)
+    else:
+        cache = None
+
+    start = time.perf_counter()
+    total = 0
+    for result in hash_files(args.filename, jobs=args.jobs, buffer_size=args.buffer_size, cache=cache):
+        if result.error:
+            print(f'{result.filename}: {result.error}', file=sys.stderr)
+        else:
+            print(f'{result.digest}  {result.filename}')
+            if not result.cached:
+                total += result.size
+    print(format_rate(total, time.perf_counter()-start), file=sys.stderr)
+    if cache:
+        cache.save()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import time
+import struct
+import hashlib
+import argparse
+
+# Quick "has this pak changed?" fingerprinting, without reading the whole
+# file.  UE4 pakfiles end with a small footer which records where the
+# pak's index (the directory of every file inside it, plus their offsets,
+# sizes and hashes) lives.  Any change to the pak's contents changes the
+# index, so a fingerprint made from the file size, the footer, and a hash of
+# the (still-encrypted) index region is a very good indicator of whether a
+# pak has changed, and only needs to read a few megabytes at most.  It's
+# not a substitute for a full checksum when checking for corruption,
+# though -- link_paks.py uses it to decide which paks actually need one.
+#
+# The footer layout, as of the pak versions BL3 uses, is:
+#
+#   EncryptionKeyGuid   16 bytes
+#   bEncryptedIndex     1 byte
+#   Magic               uint32 (0x5A6F12E1)
+#   Version             int32
+#   IndexOffset         int64
+#   IndexSize           int64
+#   IndexHash           20 bytes (SHA1)
+#   CompressionMethods  32-byte names (4 or 5 of them, depending on version)
+#
+# Older versions have fewer fields (and no compression names), so rather
+# than hardcoding an offset we just look for the magic number near the
+# end of the file.
+
+PAK_MAGIC = 0x5A6F12E1
+pak_magic_bytes = struct.pack('<I', PAK_MAGIC)
+
+# How much of the end of the file to read when looking for the footer
+footer_search_size = 512
+
+# Fields which follow the magic number
+footer_struct = struct.Struct('<iqq20s')
+
+# Fields which precede it (for versions which have them)
+guid_size = 16
+encrypted_flag_size = 1
+
+
+class PakFooter:
+    """
+    The interesting bits of a pakfile footer.  `offset` is where in the
+    file the footer starts.
+    """
+
+    def __init__(self, offset, version, index_offset, index_size, index_hash,
+            encrypted_index=None, encryption_key_guid=None):
+        self.offset = offset
+        self.version = version
+        self.index_offset = index_offset
+        self.index_size = index_size
+        self.index_hash = index_hash
+        self.encrypted_index = encrypted_index
+        self.encryption_key_guid = encryption_key_guid
+
+    def __repr__(self):
+        return f'PakFooter<v{self.version}, index {self.index_offset}+{self.index_size}>'
+
+
+def read_footer(df, size=None):
+    """
+    Finds and parses the footer of the pakfile open as `df` (a binary file
+    object).  Returns a tuple of the `PakFooter` and the raw footer bytes.
+    Raises `ValueError` if it doesn't look like a pakfile.
+    """
+    if size is None:
+        size = df.seek(0, os.SEEK_END)
+    tail_start = max(0, size-footer_search_size)
+    df.seek(tail_start)
+    tail = df.read(size-tail_start)
+
+    # Search backwards, so that compression method names which happen to
+    # contain the magic bytes can't fool us
+    pos = len(tail)
+    while (pos := tail.rfind(pak_magic_bytes, 0, pos)) >= 0:
+        if pos + 4 + footer_struct.size <= len(tail):
+            version, index_offset, index_size, index_hash = footer_struct.unpack_from(tail, pos+4)
+            if 0 < version < 100 and 0 <= index_offset and 0 <= index_size \
+                    and index_offset + index_size <= tail_start + pos:
+                encrypted_index = None
+                guid = None
+                start = pos
+                if pos >= encrypted_flag_size:
+                    encrypted_index = bool(tail[pos-encrypted_flag_size])
+                    start -= encrypted_flag_size
+                    if pos >= encrypted_flag_size + guid_size:
+                        guid = tail[pos-encrypted_flag_size-guid_size:pos-encrypted_flag_size]
+                        start -= guid_size
+                footer = PakFooter(tail_start+start, version, index_offset, index_size,
+                        index_hash, encrypted_index, guid)
+                return (footer, tail[start:])
+    raise ValueError('No pakfile footer found')
+
+
+class ProbeResult:
+    """
+    The result of probing a single pakfile.  `fingerprint` is a string which
+    will change if the pak changes.
+    """
+
+    __slots__ = ('filename', 'size', 'footer', 'fingerprint', 'seconds')
+
+    def __init__(self, filename, size, footer, fingerprint, seconds):
+        self.filename = filename
+        self.size = size
+        self.footer = footer
+        self.fingerprint = fingerprint
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f'ProbeResult<{self.filename}>'
+
+
+def probe(filename, buffer_size=1024*1024):
+    """
+    Fingerprints the pakfile `filename` from its size, footer, and a hash of
+    its index region.  Returns a `ProbeResult`.  Raises `ValueError` if the
+    file isn't a pakfile.
+    """
+    start = time.perf_counter()
+    with open(filename, 'rb') as df:
+        size = df.seek(0, os.SEEK_END)
+        footer, footer_data = read_footer(df, size)
+        hasher = hashlib.sha256()
+        hasher.update(struct.pack('<q', size))
+        hasher.update(footer_data)
+        df.seek(footer.index_offset)
+        remaining = footer.index_size
+        while remaining > 0:
+            data = df.read(min(remaining, buffer_size))
+            if not data:
+                raise ValueError('Pakfile index extends past end of file')
+            hasher.update(data)
+            remaining -= len(data)
+    fingerprint = f'{size}:{hasher.hexdigest()}'
+    return ProbeResult(filename, size, footer, fingerprint, time.perf_counter()-start)
+
+
+def try_probe(filename):
+    """
+    Like `probe()`, but returns `None` instead of raising an exception if
+    the file can't be probed.
+    """
+    try:
+        return probe(filename)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Quickly fingerprint BL3 pakfiles',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Reports each pak's footer info and a fingerprint based on
+                its size, footer, and index, which can be used to tell if a
+                pak has changed without hashing the whole thing.
+            """,
+            )
+
+    parser.add_argument('filename',
+            nargs='+',
+            help='Pakfiles to probe',
+            )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for filename in args.filename:
+        try:
+            result = probe(filename)
+        except (OSError, ValueError) as e:
+            print(f'{filename}: {e}')
+            continue
+        footer = result.footer
+        print(f'{filename}: {result.fingerprint}')
+        print(f'  version {footer.version}, index {footer.index_offset}+{footer.index_size}'
+                f' (encrypted: {footer.encrypted_index}), {result.seconds*1000:.1f}ms')
+    print(f'Probed {len(args.filename)} file(s) in {(time.perf_counter()-start)*1000:.1f}ms', file=sys.stderr)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from array import array
+
+# Compact in-memory storage for huge numbers of object paths.  BL3 has
+# hundreds of thousands of objects, nearly all of which share a handful of
+# long directory prefixes, and storing each one as its own full-path string
+# (plus a lowercased copy to look it up by, plus a set of pakfile IDs, etc)
+# adds up quickly.
+#
+# `PathTable` stores each directory component once, as a tree, and each
+# path as just a directory ID plus its filename, with the filenames all
+# packed into a single bytearray.  Case-insensitive lookups go through an
+# open-addressed hash table stored in an `array`, so there are no
+# per-path Python objects at all.  Paths are identified by a "path ID",
+# which is just the order in which they were added.
+#
+# `Membership` is a replacement for per-object `set()`s of pakfile IDs: it
+# keeps one bitmap per pakfile, indexed by object ID.
+#
+# Running this directly will do a tracemalloc benchmark comparing this
+# against the plain-Python-objects approach we used to use.
+
+
+class PathTable:
+    """
+    Compact, case-insensitive store of slash-separated paths.  Original
+    case is preserved for both directories and filenames (whichever case
+    was seen first wins, for directories).
+    """
+
+    __slots__ = (
+            'dir_parent',
+            'dir_name',
+            'dir_lookup',
+            'last_dir',
+            'path_dir',
+            'path_hash',
+            'name_offsets',
+            'name_data',
+            'slots',
+            'mask',
+            )
+
+    def __init__(self):
+        # Directory tree.  ID 0 is the root, which has no name
+        self.dir_parent = array('i', [-1])
+        self.dir_name = ['']
+        self.dir_lookup = {}
+        # Paths tend to come in clumps from the same directory, so remember
+        # the last one we looked up.
+        self.last_dir = (None, 0)
+
+        # Per-path data
+        self.path_dir = array('I')
+        self.path_hash = array('I')
+        self.name_offsets = array('I', [0])
+        self.name_data = bytearray()
+
+        # Hash table of path IDs (-1 is empty)
+        self.slots = array('i', [-1])*1024
+        self.mask = 1023
+
+    def __len__(self):
+        return len(self.path_dir)
+
+    def _find_dir(self, dirname, create):
+        """
+        Returns the directory ID for the given directory path (`None` for
+        the root), creating it if `create` is set.  Returns `None` if it
+        doesn't exist and we're not creating.
+        """
+        if dirname is None:
+            return 0
+        lower_dirname = dirname.lower()
+        if self.last_dir[0] == lower_dirname:
+            return self.last_dir[1]
+        dir_id = 0
+        for component in dirname.split('/'):
+            key = (dir_id, component.lower())
+            if key in self.dir_lookup:
+                dir_id = self.dir_lookup[key]
+            elif create:
+                new_id = len(self.dir_name)
+                self.dir_parent.append(dir_id)
+                self.dir_name.append(sys.intern(component))
+                self.dir_lookup[(dir_id, sys.intern(key[1]))] = new_id
+                dir_id = new_id
+            else:
+                return None
+        self.last_dir = (lower_dirname, dir_id)
+        return dir_id
+
+    def _probe(self, dir_id, lower_name, hashval):
+        """
+        Walks the hash table for the given dir/name.  Returns a tuple of the
+        slot index and the path ID found there (-1 if not found).
+        """
+        slots = self.slots
+        idx = hashval & self.mask
+        while (path_id := slots[idx]) != -1:
+            if (self.path_hash[path_id] == hashval
+                    and self.path_dir[path_id] == dir_id
+                    and self.name(path_id).lower() == lower_name):
+                return (idx, path_id)
+            idx = (idx + 1) & self.mask
+        return (idx, -1)
+
+    def _grow(self):
+        new_size = len(self.slots)*2
+        self.slots = array('i', [-1])*new_size
+        self.mask = new_size - 1
+        for path_id, hashval in enumerate(self.path_hash):
+            idx = hashval & self.mask
+            while self.slots[idx] != -1:
+                idx = (idx + 1) & self.mask
+            self.slots[idx] = path_id
+
+    def add(self, path):
+        """
+        Adds a path to the table (if it's not already there, case-insensitively),
+        and returns its path ID.
+        """
+        dirname, sep, name = path.rpartition('/')
+        dir_id = self._find_dir(dirname if sep else None, create=True)
+        lower_name = name.lower()
+        hashval = hash((dir_id, lower_name)) & 0xFFFFFFFF
+        idx, path_id = self._probe(dir_id, lower_name, hashval)
+        if path_id != -1:
+            return path_id
+
+        path_id = len(self.path_dir)
+        self.path_dir.append(dir_id)
+        self.path_hash.append(hashval)
+        self.name_data += name.encode('utf-8')
+        self.name_offsets.append(len(self.name_data))
+        self.slots[idx] = path_id
+        if len(self.path_dir)*2 > len(self.slots):
+            self._grow()
+        return path_id
+
+    def find(self, path):
+        """
+        Returns the path ID for the given path (case-insensitively), or `None`
+        if it's not in the table.
+        """
+        dirname, sep, name = path.rpartition('/')
+        dir_id = self._find_dir(dirname if sep else None, create=False)
+        if dir_id is None:
+            return None
+        lower_name = name.lower()
+        _, path_id = self._probe(dir_id, lower_name, hash((dir_id, lower_name)) & 0xFFFFFFFF)
+        if path_id == -1:
+            return None
+        return path_id
+
+    def __contains__(self, path):
+        return self.find(path) is not None
+
+    def name(self, path_id):
+        """
+        Returns just the filename part of the given path ID.
+        """
+        return self.name_data[self.name_offsets[path_id]:self.name_offsets[path_id+1]].decode('utf-8')
+
+    def dirname(self, dir_id):
+        """
+        Returns the full directory path for the given directory ID.
+        """
+        parts = []
+        while dir_id > 0:
+            parts.append(self.dir_name[dir_id])
+            dir_id = self.dir_parent[dir_id]
+        parts.reverse()
+        return '/'.join(parts)
+
+    def path(self, path_id):
+        """
+        Returns the full path for the given path ID.
+        """
+        dir_id = self.path_dir[path_id]
+        if dir_id == 0:
+            return self.name(path_id)
+        else:
+            return '{}/{}'.format(self.dirname(dir_id), self.name(path_id))
+
+    def __iter__(self):
+        for path_id in range(len(self.path_dir)):
+            yield self.path(path_id)
+
+
+class Membership:
+    """
+    Array-backed many-to-many mapping between "item" IDs and "group" IDs
+    (objects and pakfiles, in our case).  One bitmap is stored per group,
+    indexed by item ID, so this works best when item IDs are reasonably
+    dense (as database autoincrement IDs are).
+    """
+
+    __slots__ = ('bitmaps',)
+
+    def __init__(self):
+        self.bitmaps = {}
+
+    def add(self, item_id, group_id):
+        if group_id not in self.bitmaps:
+            self.bitmaps[group_id] = bytearray()
+        bitmap = self.bitmaps[group_id]
+        byte = item_id >> 3
+        if byte >= len(bitmap):
+            bitmap.extend(bytes(max(byte + 1 - len(bitmap), len(bitmap)//2)))
+        bitmap[byte] |= 1 << (item_id & 7)
+
+    def contains(self, item_id, group_id):
+        bitmap = self.bitmaps.get(group_id)
+        if bitmap is None:
+            return False
+        byte = item_id >> 3
+        return byte < len(bitmap) and bool(bitmap[byte] & (1 << (item_id & 7)))
+
+    def groups(self, item_id):
+        """
+        Returns a list of all group IDs the given item is in.
+        """
+        return [group_id for group_id in self.bitmaps if self.contains(item_id, group_id)]
+
+
+def synthetic_paths(count, seed=0):
+    """
+    Generates `count` unique BL3-looking object paths, for benchmarking.
+    Real BL3 data averages somewhere around ten files per directory, so
+    we do the same.
+    """
+    rng = random.Random(seed)
+    tops = ['OakGame/Content', 'OakGame/Plugins/Wwise/Content', 'Engine/Content']
+    words = ['Gear', 'Weapons', 'Shields', 'Maps', 'Zone_1', 'Dandelion', 'Hibiscus',
+            'Audio', 'Events', 'Characters', 'Enemies', 'GameData', 'Loot', 'Pools',
+            'Materials', 'Textures', 'Meshes', 'Animations', 'Mission', 'Side',
+            'Effects', 'Particles', 'Blueprints', 'Balance', 'Parts', 'Manufacturer']
+    dirs = set()
+    while len(dirs) < max(count//10, 1):
+        depth = rng.randint(2, 7)
+        dirs.add('/'.join([rng.choice(tops)] + [rng.choice(words) for _ in range(depth)]))
+    dirs = sorted(dirs)
+    paths = set()
+    while len(paths) < count:
+        name = '{}_{}_{}.uasset'.format(rng.choice(['BPD', 'Mat', 'WE', 'Tex']),
+                '_'.join(rng.choice(words) for _ in range(rng.randint(1, 3))),
+                rng.randint(0, 99999))
+        paths.add('{}/{}'.format(rng.choice(dirs), name))
+    return sorted(paths)
+
+
+def _measure(label, func, *args):
+    """
+    Runs `func` under tracemalloc and reports its peak memory usage and
+    runtime.  Returns the peak.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f'{label}: peak {peak/1024/1024:.1f}MiB in {elapsed:.2f}s (including tracemalloc overhead)')
+    return peak
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Benchmark memory usage of PathTable versus plain Python objects',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-c', '--count',
+            type=int,
+            default=500000,
+            help='Number of synthetic paths to generate',
+            )
+
+    parser.add_argument('-p', '--paks',
+            type=int,
+            default=150,
+            help='Number of synthetic pakfiles to map paths into',
+            )
+
+    args = parser.parse_args()
+
+    print(f'Generating {args.count} synthetic paths...')
+    paths = synthetic_paths(args.count)
+    rng = random.Random(1)
+    mappings = [(oid, rng.randrange(args.paks)) for oid in range(len(paths)) for _ in range(rng.randint(1, 3))]
+    print('')
+
+    class LegacyGameObject:
+        # This is what list_contents.py's GameObject looked like before
+        def __init__(self, oid, filename_full):
+            self.oid = oid
+            self.filename_full = filename_full
+            self.filename_base = filename_full.split('/')[-1].rsplit('.', 1)[0]
+            self.pakfiles = set()
+
+    def legacy_objects(paths):
+        objects = {}
+        objects_by_id = {}
+        for oid, path in enumerate(paths):
+            gameobject = LegacyGameObject(oid, path)
+            objects[path.lower()] = gameobject
+            objects_by_id[oid] = gameobject
+        for oid, fid in mappings:
+            objects_by_id[oid].pakfiles.add(fid)
+        return (objects, objects_by_id)
+
+    def compact_objects(paths):
+        objects = PathTable()
+        object_oids = array('i')
+        object_paks = Membership()
+        for oid, path in enumerate(paths):
+            objects.add(path)
+            object_oids.append(oid)
+        for oid, fid in mappings:
+            object_paks.add(oid, fid)
+        return (objects, object_oids, object_paks)
+
+    def legacy_set(paths):
+        return set(path.lower() for path in paths)
+
+    def compact_set(paths):
+        table = PathTable()
+        for path in paths:
+            table.add(path)
+        return table
+
+    print(f'list_contents.py-style objects ({len(paths)} objects, {len(mappings)} pakfile mappings):')
+    legacy = _measure('  GameObject/dict/set', legacy_objects, paths)
+    compact = _measure('  PathTable/Membership', compact_objects, paths)
+    print(f'  Reduction: {legacy/compact:.1f}x')
+    print('')
+
+    print(f'check_contents.py-style lowercase path set ({len(paths)} paths):')
+    legacy = _measure('  set of str', legacy_set, paths)
+    compact = _measure('  PathTable', compact_set, paths)
+    print(f'  Reduction: {legacy/compact:.1f}x')
+    print('')
+
+    # Sanity check
+    table = compact_set(paths)
+    for path in rng.sample(paths, 1000):
+        assert table.path(table.find(path.upper())) == path
+    assert table.find('Nope/Nothing.uasset') is None
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import pakhash
+
+# A persistent index of every file in a directory tree (generally a BL3
+# extraction dir), so that tools which need to know about everything in
+# there don't each have to walk hundreds of thousands of files every time
+# they start.  The index is an SQLite database which lives alongside the
+# tree (`<root>.treeindex.sqlite3`, by default) and stores the path, size,
+# mtime, and optionally a hash of every file.
+#
+# Refreshing the index only re-lists directories whose mtime has changed
+# since the last refresh -- a directory's mtime gets updated whenever files
+# are added, removed or renamed inside it.  Every directory still needs a
+# `stat()` (changes further down the tree don't bubble up), but that's a
+# lot cheaper than listing and stat'ing every file.  The one thing this
+# *won't* notice is a file being modified in place without being replaced;
+# use a full refresh if that's a possibility.
+
+schema = """
+    create table if not exists directory (
+        did integer primary key,
+        parent integer,
+        path text not null unique,
+        mtime_ns integer not null
+    );
+    create index if not exists idx_directory_parent on directory (parent);
+    create table if not exists file (
+        did integer not null references directory (did),
+        name text not null,
+        size integer not null,
+        mtime_ns integer not null,
+        hash text,
+        primary key (did, name)
+    ) without rowid;
+    """
+
+# Hash algorithm to use when hashes are requested, and the read buffer size
+# (most extracted files are small, so there's no need for pakhash's default)
+hash_algorithm = 'sha1'
+hash_buffer_size = 256*1024
+
+
+class RefreshStats:
+    """
+    Some statistics about what a refresh had to do.
+    """
+
+    def __init__(self):
+        self.dirs_scanned = 0
+        self.dirs_skipped = 0
+        self.dirs_removed = 0
+        self.files_hashed = 0
+        self.seconds = 0
+
+    def __str__(self):
+        return '{} dirs scanned, {} unchanged, {} removed, {} files hashed, in {:.2f}s'.format(
+                self.dirs_scanned,
+                self.dirs_skipped,
+                self.dirs_removed,
+                self.files_hashed,
+                self.seconds,
+                )
+
+
+class TreeIndex:
+    """
+    Persistent index of the files under `root`.  Call `refresh()` to bring
+    it up to date with what's on disk, and then `iter_files()` to get at
+    the contents.
+    """
+
+    def __init__(self, root, filename=None):
+        self.root = os.path.abspath(root)
+        if filename is None:
+            filename = f'{self.root}.treeindex.sqlite3'
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.executescript(schema)
+
+    def _scan_dir(self, curs, did, full_path, st_mtime_ns):
+        """
+        Lists a single directory, replacing our stored file entries for it.
+        Returns a list of the names of its subdirectories.
+        """
+        old_files = {}
+        for name, size, mtime_ns, hashval in curs.execute(
+                'select name, size, mtime_ns, hash from file where did=?', (did,)):
+            old_files[name] = (size, mtime_ns, hashval)
+
+        subdirs = []
+        new_files = []
+        with os.scandir(full_path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    hashval = None
+                    old = old_files.get(entry.name)
+                    if old is not None and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+                        hashval = old[2]
+                    new_files.append([did, entry.name, stat.st_size, stat.st_mtime_ns, hashval])
+
+        curs.execute('delete from file where did=?', (did,))
+        curs.executemany('insert into file (did, name, size, mtime_ns, hash) values (?, ?, ?, ?, ?)',
+                new_files)
+        curs.execute('update directory set mtime_ns=? where did=?', (st_mtime_ns, did))
+        return subdirs
+
+    def refresh(self, full=False, hashes=False):
+        """
+        Brings the index up to date.  Only directories whose mtime has
+        changed get re-listed, unless `full` is set.  If `hashes` is set,
+        any files without a stored hash (or whose size/mtime changed) get
+        hashed.  Returns a `RefreshStats`.
+        """
+        start = time.perf_counter()
+        stats = RefreshStats()
+        curs = self.conn.cursor()
+
+        known = {}
+        children = {}
+        for did, parent, path, mtime_ns in curs.execute('select did, parent, path, mtime_ns from directory'):
+            known[path] = (did, mtime_ns)
+            children.setdefault(parent, []).append(path)
+
+        seen = set()
+        to_process = [('', None)]
+        while to_process:
+            path, parent_did = to_process.pop()
+            full_path = os.path.join(self.root, path)
+            try:
+                st_mtime_ns = os.stat(full_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+
+            if path in known:
+                did, mtime_ns = known[path]
+                if not full and mtime_ns == st_mtime_ns:
+                    # Nothing added or removed here; just descend
+                    seen.add(path)
+                    stats.dirs_skipped += 1
+                    for child in children.get(did, []):
+                        to_process.append((child, did))
+                    continue
+            else:
+                curs.execute('insert into directory (parent, path, mtime_ns) values (?, ?, ?)',
+                        (parent_did, path, -1))
+                did = curs.lastrowid
+
+            seen.add(path)
+            stats.dirs_scanned += 1
+            for name in self._scan_dir(curs, did, full_path, st_mtime_ns):
+                if path:
+                    to_process.append((f'{path}/{name}', did))
+                else:
+                    to_process.append((name, did))
+
+        # Clean up any dirs which have gone away
+        for path, (did, _) in known.items():
+            if path not in seen:
+                curs.execute('delete from file where did=?', (did,))
+                curs.execute('delete from directory where did=?', (did,))
+                stats.dirs_removed += 1
+
+        # Hash anything which needs it
+        if hashes:
+            to_hash = curs.execute("""
+                select d.did, d.path, f.name from file f, directory d
+                where d.did=f.did and f.hash is null
+                """).fetchall()
+            full_paths = [os.path.join(self.root, path, name) for _, path, name in to_hash]
+            results = pakhash.hash_files(full_paths,
+                    algorithm=hash_algorithm,
+                    buffer_size=hash_buffer_size,
+                    )
+            for (did, _, name), result in zip(to_hash, results):
+                if result.digest is not None:
+                    curs.execute('update file set hash=? where did=? and name=?', (result.digest, did, name))
+                    stats.files_hashed += 1
+
+        self.conn.commit()
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def iter_files(self, extensions=None):
+        """
+        Generator which yields `(path, size, mtime_ns, hash)` tuples for all
+        files in the index, where `path` is relative to the root.  Pass a
+        tuple of `extensions` (ie: `('.uasset', '.umap')`) to only get files
+        with those extensions.  Hashes will be `None` unless they've been
+        computed.
+        """
+        for dirpath, name, size, mtime_ns, hashval in self.conn.execute("""
+                select d.path, f.name, f.size, f.mtime_ns, f.hash
+                from file f, directory d
+                where d.did=f.did
+                """):
+            if extensions and not name.endswith(extensions):
+                continue
+            if dirpath:
+                yield (f'{dirpath}/{name}', size, mtime_ns, hashval)
+            else:
+                yield (name, size, mtime_ns, hashval)
+
+    def __len__(self):
+        return self.conn.execute('select count(*) from file').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_index(root, filename=None, full=False, hashes=False, verbose=True):
+    """
+    Convenience function to open and refresh the index for `root`.
+    """
+    index = TreeIndex(root, filename)
+    stats = index.refresh(full=full, hashes=hashes)
+    if verbose:
+        print(f'Refreshed tree index for {root}: {stats}')
+    return index
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Build/refresh a persistent index of a directory tree',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-i', '--index',
+            type=str,
+            help='Index file to use (defaults to <root>.treeindex.sqlite3)',
+            )
+
+    parser.add_argument('-f', '--full',
+            action='store_true',
+            help='Re-list every directory, not just ones whose mtime changed',
+            )
+
+    parser.add_argument('--hash',
+            action='store_true',
+            help=f'Also compute {hash_algorithm} hashes for new/changed files',
+            )
+
+    parser.add_argument('-l', '--list',
+            action='store_true',
+            help='List all files in the index after refreshing',
+            )
+
+    parser.add_argument('root',
+            nargs=1,
+            help='Root of the tree to index',
+            )
+
+    args = parser.parse_args()
+
+    with open_index(args.root[0], args.index, full=args.full, hashes=args.hash) as index:
+        if args.list:
+            for path, size, mtime_ns, hashval in index.iter_files():
+                if hashval:
+                    print(f'{path}\t{size}\t{hashval}')
+                else:
+                    print(f'{path}\t{size}')
+        print(f'{len(index)} files in index', file=sys.stderr)
@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import mmap
+import time
+import random
+import struct
+import argparse
+import functools
+
+# A minimal reader for the "package file summary" at the start of UE4
+# `.uasset`/`.umap` files, plus the name map, import table and export table
+# that it points to.  This is *not* a general-purpose object parser (use
+# JohnWickParse or similar for that) -- it's just enough for the various
+# scripts in here which want to know what names an object references
+# without hardcoding their own path through the header.
+#
+# The summary is parsed as soon as a `Package` is created (it's small),
+# but the tables are only parsed when they're first accessed, and the name
+# map only decodes individual names as they're asked for.  Packages can be
+# read from a filename (which gets mmapped), or from anything supporting
+# the buffer protocol (`bytes`, an already-open `mmap`, etc).
+#
+# The summary layout, for the engine versions BL3 uses, is:
+#
+#   Tag                         uint32 (0x9E2A83C1)
+#   LegacyFileVersion           int32 (-7 for BL3)
+#   LegacyUE3Version            int32 (only if LegacyFileVersion != -4)
+#   FileVersionUE4              int32 (0 for unversioned packages)
+#   FileVersionLicenseeUE4      int32
+#   CustomVersions              int32 count, then 20 bytes each
+#   TotalHeaderSize             int32
+#   FolderName                  FString
+#   PackageFlags                uint32
+#   NameCount, NameOffset       int32 x2
+#   LocalizationId              FString (only for version >= 516, and not
+#                                 when PKG_FilterEditorOnly is set)
+#   GatherableTextData          int32 count + offset (version >= 459)
+#   ExportCount, ExportOffset   int32 x2
+#   ImportCount, ImportOffset   int32 x2
+#   DependsOffset               int32
+#   SoftPackageReferences       int32 count + offset (version >= 384)
+#   SearchableNamesOffset       int32 (version >= 510)
+#   ThumbnailTableOffset        int32
+#   Guid                        16 bytes
+#   Generations                 int32 count, then 8 bytes each
+#
+# ... and then a bunch more which we don't care about.  FStrings are an
+# int32 length (including the trailing NUL), followed by the string itself;
+# a negative length means the string is UTF-16LE, with that many characters.
+
+PACKAGE_TAG = 0x9E2A83C1
+
+# BL3's packages are all unversioned, which means we've got to assume an
+# engine version for them.  BL3 is UE 4.20-ish.
+UNVERSIONED_UE4_VERSION = 517
+
+# Package flag: editor-only data has been stripped
+PKG_FILTER_EDITOR_ONLY = 0x80000000
+
+# Version thresholds for optional fields
+VER_UE4_ADD_STRING_ASSET_REFERENCES_MAP = 384
+VER_UE4_SERIALIZE_TEXT_IN_PACKAGES = 459
+VER_UE4_NAME_HASHES_SERIALIZED = 504
+VER_UE4_TEMPLATE_INDEX_IN_COOKED_EXPORTS = 508
+VER_UE4_ADDED_SEARCHABLE_NAMES = 510
+VER_UE4_ADDED_PACKAGE_SUMMARY_LOCALIZATION_ID = 516
+
+int32 = struct.Struct('<i')
+uint32 = struct.Struct('<I')
+int32x2 = struct.Struct('<ii')
+custom_version_size = 20
+generation_size = 8
+
+# Table entries.  Import entries are ClassPackage (FName), ClassName (FName),
+# OuterIndex, and ObjectName (FName); FNames are a name index and a number.
+import_struct = struct.Struct('<iiiiiii')
+# Export entries, as of 4.20: ClassIndex, SuperIndex, TemplateIndex,
+# OuterIndex, ObjectName (FName), ObjectFlags, SerialSize, SerialOffset,
+# bForcedExport, bNotForClient, bNotForServer, PackageGuid, PackageFlags,
+# bNotAlwaysLoadedForEditorGame, bIsAsset, and five ints of dependency info.
+export_struct = struct.Struct('<iiiiiiIqqiii16sIiiiiiii')
+
+
+class FName:
+    """
+    A reference to a name in a package's name map, plus its number suffix.
+    Converts to a string as UE does (`Foo_0` for number 1, etc).
+    """
+
+    __slots__ = ('names', 'index', 'number')
+
+    def __init__(self, names, index, number):
+        self.names = names
+        self.index = index
+        self.number = number
+
+    def __str__(self):
+        name = self.names[self.index]
+        if self.number > 0:
+            return f'{name}_{self.number-1}'
+        return name
+
+    def __repr__(self):
+        return f'FName<{self}>'
+
+
+class ImportEntry:
+    """
+    An entry in a package's import table.
+    """
+
+    __slots__ = ('class_package', 'class_name', 'outer_index', 'object_name')
+
+    def __init__(self, class_package, class_name, outer_index, object_name):
+        self.class_package = class_package
+        self.class_name = class_name
+        self.outer_index = outer_index
+        self.object_name = object_name
+
+    def __repr__(self):
+        return f'ImportEntry<{self.class_name} {self.object_name}>'
+
+
+class ExportEntry:
+    """
+    An entry in a package's export table.  Only the more interesting fields
+    are kept.
+    """
+
+    __slots__ = ('class_index', 'super_index', 'template_index', 'outer_index',
+            'object_name', 'object_flags', 'serial_size', 'serial_offset')
+
+    def __init__(self, class_index, super_index, template_index, outer_index,
+            object_name, object_flags, serial_size, serial_offset):
+        self.class_index = class_index
+        self.super_index = super_index
+        self.template_index = template_index
+        self.outer_index = outer_index
+        self.object_name = object_name
+        self.object_flags = object_flags
+        self.serial_size = serial_size
+        self.serial_offset = serial_offset
+
+    def __repr__(self):
+        return f'ExportEntry<{self.object_name}>'
+
+
+class NameMap:
+    """
+    A package's name map.  Only the positions of each name are found up
+    front; names are decoded when they're accessed.  Indexing and iterating
+    give decoded strings.
+    """
+
+    def __init__(self, data, offset, count, hashes):
+        self.data = data
+        # Each entry is the start of the string data and its length in
+        # *bytes* (not counting the trailing NUL), negated for UTF-16
+        self.entries = []
+        self.decoded = {}
+        extra = 4 if hashes else 0
+        pos = offset
+        for _ in range(count):
+            strlen = int32.unpack_from(data, pos)[0]
+            pos += 4
+            if strlen < 0:
+                self.entries.append((pos, strlen*2+2))
+                pos += -strlen*2 + extra
+            else:
+                self.entries.append((pos, max(0, strlen-1)))
+                pos += strlen + extra
+            if pos > len(data):
+                raise ValueError('Name map extends past end of package')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if index in self.decoded:
+            return self.decoded[index]
+        pos, length = self.entries[index]
+        if length < 0:
+            name = bytes(self.data[pos:pos-length]).decode('utf_16_le')
+        else:
+            name = bytes(self.data[pos:pos+length]).decode('latin1')
+        self.decoded[index] = name
+        return name
+
+    def __iter__(self):
+        for index in range(len(self.entries)):
+            yield self[index]
+
+    def find(self, wanted):
+        """
+        Given a collection of lowercase `wanted` names, returns a dict
+        mapping any which are present (case-insensitively) to their actual
+        capitalization.  Only names whose length matches something in
+        `wanted` get decoded at all, which makes this a lot quicker than
+        decoding the whole map.
+        """
+        wanted_lengths = {len(name) for name in wanted}
+        found = {}
+        for index, (pos, length) in enumerate(self.entries):
+            if length < 0:
+                if -length//2 not in wanted_lengths:
+                    continue
+            elif length not in wanted_lengths:
+                continue
+            name = self[index]
+            if (lower := name.lower()) in wanted:
+                found[lower] = name
+        return found
+
+
+class Package:
+    """
+    The package summary of a UE4 package, from `source`, which can be a
+    filename or a buffer (`bytes`, `mmap`, etc).  Raises `ValueError` if it
+    doesn't look like a package.  The name map, imports and exports are
+    available as `names`, `imports` and `exports`, and get parsed when
+    first accessed.  If given a filename, the file stays mapped until
+    `close()` is called (or the context manager exits).
+    """
+
+    def __init__(self, source):
+        self.filename = None
+        self._df = None
+        self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            self.filename = source
+            self._df = open(source, 'rb')
+            try:
+                self._mmap = mmap.mmap(self._df.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                self._df.close()
+                raise ValueError(f'{source}: not a UE4 package')
+            self.data = self._mmap
+        else:
+            self.data = source
+        try:
+            self._parse_summary()
+        except struct.error:
+            self.close()
+            raise ValueError('Truncated package summary')
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_int(self):
+        value = int32.unpack_from(self.data, self._pos)[0]
+        self._pos += 4
+        return value
+
+    def _read_int_pair(self):
+        values = int32x2.unpack_from(self.data, self._pos)
+        self._pos += 8
+        return values
+
+    def _read_fstring(self):
+        strlen = self._read_int()
+        pos = self._pos
+        if strlen < 0:
+            self._pos += -strlen*2
+            return bytes(self.data[pos:self._pos-2]).decode('utf_16_le')
+        else:
+            self._pos += strlen
+            return bytes(self.data[pos:self._pos-1]).decode('latin1')
+
+    def _parse_summary(self):
+        data = self.data
+        self._pos = 0
+        if uint32.unpack_from(data, 0)[0] != PACKAGE_TAG:
+            raise ValueError('Not a UE4 package')
+        self._pos = 4
+        self.legacy_file_version = self._read_int()
+        if self.legacy_file_version != -4:
+            self.legacy_ue3_version = self._read_int()
+        else:
+            self.legacy_ue3_version = None
+        self.file_version_ue4 = self._read_int()
+        self.file_version_licensee = self._read_int()
+        self.unversioned = (self.file_version_ue4 == 0)
+        if self.unversioned:
+            self.version = UNVERSIONED_UE4_VERSION
+        else:
+            self.version = self.file_version_ue4
+        version = self.version
+
+        num_custom_versions = self._read_int()
+        if num_custom_versions < 0:
+            raise ValueError('Invalid custom version count')
+        self._pos += num_custom_versions*custom_version_size
+
+        self.total_header_size = self._read_int()
+        self.folder_name = self._read_fstring()
+        self.package_flags = uint32.unpack_from(data, self._pos)[0]
+        self._pos += 4
+        self.name_count, self.name_offset = self._read_int_pair()
+
+        self.localization_id = None
+        if version >= VER_UE4_ADDED_PACKAGE_SUMMARY_LOCALIZATION_ID \
+                and not (self.package_flags & PKG_FILTER_EDITOR_ONLY):
+            self.localization_id = self._read_fstring()
+        if version >= VER_UE4_SERIALIZE_TEXT_IN_PACKAGES:
+            self.gatherable_text_data_count, self.gatherable_text_data_offset = self._read_int_pair()
+        else:
+            self.gatherable_text_data_count, self.gatherable_text_data_offset = 0, 0
+
+        self.export_count, self.export_offset = self._read_int_pair()
+        self.import_count, self.import_offset = self._read_int_pair()
+        self.depends_offset = self._read_int()
+        if version >= VER_UE4_ADD_STRING_ASSET_REFERENCES_MAP:
+            self.soft_package_references_count, self.soft_package_references_offset = self._read_int_pair()
+        else:
+            self.soft_package_references_count, self.soft_package_references_offset = 0, 0
+        if version >= VER_UE4_ADDED_SEARCHABLE_NAMES:
+            self.searchable_names_offset = self._read_int()
+        else:
+            self.searchable_names_offset = 0
+        self.thumbnail_table_offset = self._read_int()
+        self.guid = bytes(data[self._pos:self._pos+16])
+        self._pos += 16
+
+        num_generations = self._read_int()
+        if num_generations < 0:
+            raise ValueError('Invalid generation count')
+        self.generations = []
+        for _ in range(num_generations):
+            self.generations.append(self._read_int_pair())
+
+        for count, offset in [
+                (self.name_count, self.name_offset),
+                (self.import_count, self.import_offset),
+                (self.export_count, self.export_offset),
+                ]:
+            if count < 0 or offset < 0 or offset > len(data):
+                raise ValueError('Invalid table offsets in package summary')
+
+    @functools.cached_property
+    def names(self):
+        """
+        The package's name map, as a `NameMap`.
+        """
+        try:
+            return NameMap(self.data, self.name_offset, self.name_count,
+                    self.version >= VER_UE4_NAME_HASHES_SERIALIZED)
+        except struct.error:
+            raise ValueError('Name map extends past end of package')
+
+    def _fname(self, index, number):
+        return FName(self.names, index, number)
+
+    @functools.cached_property
+    def imports(self):
+        """
+        The package's import table, as a list of `ImportEntry`s.
+        """
+        imports = []
+        fname = self._fname
+        for (pkg_idx, pkg_num, class_idx, class_num, outer_index, name_idx, name_num) \
+                in import_struct.iter_unpack(self.data[self.import_offset:self.import_offset+self.import_count*import_struct.size]):
+            imports.append(ImportEntry(fname(pkg_idx, pkg_num), fname(class_idx, class_num),
+                outer_index, fname(name_idx, name_num)))
+        if len(imports) != self.import_count:
+            raise ValueError('Import table extends past end of package')
+        return imports
+
+    @functools.cached_property
+    def exports(self):
+        """
+        The package's export table, as a list of `ExportEntry`s.
+        """
+        if self.version < VER_UE4_TEMPLATE_INDEX_IN_COOKED_EXPORTS:
+            raise ValueError(f'Export table parsing not supported for version {self.version}')
+        exports = []
+        fname = self._fname
+        for values in export_struct.iter_unpack(
+                self.data[self.export_offset:self.export_offset+self.export_count*export_struct.size]):
+            exports.append(ExportEntry(values[0], values[1], values[2], values[3],
+                fname(values[4], values[5]), values[6], values[7], values[8]))
+        if len(exports) != self.export_count:
+            raise ValueError('Export table extends past end of package')
+        return exports
+
+    def close(self):
+        """
+        Closes the underlying file, if we opened one.  Tables which haven't
+        been accessed yet won't be available afterwards.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._df is not None:
+            self._df.close()
+            self._df = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        if self.filename:
+            return f'Package<{self.filename}>'
+        return 'Package<buffer>'
+
+
+def _fstring(value):
+    """
+    Encodes `value` as an FString (used by `synthetic_package()`).
+    """
+    try:
+        encoded = (value + '\0').encode('ascii')
+        return int32.pack(len(encoded)) + encoded
+    except UnicodeEncodeError:
+        encoded = (value + '\0').encode('utf_16_le')
+        return int32.pack(-(len(encoded)//2)) + encoded
+
+
+def synthetic_package(names, num_imports, num_exports, rng=random):
+    """
+    Builds a fake unversioned, cooked package (laid out like BL3's) with
+    the given names and numbers of imports/exports.  Used for benchmarking.
+    """
+    header_fixed = 4*3 + 8*3 + 4 + 8 + 4 + 4 + 16 + 4 + generation_size
+    prefix = uint32.pack(PACKAGE_TAG) + struct.pack('<iiii', -7, 0, 0, 0) + int32.pack(0)
+    folder = _fstring('None')
+    summary_size = len(prefix) + 4 + len(folder) + header_fixed
+
+    name_data = b''.join(_fstring(name) + b'\0\0\0\0' for name in names)
+    name_offset = summary_size
+    import_offset = name_offset + len(name_data)
+    export_offset = import_offset + num_imports*import_struct.size
+    total_header_size = export_offset + num_exports*export_struct.size
+
+    num_names = len(names)
+    import_data = b''.join(import_struct.pack(rng.randrange(num_names), 0, rng.randrange(num_names), 0,
+        0, rng.randrange(num_names), rng.randrange(3)) for _ in range(num_imports))
+    export_data = b''.join(export_struct.pack(-1, 0, 0, 0, rng.randrange(num_names), 0, 0,
+        100, total_header_size, 0, 0, 0, b'\0'*16, 0, 0, 1, -1, 0, 0, 0, 0) for _ in range(num_exports))
+
+    summary = b''.join([
+        prefix,
+        int32.pack(total_header_size),
+        folder,
+        uint32.pack(PKG_FILTER_EDITOR_ONLY),
+        int32x2.pack(num_names, name_offset),
+        int32x2.pack(0, 0),
+        int32x2.pack(num_exports, export_offset),
+        int32x2.pack(num_imports, import_offset),
+        int32.pack(0),
+        int32x2.pack(0, 0),
+        int32.pack(0),
+        int32.pack(0),
+        b'\0'*16,
+        int32.pack(1),
+        int32x2.pack(num_exports, num_names),
+        ])
+    assert(len(summary) == summary_size)
+    return summary + name_data + import_data + export_data
+
+
+def benchmark(num_packages, seed=0):
+    """
+    Times parsing of a synthetic corpus of `num_packages` packages, at
+    various levels of laziness, and reports packages/sec for each.
+    """
+    rng = random.Random(seed)
+    print(f'Generating {num_packages} synthetic packages...')
+    corpus = []
+    for idx in range(num_packages):
+        num_names = rng.randint(20, 600)
+        names = [f'/Game/Synthetic/Dir{idx%97}/Object_{idx}'] + \
+                [f'Name_{rng.randrange(100000)}_{n}' for n in range(num_names-1)]
+        corpus.append(synthetic_package(names, rng.randint(5, 100), rng.randint(1, 40), rng))
+    total_bytes = sum(len(data) for data in corpus)
+    print(f'Corpus: {total_bytes/1024/1024:.1f}MiB')
+
+    def summary_only(package):
+        pass
+
+    def find_name(package):
+        package.names.find({f'/game/synthetic/dir{idx%97}/object_{idx}'})
+
+    def all_names(package):
+        for _ in package.names:
+            pass
+
+    def everything(package):
+        for _ in package.names:
+            pass
+        for entry in package.imports:
+            str(entry.object_name)
+        for entry in package.exports:
+            str(entry.object_name)
+
+    for label, func in [
+            ('summary only', summary_only),
+            ('summary + one name lookup', find_name),
+            ('summary + all names', all_names),
+            ('summary + names/imports/exports', everything),
+            ]:
+        start = time.perf_counter()
+        for idx, data in enumerate(corpus):
+            func(Package(data))
+        elapsed = time.perf_counter() - start
+        print(f' - {label}: {num_packages/elapsed:.0f} packages/sec')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Dump UE4 package summaries, names, imports and exports',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-n', '--names',
+            action='store_true',
+            help='Show the name map',
+            )
+
+    parser.add_argument('-i', '--imports',
+            action='store_true',
+            help='Show the import table',
+            )
+
+    parser.add_argument('-e', '--exports',
+            action='store_true',
+            help='Show the export table',
+            )
+
+    parser.add_argument('-b', '--benchmark',
+            type=int,
+            metavar='NUM_PACKAGES',
+            help='Instead of reading files, benchmark parsing this many synthetic packages',
+            )
+
+    parser.add_argument('filename',
+            nargs='*',
+            help='Package files to dump',
+            )
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        sys.exit(0)
+    if not args.filename:
+        parser.error('No filenames given')
+
+    for filename in args.filename:
+        try:
+            package = Package(filename)
+        except (OSError, ValueError) as e:
+            print(f'{filename}: {e}')
+            continue
+        with package:
+            print(f'{filename}:')
+            print(f'  version {package.version}' + (' (unversioned)' if package.unversioned else '')
+                    + f', flags 0x{package.package_flags:08X}, header size {package.total_header_size}')
+            print(f'  {package.name_count} names, {package.import_count} imports, {package.export_count} exports')
+            if args.names:
+                print('  Names:')
+                for idx, name in enumerate(package.names):
+                    print(f'    {idx}: {name}')
+            if args.imports:
+                print('  Imports:')
+                for idx, entry in enumerate(package.imports):
+                    print(f'    {-idx-1}: {entry.class_package}.{entry.class_name} {entry.object_name} (outer {entry.outer_index})')
+            if args.exports:
+                print('  Exports:')
+                for idx, entry in enumerate(package.exports):
+                    print(f'    {idx+1}: {entry.object_name} (class {entry.class_index}, outer {entry.outer_index}, {entry.serial_size} bytes @ {entry.serial_offset})')
@@ -110,14 +110,6 @@ if sys.version_info < (3, 9):
     input("\nThis utility requires at least Python 3.9.  Hit Enter to exit.\n")
     raise RuntimeError("This utility requires at least Python 3.9")
 
-# Check for existence of WINEPREFIX if on Linux and told to do so
-if platform.system() == "Linux" and LINUX_USE_WINE:
-    if WINEPREFIX is None or not os.path.exists(WINEPREFIX):
-        print("")
-        print(f"WINEPREFIX is not set properly.  Make sure that this path exists: {WINEPREFIX}")
-        input("Hit Enter to exit.\n")
-        raise RuntimeError("WINEPREFIX not found")
-
 # When excluding *.wem-only pakfiles entirely, and after deleting all the
 # default stuff specified in EXTRACTED_*_TO_DELETE, this is the ratio of pakfile
 # size to extracted size. (For reference, after the release of DLC5, it's 79GB
@@ -254,24 +246,46 @@ class PakFile:
 
     def __init__(self, filename: str) -> None:
         self.filename = filename
-        if match := self.re_pak.match(self.filename):
-            self.sort_filename = match.group("filename").casefold()
-            self.paknum = int(match.group("datagroup"))
+        self.sort_filename, self.paknum, self.patchnum = self.parse_filename(
+            filename
+        )
+        self.size = os.stat(self.filename, follow_symlinks=True).st_size
+
+    @classmethod
+    def parse_filename(cls, filename: str) -> tuple[str, float, float]:
+        """
+        Parses a pakfile name (which may include directory components) into
+        a tuple of `(sort_filename, paknum, patchnum)`, without touching the
+        filesystem.  Raises a RuntimeError if the name isn't recognized.
+        """
+        if match := cls.re_pak.match(filename):
+            sort_filename = match.group("filename").casefold()
+            paknum = int(match.group("datagroup"))
             if match.group("patchnum") is not None:
-                self.patchnum = int(match.group("patchnum"))
+                patchnum = int(match.group("patchnum"))
             else:
-                self.patchnum = -1
-        elif match := self.re_dlc.match(self.filename):
-            self.sort_filename = match.group("filename").casefold()
+                patchnum = -1
+        elif match := cls.re_dlc.match(filename):
+            sort_filename = match.group("filename").casefold()
             dlc_name = match.group("dlcname")
-            if dlc_name not in self.dlc_virtual_patchnum:
+            if dlc_name not in cls.dlc_virtual_patchnum:
                 raise RuntimeError(f"Unknown DLC Codename: {dlc_name}")
             # paknum of 0 isn't *really* appropriate here, but who cares.
-            self.paknum = 0
-            self.patchnum = self.dlc_virtual_patchnum[dlc_name]
+            paknum = 0
+            patchnum = cls.dlc_virtual_patchnum[dlc_name]
         else:
             raise RuntimeError(f"Unknown pak file: {filename}")
-        self.size = os.stat(self.filename, follow_symlinks=True).st_size
+        return (sort_filename, paknum, patchnum)
+
+    @classmethod
+    def load_order_key(cls, filename: str) -> tuple[float, str]:
+        """
+        Returns a key which sorts pakfile names in the same order as
+        `__lt__` does (ie: the order the game loads them in), for when we
+        only have a filename and not an actual file on disk.
+        """
+        sort_filename, _, patchnum = cls.parse_filename(filename)
+        return (patchnum, sort_filename)
 
     def is_audio_only(self) -> bool:
         """
@@ -636,7 +650,23 @@ def find_default_bl3_install() -> str:
     return BL3_INSTALL_DIR
 
 
+def check_wineprefix() -> None:
+    """
+    Check for existence of WINEPREFIX if on Linux and told to do so.  (Only
+    done when we're run directly, so that other scripts can import us just
+    for the PakFile sorting logic.)
+    """
+    if platform.system() == "Linux" and LINUX_USE_WINE:
+        if WINEPREFIX is None or not os.path.exists(WINEPREFIX):
+            print("")
+            print(f"WINEPREFIX is not set properly.  Make sure that this path exists: {WINEPREFIX}")
+            input("Hit Enter to exit.\n")
+            raise RuntimeError("WINEPREFIX not found")
+
+
 if __name__ == "__main__":
+    check_wineprefix()
+
     # Parse args
     parser = argparse.ArgumentParser(
         description="Unpack Borderlands 3 PAK files",
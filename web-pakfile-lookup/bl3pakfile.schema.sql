@@ -1,5 +1,6 @@
 drop table if exists o2f;
 drop table if exists object;
+drop table if exists directory;
 drop table if exists pakfile;
 drop table if exists patch;
 
@@ -23,13 +24,33 @@ create table pakfile (
     constraint fk_pakfile_patch foreign key (pid) references patch (pid)
 ) engine=innodb;
 
+-- Directory names are stored just once, here, and shared by every object
+-- inside them.  Both in-pak directories (like `OakGame/Content/Foo/`) and
+-- "real" in-game directories (like `/Game/Foo/`) live in this table.  Names
+-- always include a trailing slash (and the root dir is the empty string), so
+-- a full path is just concat(dirname, filename_base, extension).
+create table directory (
+    did int not null auto_increment,
+    dirname varchar(255) not null,
+    primary key (did),
+    unique index idx_dirname (dirname)
+) engine=innodb;
+
+-- `did` is the object's directory inside the pakfile, and `real_did` is
+-- its directory in-game (as computed by list_contents.py, using the
+-- pakfile's mountpoint).  `extension` includes the leading dot, if there is
+-- one.
 create table object (
     oid int not null auto_increment,
+    did int not null,
+    real_did int not null,
     filename_base varchar(125) not null,
-    filename_full varchar(255) not null,
+    extension varchar(125) not null,
     primary key (oid),
     index idx_base (filename_base),
-    unique index idx_full (filename_full)
+    unique index idx_path (did, filename_base, extension),
+    constraint fk_object_directory foreign key (did) references directory (did),
+    constraint fk_object_real_directory foreign key (real_did) references directory (did)
 ) engine=innodb;
 
 create table o2f (
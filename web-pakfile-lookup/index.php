@@ -47,23 +47,26 @@ else
         $searched_name = trim($_REQUEST['name']);
         $searched_name = str_replace(array(' ', "\n", "\r", "\t", "\0", "\x0B"), '', $searched_name);
 
-        # Some regexes we'll use while converting to "real" paths
-        $plugins_re = '|^(?P<firstpart>\w+)/Plugins/(?P<lastpart>.*)\s*$|';
-        $content_re = '|^(?P<junk>.*/)?(?P<firstpart>\w+)/Content/(?P<lastpart>.*)\s*$|';
-
-        # Get the IDs and full pathnames
+        # Get the IDs and full pathnames.  Paths are stored as directory IDs
+        # plus filenames (see bl3pakfile.schema.sql), and the "real" in-game
+        # path has already been computed at import time.
         $stmt = $dbh->prepare("
             select distinct
                 p.dirname patchname, p.released, p.description,
                 f.filename pakname, f.mountpoint, f.ordernum,
-                o.filename_full
+                concat(d.dirname, o.filename_base, o.extension) filename_full,
+                concat(rd.dirname, o.filename_base, o.extension) filename_real
             from
                 o2f m,
                 pakfile f,
                 patch p,
-                object o
+                object o,
+                directory d,
+                directory rd
             where
                 o.filename_base=?
+                and d.did=o.did
+                and rd.did=o.real_did
                 and m.oid=o.oid
                 and m.fid=f.fid
                 and f.pid=p.pid
@@ -77,54 +80,6 @@ else
         $result = $stmt->get_result();
         while ($row = $result->fetch_assoc())
         {
-            # Here's where we'll figure out the "real" path based on the mountpoint + in-pak
-            # path.  Fun times!  We're definitely doing some needless work here, but it's
-            # not like there's likely to be more than a hadful of results per page -- a few
-            # dozen at most.
-            $mountpoint = $row['mountpoint'];
-
-            # Massage the mountpoint a bit
-            if (substr($mountpoint, 0, 9) == '../../../')
-            {
-                $mountpoint = substr($mountpoint, 9);
-            }
-            elseif ($mountpoint == '/')
-            {
-                # This only ever shows up in "empty" pakfiles, so we should never hit this.
-                $mountpoint = '';
-            }
-
-            # Slap the mountpoint on the path
-            $real_path = $mountpoint . $row['filename_full'];
-
-            # If we're a "plugin" path, strip off the plugin bit
-            $matches = array();
-            if (preg_match($plugins_re, $real_path, $matches))
-            {
-                $real_path = $matches['lastpart'];
-            }
-
-            # Now if we're a "content" path, strip that off as well
-            if (preg_match($content_re, $real_path, $matches))
-            {
-                $firstpart = $matches['firstpart'];
-                $lastpart = $matches['lastpart'];
-                # I have no idea how to programmatically determine these hardcoded
-                # translations.  They appear to be the only ones needed, though, at
-                # least for "regular" objects.
-                if ($firstpart == 'OakGame')
-                {
-                    $firstpart = 'Game';
-                }
-                elseif ($firstpart == 'Wwise')
-                {
-                    $firstpart = 'WwiseEditor';
-                }
-                $real_path = '/' . $firstpart . '/' . $lastpart;
-            }
-
-            # Now add in our converted 'real' path and append the row to our results list
-            $row['filename_real'] = $real_path;
             array_push($search_results, $row);
         }
         $stmt->close();
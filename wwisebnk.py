@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import mmap
+import array
+import struct
+import argparse
+
+# Pulls the 32-bit Wwise IDs out of soundbank (`.bnk`) files, so that
+# `gen_initial_wwnames.py` can throw away candidate names which don't hash
+# to anything the banks actually use.  Banks are a series of chunks (a
+# four-character tag, a uint32 size, and then the data), of which we look
+# at:
+#
+#   BKHD: bank header.  A uint32 bank version, then the bank's own ID.
+#   HIRC: the object hierarchy.  A uint32 count, then each object: its
+#         type (a uint8, or a uint32 for bank versions <= 48), a uint32
+#         size, and then `size` bytes starting with its uint32 ID.
+#   STID: bank ID -> name table.  A uint32 string type, a uint32 count,
+#         and then each entry: a uint32 ID, a uint8 length, and the name.
+#
+# That only gets the IDs of the objects themselves, though, and not of the
+# things they refer to (switch/state groups, game parameters, and so on),
+# whose IDs are only found buried in the object data.  The "loose" scan
+# deals with that by treating every four bytes (at every offset) of every
+# chunk except the audio data as a potential ID.  That gives plenty of
+# false positives, but it's still far smaller than the full candidate list.
+
+# Chunks which never contain IDs, for the loose scan
+loose_skip_chunks = {b'DATA', b'DIDX'}
+
+chunk_header = struct.Struct('<4sI')
+uint32 = struct.Struct('<I')
+
+
+def iter_chunks(data):
+    """
+    Generator yielding `(tag, start, end)` for each chunk in the bank data
+    `data`.  Raises `ValueError` if it doesn't look like a bank.
+    """
+    pos = 0
+    size = len(data)
+    while pos + chunk_header.size <= size:
+        tag, length = chunk_header.unpack_from(data, pos)
+        if not tag.isalnum():
+            raise ValueError(f'Invalid chunk tag at offset {pos}')
+        start = pos + chunk_header.size
+        end = start + length
+        if end > size:
+            raise ValueError(f'{tag.decode("latin1")} chunk extends past end of file')
+        yield (tag, start, end)
+        pos = end
+
+
+def loose_ids(data, start, end):
+    """
+    Returns every uint32 at every byte offset between `start` and `end` in
+    `data`, as a set.
+    """
+    found = set()
+    for shift in range(4):
+        chunk_start = start + shift
+        chunk_end = chunk_start + (end - chunk_start)//4*4
+        if chunk_end > chunk_start:
+            values = array.array('I', data[chunk_start:chunk_end])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            found.update(values)
+    return found
+
+
+def bank_ids(filename, loose=False):
+    """
+    Returns the set of Wwise IDs found in the bank `filename`: the bank's
+    own ID, the ID of every HIRC object, and every ID in the STID table.
+    With `loose`, also includes every possible uint32 from every chunk
+    other than the audio data.
+    """
+    ids = set()
+    with open(filename, 'rb') as df:
+        with mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            version = None
+            for tag, start, end in iter_chunks(data):
+
+                if tag == b'BKHD':
+                    version, bank_id = struct.unpack_from('<II', data, start)
+                    ids.add(bank_id)
+
+                elif tag == b'HIRC':
+                    count = uint32.unpack_from(data, start)[0]
+                    pos = start + 4
+                    if version is not None and version <= 48:
+                        object_header = struct.Struct('<III')
+                    else:
+                        object_header = struct.Struct('<BII')
+                    for _ in range(count):
+                        _, size, object_id = object_header.unpack_from(data, pos)
+                        ids.add(object_id)
+                        pos += object_header.size - 4 + size
+                        if pos > end:
+                            raise ValueError('HIRC object extends past end of chunk')
+
+                elif tag == b'STID':
+                    _, count = struct.unpack_from('<II', data, start)
+                    pos = start + 8
+                    for _ in range(count):
+                        bank_id = uint32.unpack_from(data, pos)[0]
+                        ids.add(bank_id)
+                        pos += 5 + data[pos+4]
+
+                if loose and tag not in loose_skip_chunks:
+                    ids |= loose_ids(data, start, end)
+
+    return ids
+
+
+def try_bank_ids(filename, loose=False):
+    """
+    Like `bank_ids()`, but returns an empty set (and prints a warning)
+    rather than raising an exception if the bank can't be parsed.  Suitable
+    for use as a process pool worker.
+    """
+    try:
+        return bank_ids(filename, loose)
+    except (OSError, ValueError, struct.error) as e:
+        print(f'WARNING: could not read bank {filename}: {e}', file=sys.stderr)
+        return set()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Extract Wwise IDs from soundbank files',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            )
+
+    parser.add_argument('-l', '--loose',
+            action='store_true',
+            help='Include every possible uint32 from non-audio chunks',
+            )
+
+    parser.add_argument('-p', '--print',
+            action='store_true',
+            help='Print all the IDs found',
+            )
+
+    parser.add_argument('filename',
+            nargs='+',
+            help='.bnk files to read',
+            )
+
+    args = parser.parse_args()
+
+    all_ids = set()
+    for filename in args.filename:
+        ids = bank_ids(filename, args.loose)
+        print(f'{filename}: {len(ids)} IDs', file=sys.stderr)
+        all_ids |= ids
+    print(f'{len(all_ids)} unique IDs total', file=sys.stderr)
+    if args.print:
+        for bank_id in sorted(all_ids):
+            print(bank_id)
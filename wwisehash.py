@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import time
+import array
+import argparse
+import itertools
+import collections
+
+try:
+    import numpy
+    numpy_supported = True
+except ModuleNotFoundError:
+    numpy_supported = False
+
+# Wwise refers to events, switches, buses, etc, by a 32-bit ID which is the
+# FNV-1 hash of their lowercased name.  `wwiser` uses a list of candidate
+# names (like the one `gen_initial_wwnames.py` generates) to turn those IDs
+# back into names, but with millions of candidates, some unrelated names
+# are bound to hash to the same value, and then wwiser can end up picking
+# the wrong one.  The functions in here hash candidates in bulk and find
+# those collisions.
+#
+# Hashing is done with NumPy if it's available: names are grouped by
+# length, packed into a 2D byte array, and hashed one column at a time
+# across every name at once.  Without NumPy it falls back to a plain
+# Python loop, which works fine but is a good deal slower.
+#
+# What to *do* about a collision is up to a "policy", which is given each
+# collision group and returns the names it wants removed.  See `policies`
+# at the bottom.
+
+FNV_OFFSET_BASIS = 2166136261
+FNV_PRIME = 16777619
+
+# How many names to hash at once, when streaming
+DEFAULT_BATCH_SIZE = 200000
+
+
+def fnv_hash(name):
+    """
+    Returns the Wwise ID (FNV-1 32-bit hash of the lowercased name) for
+    `name`.
+    """
+    h = FNV_OFFSET_BASIS
+    for byte in name.lower().encode('utf-8'):
+        h = ((h * FNV_PRIME) & 0xFFFFFFFF) ^ byte
+    return h
+
+
+def _hash_batch_python(encoded):
+    return [_fnv_bytes(data) for data in encoded]
+
+
+def _fnv_bytes(data):
+    h = FNV_OFFSET_BASIS
+    for byte in data:
+        h = ((h * FNV_PRIME) & 0xFFFFFFFF) ^ byte
+    return h
+
+
+def _hash_batch_numpy(encoded):
+    hashes = numpy.empty(len(encoded), dtype=numpy.uint32)
+    by_length = collections.defaultdict(list)
+    for idx, data in enumerate(encoded):
+        by_length[len(data)].append(idx)
+    prime = numpy.uint32(FNV_PRIME)
+    for length, indexes in by_length.items():
+        indexes = numpy.array(indexes, dtype=numpy.intp)
+        h = numpy.full(len(indexes), FNV_OFFSET_BASIS, dtype=numpy.uint32)
+        if length > 0:
+            data = numpy.frombuffer(b''.join(encoded[idx] for idx in indexes),
+                    dtype=numpy.uint8).reshape(len(indexes), length)
+            for column in range(length):
+                h *= prime
+                h ^= data[:, column]
+        hashes[indexes] = h
+    return hashes.tolist()
+
+
+def hash_names(names):
+    """
+    Returns a list of the Wwise IDs for each of `names`, in order.  Uses
+    NumPy if it's available.
+    """
+    encoded = [name.lower().encode('utf-8') for name in names]
+    if numpy_supported:
+        return _hash_batch_numpy(encoded)
+    else:
+        return _hash_batch_python(encoded)
+
+
+def iter_hashes(names, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Generator which yields `(name, hash)` for every name in the iterable
+    `names`, hashing them in batches of `batch_size`.
+    """
+    names = iter(names)
+    while batch := list(itertools.islice(names, batch_size)):
+        yield from zip(batch, hash_names(batch))
+
+
+def find_collisions(names, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Finds every set of names in `names` whose Wwise IDs collide.  Names
+    which only differ by case aren't counted as colliding, since they
+    really are the same thing as far as Wwise is concerned.  `names` must
+    be something which can be iterated over twice (a list, a set, or a
+    callable which returns a fresh iterator each time): the first pass only
+    keeps the hashes themselves, and the second pulls out the names for
+    the hashes which turned up more than once.  Returns a dict mapping each
+    colliding ID to a sorted list of the names which share it.
+    """
+    if callable(names):
+        get_names = names
+    else:
+        get_names = lambda: names
+
+    # First pass: just the hashes, as compactly as possible
+    hashes = array.array('I')
+    for _, h in iter_hashes(get_names(), batch_size):
+        hashes.append(h)
+    if numpy_supported:
+        values, counts = numpy.unique(numpy.frombuffer(hashes, dtype=numpy.uint32), return_counts=True)
+        repeated = set(values[counts > 1].tolist())
+    else:
+        counter = collections.Counter(hashes)
+        repeated = {h for h, count in counter.items() if count > 1}
+    del hashes
+    if not repeated:
+        return {}
+
+    # Second pass: collect the names for those
+    groups = collections.defaultdict(list)
+    for name, h in iter_hashes(get_names(), batch_size):
+        if h in repeated:
+            groups[h].append(name)
+    collisions = {}
+    for h, group in groups.items():
+        if len({name.lower() for name in group}) > 1:
+            collisions[h] = sorted(group)
+    return collisions
+
+
+###
+### Collision policies.  Each is a class which gets called with a sorted
+### list of colliding names, and returns the set of those names to remove.
+###
+
+class ManualPolicy:
+    """
+    Only removes names which are in a hand-maintained list (ie: what
+    `gen_initial_wwnames.py` has always done with `collisions_to_remove`).
+    Groups which aren't resolved by that list are left alone.
+    """
+
+    def __init__(self, to_remove):
+        self.to_remove = set(to_remove)
+
+    def __call__(self, group):
+        return self.to_remove & set(group)
+
+
+class KeepShortestPolicy:
+    """
+    Keeps the shortest name in each group (and the alphabetically-first, if
+    there's a tie), on the theory that long machine-generated names (GUID
+    suffixes and the like) are the least likely to be real Wwise names.
+    Names listed in `to_remove` are always removed.
+    """
+
+    def __init__(self, to_remove=()):
+        self.to_remove = set(to_remove)
+
+    def __call__(self, group):
+        candidates = [name for name in group if name not in self.to_remove] or group
+        keep = min(candidates, key=lambda name: (len(name), name)).lower()
+        return {name for name in group if name.lower() != keep}
+
+
+class RemoveAllPolicy:
+    """
+    Removes every name in a collision group, since we can't know which one
+    is right.
+    """
+
+    def __init__(self, to_remove=()):
+        pass
+
+    def __call__(self, group):
+        return set(group)
+
+
+policies = {
+        'manual': ManualPolicy,
+        'shortest': KeepShortestPolicy,
+        'remove-all': RemoveAllPolicy,
+        }
+
+
+def resolve_collisions(collisions, policy):
+    """
+    Applies `policy` to each group in `collisions` (as returned by
+    `find_collisions()`).  Returns a tuple of the set of names to remove,
+    and a list of `(hash, group)` tuples for groups which still collide
+    afterwards.
+    """
+    to_remove = set()
+    unresolved = []
+    for h, group in sorted(collisions.items()):
+        removed = policy(group)
+        to_remove |= removed
+        if len({name.lower() for name in group if name not in removed}) > 1:
+            unresolved.append((h, group))
+    return (to_remove, unresolved)
+
+
+def report_collisions(collisions, to_remove, file=sys.stdout):
+    """
+    Prints out all collision groups, marking which names are being removed.
+    """
+    for h, group in sorted(collisions.items()):
+        print(f' - {h}:', file=file)
+        for name in group:
+            if name in to_remove:
+                print(f'    - {name} (removed)', file=file)
+            else:
+                print(f'    - {name}', file=file)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Compute Wwise IDs for names, and find collisions',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                With -f/--file, reports all collisions found among the
+                names in that file (one per line; blank lines and lines
+                starting with # are skipped, as with wwnames.txt).
+                Otherwise, prints the ID of each name given on the
+                commandline.
+            """,
+            )
+
+    parser.add_argument('-f', '--file',
+            type=str,
+            help='Find collisions among the names in this file',
+            )
+
+    parser.add_argument('names',
+            nargs='*',
+            help='Names to hash',
+            )
+
+    args = parser.parse_args()
+
+    if args.file:
+        def read_names():
+            with open(args.file, encoding='utf-8') as df:
+                for line in df:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        yield line
+        start = time.perf_counter()
+        collisions = find_collisions(read_names)
+        report_collisions(collisions, set())
+        print('{} collision group(s) found in {:.2f}s{}'.format(
+            len(collisions),
+            time.perf_counter()-start,
+            '' if numpy_supported else ' (without NumPy)',
+            ), file=sys.stderr)
+    elif args.names:
+        for name, h in zip(args.names, hash_names(args.names)):
+            print(f'{name}: {h}')
+    else:
+        parser.error('No names given')
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# vim: set expandtab tabstop=4 shiftwidth=4:
+
+# Borderlands 3 Data Processing Scripts
+# Copyright (C) 2026 CJ Kucera
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the development team nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL CJ KUCERA BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+import lzma
+import struct
+import argparse
+import functools
+import concurrent.futures
+
+# Helpers for writing and reading "block-parallel" xz files.  Rather than
+# compressing one big stream (which is what `lzma.open()` does, and which
+# is inherently single-threaded), the writer here chops its input up into
+# chunks of a few megabytes and compresses each one as an entirely
+# independent xz stream on a thread pool (liblzma drops the GIL while it
+# works, so threads are all we need).  The streams just get concatenated
+# into the output file, which the xz spec explicitly allows, so the result
+# is still readable by `xz`, `xzcat`, `lzma.open()`, etc.
+#
+# The writer only ever splits chunks on a newline, so every stream in a
+# file we've written decompresses to a run of complete lines.  The reader
+# side finds the stream boundaries by walking the stream footers/indexes
+# backwards from the end of the file, and can then decompress them in
+# parallel as well.  Files written by anything else (a plain single-stream
+# `.xz`, for instance) still work fine; there'll just be only one stream
+# to decompress.
+
+# Default xz preset.  6 is what `xz` and `lzma.open()` use by default.
+DEFAULT_PRESET = 6
+
+# Uncompressed size of each independent stream.  Smaller chunks parallelize
+# better but compress slightly worse.
+DEFAULT_BLOCK_SIZE = 4*1024*1024
+
+# Bits of the xz container format we need to recognize
+stream_header_magic = b'\xfd7zXZ\x00'
+stream_footer_magic = b'YZ'
+stream_header_size = 12
+stream_footer_size = 12
+
+
+def default_threads():
+    """
+    Returns the number of worker threads to use if we haven't been told
+    otherwise.
+    """
+    return os.cpu_count() or 1
+
+
+class XZBlockWriter:
+    """
+    Write-only text file object which compresses its data as a series of
+    independent xz streams, on a thread pool.  Can be used anywhere a
+    regular text file would be (`print(..., file=df)`, etc).  Use it as a
+    context manager, or make sure to call `close()` so that the final
+    chunk gets written out.
+    """
+
+    def __init__(self, filename, preset=DEFAULT_PRESET, threads=None,
+            block_size=DEFAULT_BLOCK_SIZE, encoding='utf-8'):
+        self.filename = filename
+        self.encoding = encoding
+        self.block_size = block_size
+        if threads is None:
+            threads = default_threads()
+        self.threads = threads
+        self.compress = functools.partial(lzma.compress,
+                format=lzma.FORMAT_XZ,
+                preset=preset)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+        self.df = open(filename, 'wb')
+        self.buffer = []
+        self.buffer_size = 0
+        self.pending = []
+        self.streams_written = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+        if self.buffer_size >= self.block_size:
+            self._submit(final=False)
+        return len(data)
+
+    def flush(self):
+        # Data only hits the disk a whole stream at a time; there's nothing
+        # useful to do here.
+        pass
+
+    def _submit(self, final):
+        """
+        Sends the current buffer off to be compressed.  Unless `final` is
+        set, anything after the last newline stays in the buffer, so that
+        each stream decompresses to complete lines.
+        """
+        data = ''.join(self.buffer)
+        remainder = ''
+        if not final:
+            split_at = data.rfind('\n') + 1
+            if split_at == 0:
+                # No newline yet; just keep accumulating
+                self.buffer = [data]
+                return
+            data, remainder = data[:split_at], data[split_at:]
+        self.buffer = [remainder] if remainder else []
+        self.buffer_size = len(remainder)
+        if data or (final and self.streams_written == 0 and not self.pending):
+            # (We always write at least one stream, so that an empty file
+            # is still valid xz.)
+            self.pending.append(self.executor.submit(self.compress, data.encode(self.encoding)))
+        self._drain(self.threads*2)
+
+    def _drain(self, limit):
+        """
+        Writes out finished streams, in order, until there are at most
+        `limit` still in flight.  This keeps memory usage bounded when
+        we're being fed faster than we can compress.
+        """
+        while len(self.pending) > limit:
+            self.df.write(self.pending.pop(0).result())
+            self.streams_written += 1
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._submit(final=True)
+            self._drain(0)
+        finally:
+            self.closed = True
+            self.executor.shutdown()
+            self.df.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _read_multibyte(data, pos):
+    """
+    Reads an xz variable-length integer from `data` at `pos`.  Returns a
+    tuple of the value and the position just after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80 == 0:
+            return (value, pos)
+        shift += 7
+        if shift >= 63:
+            raise ValueError('Invalid xz multibyte integer')
+
+
+def stream_ranges(df, limit=None):
+    """
+    Given a binary file object (which must be seekable), returns a list of
+    `(start, end)` byte ranges for each xz stream in the file, in file order.
+    Only the stream footers and indexes get read, so this is quick even on
+    huge files.  Pass `limit` to only find that many streams at the end of
+    the file.  Raises `ValueError` if the file doesn't look like xz.
+    """
+    ranges = []
+    pos = df.seek(0, os.SEEK_END)
+    while pos > 0 and (limit is None or len(ranges) < limit):
+
+        # Skip over any stream padding
+        if pos >= 4:
+            df.seek(pos-4)
+            if df.read(4) == b'\x00\x00\x00\x00':
+                pos -= 4
+                continue
+
+        # Footer
+        if pos < stream_header_size + stream_footer_size:
+            raise ValueError('Truncated xz stream')
+        df.seek(pos-stream_footer_size)
+        footer = df.read(stream_footer_size)
+        if footer[10:] != stream_footer_magic:
+            raise ValueError('Invalid xz stream footer')
+        index_size = (struct.unpack('<I', footer[4:8])[0]+1)*4
+
+        # Index, to find out how big all the blocks are
+        index_start = pos - stream_footer_size - index_size
+        df.seek(index_start)
+        index = df.read(index_size)
+        if len(index) != index_size or index[0] != 0:
+            raise ValueError('Invalid xz index')
+        num_records, idx_pos = _read_multibyte(index, 1)
+        blocks_size = 0
+        for _ in range(num_records):
+            unpadded, idx_pos = _read_multibyte(index, idx_pos)
+            _, idx_pos = _read_multibyte(index, idx_pos)
+            blocks_size += (unpadded + 3) & ~3
+
+        # And now we know where the stream starts
+        start = index_start - blocks_size - stream_header_size
+        df.seek(start)
+        if start < 0 or df.read(len(stream_header_magic)) != stream_header_magic:
+            raise ValueError('Invalid xz stream header')
+        ranges.append((start, pos))
+        pos = start
+
+    ranges.reverse()
+    return ranges
+
+
+def decompress_range(df, start, end):
+    """
+    Reads the single xz stream found at `start`-`end` in the binary file
+    object `df`, and returns its decompressed data.
+    """
+    df.seek(start)
+    return lzma.decompress(df.read(end-start), format=lzma.FORMAT_XZ)
+
+
+def iter_chunks(filename, threads=None):
+    """
+    Generator which decompresses each xz stream in `filename` on a thread
+    pool, yielding the decompressed bytes of each in file order.
+    """
+    if threads is None:
+        threads = default_threads()
+    with open(filename, 'rb') as df:
+        ranges = stream_ranges(df)
+        decompress = functools.partial(lzma.decompress, format=lzma.FORMAT_XZ)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            pending = []
+            for start, end in ranges:
+                df.seek(start)
+                pending.append(executor.submit(decompress, df.read(end-start)))
+                # Don't read too far ahead of what we've handed back
+                while len(pending) > threads*2:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+
+def iter_lines(filename, encoding='utf-8', threads=None):
+    """
+    Generator which yields decoded lines (including their trailing newline)
+    from an xz file, decompressing its streams in parallel.  Works on any
+    xz file, though files written by `XZBlockWriter` will parallelize best.
+    """
+    leftover = b''
+    for chunk in iter_chunks(filename, threads=threads):
+        if leftover:
+            chunk = leftover + chunk
+        lines = chunk.split(b'\n')
+        leftover = lines.pop()
+        for line in lines:
+            yield line.decode(encoding) + '\n'
+    if leftover:
+        yield leftover.decode(encoding)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+            description='Block-parallel xz compression/decompression',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            epilog="""
+                Compresses the given file to <filename>.xz as a series of
+                independent xz streams, or with -d/--decompress, writes the
+                decompressed contents of an xz file to stdout.
+            """,
+            )
+
+    parser.add_argument('-d', '--decompress',
+            action='store_true',
+            help='Decompress to stdout instead of compressing',
+            )
+
+    parser.add_argument('-p', '--preset',
+            type=int,
+            choices=range(10),
+            default=DEFAULT_PRESET,
+            help='xz compression preset',
+            )
+
+    parser.add_argument('-t', '--threads',
+            type=int,
+            default=default_threads(),
+            help='Number of threads to use',
+            )
+
+    parser.add_argument('filename',
+            nargs=1,
+            help='File to process',
+            )
+
+    args = parser.parse_args()
+    filename = args.filename[0]
+
+    if args.decompress:
+        for chunk in iter_chunks(filename, threads=args.threads):
+            sys.stdout.buffer.write(chunk)
+    else:
+        with open(filename, encoding='utf-8') as df:
+            with XZBlockWriter(f'{filename}.xz', preset=args.preset, threads=args.threads) as odf:
+                for line in df:
+                    odf.write(line)